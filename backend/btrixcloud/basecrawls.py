@@ -3,17 +3,46 @@
 import asyncio
 import uuid
 import os
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple, Union
 
 from pydantic import BaseModel, UUID4
+from pymongo import UpdateOne
 from fastapi import HTTPException, Depends
 from .db import BaseMongoModel
 from .orgs import Organization
-from .pagination import PaginatedResponseModel, paginated_format, DEFAULT_PAGE_SIZE
-from .storages import get_presigned_url, delete_crawl_file_object
+from .pagination import (
+    CursorPaginatedResponseModel,
+    PaginatedResponseModel,
+    paginated_format,
+    cursor_paginated_format,
+    get_cursor_sort_keys,
+    get_cursor_paginated_items,
+    DEFAULT_PAGE_SIZE,
+)
+from .storages import (
+    get_presigned_urls,
+    get_wacz_directory,
+    delete_crawl_file_object,
+    LOG_FETCH_CONCURRENCY,
+)
 from .users import User
-from .utils import dt_now
+from .utils import LRUCache, dt_now
+from .zip import ZipMember
+
+
+# presigned urls and expiry times, by storage and filename, shared by all ops
+presigned_url_cache = LRUCache(int(os.environ.get("PRESIGNED_URL_CACHE_SIZE", 10_000)))
+
+# urls of recently read files are re-signed when within this fraction of
+# their lifetime of expiring, checked every interval
+PRESIGN_REFRESH_FRACTION = float(os.environ.get("PRESIGN_REFRESH_FRACTION", 0.1))
+PRESIGN_REFRESH_INTERVAL_SECS = int(os.environ.get("PRESIGN_REFRESH_INTERVAL_SECS", 60))
+PRESIGN_REFRESH_BATCH_SIZE = 1000
+
+# max presigned url keys removed per delete from presigned_urls collection
+PRESIGN_INVALIDATE_BATCH_SIZE = 1000
 
 
 # ============================================================================
@@ -25,8 +54,32 @@ class CrawlFile(BaseModel):
     size: int
     def_storage_name: Optional[str]
 
-    presignedUrl: Optional[str]
-    expireAt: Optional[datetime]
+    # stored WACZ central directory, set on first read
+    directory: Optional[List[ZipMember]]
+
+
+# ============================================================================
+class CrawlLogFile(BaseModel):
+    """Location of merged crawl log file and of its block index"""
+
+    filename: str
+    def_storage_name: Optional[str]
+
+    size: int
+    indexOffset: int
+    lineCount: int
+
+
+# ============================================================================
+class CrawlLogStats(BaseModel):
+    """Counts of crawl log lines by log level and context, and first and
+    last error, computed once when crawl finishes"""
+
+    logLevels: Dict[str, int] = {}
+    contexts: Dict[str, int] = {}
+
+    firstError: Optional[Dict]
+    lastError: Optional[Dict]
 
 
 # ============================================================================
@@ -58,6 +111,10 @@ class BaseCrawl(BaseMongoModel):
 
     files: Optional[List[CrawlFile]] = []
 
+    # merged logs, created at crawl finish
+    logFile: Optional[CrawlLogFile]
+    logStats: Optional[CrawlLogStats]
+
     notes: Optional[str]
 
     errors: Optional[List[str]] = []
@@ -135,13 +192,22 @@ class BaseCrawlOps:
 
     def __init__(self, mdb, users, crawl_manager):
         self.crawls = mdb["crawls"]
+        self.pages = mdb["pages"]
         self.crawl_manager = crawl_manager
         self.user_manager = users
 
+        # orgs of files being refreshed are resolved when refreshing
+        self.organizations = mdb["organizations"]
+
         self.presign_duration_seconds = (
             int(os.environ.get("PRESIGN_DURATION_MINUTES", 60)) * 60
         )
 
+        # presigned urls shared across api workers, expired by ttl index
+        self.presigned_urls = None
+        if os.environ.get("PRESIGNED_URLS_DB_CACHE", "1") == "1":
+            self.presigned_urls = mdb["presigned_urls"]
+
     async def get_crawl_raw(
         self,
         crawlid: str,
@@ -244,6 +310,10 @@ class BaseCrawlOps:
 
         res = await self.crawls.delete_many(query)
 
+        await self.pages.delete_many(
+            {"crawl_id": {"$in": delete_list.crawl_ids}, "oid": org.id}
+        )
+
         return res.deleted_count, size, cids_to_update
 
     async def _delete_crawl_files(self, crawl, org: Organization):
@@ -256,6 +326,13 @@ class BaseCrawlOps:
             if status_code != 204:
                 raise HTTPException(status_code=400, detail="file_deletion_error")
 
+        if crawl.logFile:
+            await delete_crawl_file_object(org, crawl.logFile, self.crawl_manager)
+
+        await self.invalidate_presigned_urls(
+            [get_presigned_url_key(file_, crawl.oid) for file_ in crawl.files]
+        )
+
         return size
 
     async def _resolve_signed_urls(
@@ -265,52 +342,150 @@ class BaseCrawlOps:
             print("no files")
             return
 
-        delta = timedelta(seconds=self.presign_duration_seconds)
-
-        updates = []
-        out_files = []
+        resources = await self._resolve_crawls_signed_urls([(crawl_id, files)], org)
+        return resources[0]
 
-        for file_ in files:
-            presigned_url = file_.presignedUrl
-            now = dt_now()
+    async def _resolve_crawls_signed_urls(
+        self,
+        crawl_files: List[Tuple[Optional[str], Optional[List[CrawlFile]]]],
+        org: Organization,
+    ):
+        """Return resources for files of each (crawl id, files), with urls
+        from presigned url cache, or else signing all files with missing or
+        expired urls together in one batch"""
+        files = [file_ for _, files in crawl_files for file_ in files or []]
 
-            if not presigned_url or now >= file_.expireAt:
-                exp = now + delta
-                presigned_url = await get_presigned_url(
-                    org, file_, self.crawl_manager, self.presign_duration_seconds
-                )
-                updates.append(
-                    (
-                        {"files.filename": file_.filename},
-                        {
-                            "$set": {
-                                "files.$.presignedUrl": presigned_url,
-                                "files.$.expireAt": exp,
-                            }
-                        },
-                    )
-                )
+        urls = await self._get_presigned_urls(files, org)
+        oid = org.id if org else None
 
-            out_files.append(
+        return [
+            [
                 CrawlFileOut(
                     name=file_.filename,
-                    path=presigned_url,
+                    path=urls[get_presigned_url_key(file_, oid)],
                     hash=file_.hash,
                     size=file_.size,
                     crawlId=crawl_id,
                 )
+                for file_ in files
+            ]
+            if files
+            else None
+            for crawl_id, files in crawl_files
+        ]
+
+    async def _get_presigned_urls(self, files: List[CrawlFile], org: Organization):
+        """Return presigned urls by cache key, from in-process cache, then
+        from presigned_urls collection, signing any still missing"""
+        now = dt_now()
+
+        presign_refresher.start(self)
+
+        oid = org.id if org else None
+
+        urls = {}
+        missing = {}
+        for file_ in files:
+            url_key = get_presigned_url_key(file_, oid)
+            presign_refresher.track(url_key, file_, oid, now)
+
+            cached = presigned_url_cache.get(url_key)
+            if cached and now < cached[1]:
+                urls[url_key] = cached[0]
+            else:
+                missing[url_key] = file_
+
+        if missing and self.presigned_urls is not None:
+            cursor = self.presigned_urls.find(
+                {"_id": {"$in": list(missing)}, "expireAt": {"$gt": now}}
+            )
+            async for res in cursor:
+                urls[res["_id"]] = res["url"]
+                presigned_url_cache.set(res["_id"], (res["url"], res["expireAt"]))
+                missing.pop(res["_id"], None)
+
+        if not missing:
+            return urls
+
+        exp = now + timedelta(seconds=self.presign_duration_seconds)
+        signed = await get_presigned_urls(
+            org,
+            list(missing.values()),
+            self.crawl_manager,
+            self.presign_duration_seconds,
+        )
+
+        for url_key, presigned_url in zip(missing, signed):
+            urls[url_key] = presigned_url
+            presigned_url_cache.set(url_key, (presigned_url, exp))
+
+        if self.presigned_urls is not None:
+            asyncio.create_task(
+                self.store_presigned_urls(
+                    [(url_key, urls[url_key]) for url_key in missing], exp
+                )
+            )
+
+        return urls
+
+    async def store_presigned_urls(self, urls: List[Tuple[str, str]], exp: datetime):
+        """Store presigned urls in presigned_urls collection"""
+        try:
+            await self.presigned_urls.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": url_key},
+                        {"$set": {"url": url, "expireAt": exp}},
+                        upsert=True,
+                    )
+                    for url_key, url in urls
+                ],
+                ordered=False,
             )
+        # pylint: disable=broad-exception-caught
+        except Exception as exc:
+            print("Error storing presigned urls", exc, flush=True)
+
+    async def invalidate_presigned_urls(self, url_keys: List[str]):
+        """Remove presigned urls from presigned url cache and collection"""
+        for url_key in url_keys:
+            presigned_url_cache.pop(url_key)
+
+        presign_refresher.untrack(url_keys)
 
-        if updates:
-            asyncio.create_task(self._update_presigned(updates))
+        if self.presigned_urls is None:
+            return
+
+        for inx in range(0, len(url_keys), PRESIGN_INVALIDATE_BATCH_SIZE):
+            batch = url_keys[inx : inx + PRESIGN_INVALIDATE_BATCH_SIZE]
+            await self.presigned_urls.delete_many({"_id": {"$in": batch}})
+
+    async def invalidate_org_presigned_urls(self, org: Organization):
+        """Remove presigned urls of all files in org, eg. when storage changes"""
+        cursor = self.crawls.find(
+            {"oid": org.id},
+            {
+                "files.filename": 1,
+                "files.hash": 1,
+                "files.size": 1,
+                "files.def_storage_name": 1,
+            },
+        )
 
-        # print("presigned", out_files)
+        url_keys = []
+        async for crawl in cursor:
+            for file_ in crawl.get("files") or []:
+                url_keys.append(get_presigned_url_key(CrawlFile(**file_), org.id))
 
-        return out_files
+        await self.invalidate_presigned_urls(url_keys)
 
-    async def _update_presigned(self, updates):
-        for update in updates:
-            await self.crawls.find_one_and_update(*update)
+    async def load_wacz_directories(
+        self, crawl_id: str, files: List[CrawlFile], org: Organization
+    ):
+        """Ensure WACZ directory is set on each file of crawl"""
+        await load_wacz_directories(
+            self.crawls, self.crawl_manager, crawl_id, files, org
+        )
 
     async def add_to_collection(
         self, crawl_ids: List[uuid.UUID], collection_id: uuid.UUID, org: Organization
@@ -346,7 +521,7 @@ class BaseCrawlOps:
             {"$pull": {"collections": collection_id}},
         )
 
-    # pylint: disable=too-many-branches
+    # pylint: disable=too-many-branches, too-many-statements
     async def list_all_base_crawls(
         self,
         org: Optional[Organization] = None,
@@ -361,8 +536,14 @@ class BaseCrawlOps:
         sort_direction: int = -1,
         cls_type: type[BaseCrawlOut] = BaseCrawlOut,
         type_=None,
+        cursor: Optional[str] = None,
+        count_total: Optional[str] = None,
     ):
-        """List crawls of all types from the db"""
+        """List crawls of all types from the db
+
+        If cursor is set (empty for first page), use keyset pagination and
+        return page info with next cursor instead of total"""
+        # pylint: disable=too-many-locals
         # Zero-index page for query
         page = page - 1
         skip = page * page_size
@@ -382,16 +563,16 @@ class BaseCrawlOps:
             # validated_states = [value for value in state if value in ALL_CRAWL_STATES]
             query["state"] = {"$in": states}
 
-        aggregate = [{"$match": query}]
-
         if name:
-            aggregate.extend([{"$match": {"name": name}}])
+            query["name"] = name
 
         if description:
-            aggregate.extend([{"$match": {"description": description}}])
+            query["description"] = description
 
         if collection_id:
-            aggregate.extend([{"$match": {"collections": {"$in": [collection_id]}}}])
+            query["collections"] = {"$in": [collection_id]}
+
+        aggregate = [{"$match": query}]
 
         if sort_by:
             if sort_by not in ("started", "finished"):
@@ -399,43 +580,65 @@ class BaseCrawlOps:
             if sort_direction not in (1, -1):
                 raise HTTPException(status_code=400, detail="invalid_sort_direction")
 
-            aggregate.extend([{"$sort": {sort_by: sort_direction}}])
+        # lookup only for returned page
+        page_stages = [
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "userid",
+                    "foreignField": "id",
+                    "as": "userName",
+                },
+            },
+            {"$set": {"userName": {"$arrayElemAt": ["$userName.name", 0]}}},
+        ]
+
+        page_info = None
+
+        if cursor is not None:
+            sort_keys = get_cursor_sort_keys(sort_by, sort_direction)
+
+            items, page_info = await get_cursor_paginated_items(
+                self.crawls,
+                aggregate,
+                page_stages,
+                sort_keys,
+                cursor,
+                page_size,
+                count_total,
+            )
 
-        aggregate.extend(
-            [
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "userid",
-                        "foreignField": "id",
-                        "as": "userName",
+        else:
+            if sort_by:
+                aggregate.extend([{"$sort": {sort_by: sort_direction}}])
+
+            aggregate.extend(
+                [
+                    {
+                        "$facet": {
+                            "items": [
+                                {"$skip": skip},
+                                {"$limit": page_size},
+                                *page_stages,
+                            ],
+                            "total": [{"$count": "count"}],
+                        }
                     },
-                },
-                {"$set": {"userName": {"$arrayElemAt": ["$userName.name", 0]}}},
-                {
-                    "$facet": {
-                        "items": [
-                            {"$skip": skip},
-                            {"$limit": page_size},
-                        ],
-                        "total": [{"$count": "count"}],
-                    }
-                },
-            ]
-        )
+                ]
+            )
 
-        # Get total
-        cursor = self.crawls.aggregate(aggregate)
-        results = await cursor.to_list(length=1)
-        result = results[0]
-        items = result["items"]
+            # Get total
+            results = await self.crawls.aggregate(aggregate).to_list(length=1)
+            result = results[0]
+            items = result["items"]
 
-        try:
-            total = int(result["total"][0]["count"])
-        except (IndexError, ValueError):
-            total = 0
+            try:
+                total = int(result["total"][0]["count"])
+            except (IndexError, ValueError):
+                total = 0
 
         crawls = []
+        crawl_files = []
         for res in items:
             files = None
             if res.get("files"):
@@ -443,13 +646,17 @@ class BaseCrawlOps:
                 del res["files"]
 
             crawl = cls_type.from_dict(res)
-            if hasattr(crawl, "resources"):
-                # pylint: disable=attribute-defined-outside-init
-                crawl.resources = await self._resolve_signed_urls(files, org, crawl.id)
-
             crawls.append(crawl)
+            crawl_files.append((crawl.id, files))
 
-        return crawls, total
+        # sign files of all crawls on page together
+        if crawls and hasattr(crawls[0], "resources"):
+            resources = await self._resolve_crawls_signed_urls(crawl_files, org)
+            for crawl, crawl_resources in zip(crawls, resources):
+                # pylint: disable=attribute-defined-outside-init
+                crawl.resources = crawl_resources
+
+        return crawls, page_info or total
 
     async def delete_crawls_all_types(
         self, delete_list: DeleteCrawlList, org: Optional[Organization] = None
@@ -463,6 +670,206 @@ class BaseCrawlOps:
         return {"deleted": True}
 
 
+# ============================================================================
+async def get_crawl_org_and_wacz_files(crawls, orgs, crawl_id: str):
+    """Return org and WACZ files of crawl, for finished crawl tasks run
+    outside of the api"""
+    crawl = await crawls.find_one({"_id": crawl_id})
+    if not crawl:
+        return None, []
+
+    org = Organization.from_dict(await orgs.find_one({"_id": crawl["oid"]}))
+
+    wacz_files = [
+        CrawlFile(**file_)
+        for file_ in crawl.get("files") or []
+        if file_["filename"].endswith(".wacz")
+    ]
+
+    return org, wacz_files
+
+
+# ============================================================================
+async def load_wacz_directories(
+    crawls, crawl_manager, crawl_id: str, files: List[CrawlFile], org: Organization
+):
+    """Ensure WACZ directory is set on each file of crawl, reading any missing
+    from storage concurrently and storing them for subsequent reads"""
+    missing = [file_ for file_ in files if file_.directory is None]
+    if not missing:
+        return
+
+    fetch_limit = asyncio.Semaphore(LOG_FETCH_CONCURRENCY)
+    directories = await asyncio.gather(
+        *[
+            get_wacz_directory(org, file_, crawl_manager, fetch_limit)
+            for file_ in missing
+        ]
+    )
+
+    updates = []
+    for file_, directory in zip(missing, directories):
+        file_.directory = directory
+        updates.append(
+            UpdateOne(
+                {"_id": crawl_id, "files.filename": file_.filename},
+                {
+                    "$set": {
+                        "files.$.directory": [member.dict() for member in directory]
+                    }
+                },
+            )
+        )
+
+    asyncio.create_task(store_wacz_directories(crawls, updates))
+
+
+async def store_wacz_directories(crawls, updates: List[UpdateOne]):
+    """Store WACZ directories read from storage on crawl files"""
+    try:
+        await crawls.bulk_write(updates, ordered=False)
+    # pylint: disable=broad-exception-caught
+    except Exception as exc:
+        print("Error storing WACZ directories", exc, flush=True)
+
+
+# ============================================================================
+class PresignRefresher:
+    """Re-sign urls of recently read crawl files in the background, in
+    batches, shortly before they expire, so that reads almost always find
+    a fresh url in the presigned url cache"""
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or presigned_url_cache.max_size
+
+        # url key -> (crawl file, org id, last read), least recently read first
+        self.files = OrderedDict()
+        self.task = None
+
+        self.refreshed = 0
+
+    def start(self, ops: BaseCrawlOps):
+        """Start refreshing in background, if not already started"""
+        if not self.task or self.task.done():
+            self.task = asyncio.create_task(self.run(ops))
+
+    async def stop(self):
+        """Stop refreshing, eg. on shutdown"""
+        if not self.task:
+            return
+
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+        self.task = None
+
+    def track(
+        self, url_key, crawl_file: CrawlFile, oid: Optional[UUID4], now: datetime
+    ):
+        """Record read of crawl file url"""
+        self.files[url_key] = (crawl_file, oid, now)
+        self.files.move_to_end(url_key)
+
+        while len(self.files) > self.max_size:
+            self.files.popitem(last=False)
+
+    def untrack(self, url_keys: List[str]):
+        """Stop refreshing urls, eg. when crawl files are deleted"""
+        for url_key in url_keys:
+            self.files.pop(url_key, None)
+
+    async def run(self, ops: BaseCrawlOps):
+        """Refresh expiring urls periodically"""
+        lifetime = ops.presign_duration_seconds
+        interval = min(
+            PRESIGN_REFRESH_INTERVAL_SECS,
+            max(int(lifetime * PRESIGN_REFRESH_FRACTION / 2), 1),
+        )
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(ops)
+            # pylint: disable=broad-exception-caught
+            except Exception as exc:
+                print("Error refreshing presigned urls", exc, flush=True)
+
+    async def refresh(self, ops: BaseCrawlOps):
+        """Re-sign urls of files read within the last url lifetime which
+        expire within refresh fraction of lifetime"""
+        now = dt_now()
+        lifetime = timedelta(seconds=ops.presign_duration_seconds)
+
+        self._evict_unread(now - lifetime)
+
+        by_org = self._get_expiring_by_org(now + lifetime * PRESIGN_REFRESH_FRACTION)
+
+        for oid, files in by_org.items():
+            # resolve current org, storage may have changed since read
+            org = None
+            if oid:
+                org_data = await ops.organizations.find_one({"_id": oid})
+                if not org_data:
+                    self.untrack(list(files))
+                    continue
+
+                org = Organization.from_dict(org_data)
+
+            url_keys = list(files)
+            for inx in range(0, len(url_keys), PRESIGN_REFRESH_BATCH_SIZE):
+                batch = url_keys[inx : inx + PRESIGN_REFRESH_BATCH_SIZE]
+                await self._refresh_batch(ops, org, batch, files)
+
+    def _evict_unread(self, read_after: datetime):
+        while self.files:
+            _, (_, _, last_read) = next(iter(self.files.items()))
+            if last_read > read_after:
+                break
+            self.files.popitem(last=False)
+
+    def _get_expiring_by_org(self, refresh_before: datetime):
+        by_org = {}
+        for url_key, (crawl_file, oid, _) in self.files.items():
+            cached = presigned_url_cache.peek(url_key)
+            if cached and cached[1] > refresh_before:
+                continue
+
+            by_org.setdefault(oid, {})[url_key] = crawl_file
+
+        return by_org
+
+    async def _refresh_batch(self, ops, org, url_keys, files):
+        exp = dt_now() + timedelta(seconds=ops.presign_duration_seconds)
+        urls = await get_presigned_urls(
+            org,
+            [files[url_key] for url_key in url_keys],
+            ops.crawl_manager,
+            ops.presign_duration_seconds,
+        )
+
+        for url_key, presigned_url in zip(url_keys, urls):
+            presigned_url_cache.set(url_key, (presigned_url, exp))
+
+        if ops.presigned_urls is not None:
+            await ops.store_presigned_urls(list(zip(url_keys, urls)), exp)
+
+        self.refreshed += len(url_keys)
+
+
+presign_refresher = PresignRefresher()
+
+
+# ============================================================================
+def get_presigned_url_key(crawl_file: CrawlFile, oid: Optional[UUID4]):
+    """Return key of presigned url for crawl file, by default storage name
+    and filename, or by org id and filename for org custom storage, as
+    custom storage filenames are not prefixed with org id"""
+    return f"{crawl_file.def_storage_name or oid}:{crawl_file.filename}"
+
+
 # ============================================================================
 def init_base_crawls_api(app, mdb, users, crawl_manager, orgs, user_dep):
     """base crawls api"""
@@ -476,7 +883,7 @@ def init_base_crawls_api(app, mdb, users, crawl_manager, orgs, user_dep):
     @app.get(
         "/orgs/{oid}/all-crawls",
         tags=["all-crawls"],
-        response_model=PaginatedResponseModel,
+        response_model=Union[PaginatedResponseModel, CursorPaginatedResponseModel],
     )
     async def list_all_base_crawls(
         org: Organization = Depends(org_viewer_dep),
@@ -489,6 +896,8 @@ def init_base_crawls_api(app, mdb, users, crawl_manager, orgs, user_dep):
         collectionId: Optional[UUID4] = None,
         sortBy: Optional[str] = "finished",
         sortDirection: Optional[int] = -1,
+        cursor: Optional[str] = None,
+        countTotal: Optional[str] = None,
     ):
         states = state.split(",") if state else None
         crawls, total = await ops.list_all_base_crawls(
@@ -502,7 +911,11 @@ def init_base_crawls_api(app, mdb, users, crawl_manager, orgs, user_dep):
             page=page,
             sort_by=sortBy,
             sort_direction=sortDirection,
+            cursor=cursor,
+            count_total=countTotal,
         )
+        if cursor is not None:
+            return cursor_paginated_format(crawls, total, pageSize)
         return paginated_format(crawls, total, page, pageSize)
 
     @app.get(
@@ -0,0 +1,388 @@
+"""
+URL lookup in WACZ CDXJ indexes, via ranged reads of ZipNum compressed blocks
+"""
+import bisect
+import gzip
+import json
+import os
+import re
+import zlib
+
+from contextlib import aclosing
+from typing import Optional
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from fastapi import HTTPException
+
+from .pagination import decode_cursor, encode_cursor
+from .utils import LRUCache, merge_sorted_async
+from .zip import RangeReader, gunzip_chunks, iter_member_chunks, split_lines
+
+
+# ============================================================================
+MATCH_TYPES = ("exact", "prefix")
+
+IDX_MEMBER = "indexes/index.idx"
+CDXJ_MEMBERS = ("indexes/index.cdxj", "indexes/index.cdx")
+CDXJ_GZ_MEMBERS = ("indexes/index.cdx.gz", "indexes/index.cdxj.gz")
+
+# parsed secondary indexes, by WACZ filename
+idx_cache = LRUCache(int(os.environ.get("CDX_IDX_CACHE_SIZE", 64)))
+
+# decompressed CDXJ blocks, by (WACZ filename, cdx member, block offset)
+block_cache = LRUCache(int(os.environ.get("CDX_BLOCK_CACHE_SIZE", 1024)))
+
+WWW_PREFIX = re.compile(r"^www\d*\.")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# number of CDXJ lines per compressed block, as used by pywb / py-wacz
+ZIPNUM_BLOCK_LINES = int(os.environ.get("CDX_ZIPNUM_BLOCK_LINES", 3000))
+
+# number of ZipNum blocks read at once when looking up matches
+CDX_LOOKUP_BLOCKS = int(os.environ.get("CDX_LOOKUP_BLOCKS", 4))
+
+# max number of captures returned by a lookup
+MAX_CDX_LOOKUP_LIMIT = 1000
+
+CDX_CURSOR_KEYS = [("urlkey", 1), ("timestamp", 1), ("skip", 1)]
+
+
+# ============================================================================
+def get_surt(url: str):
+    """Return SURT url key for url, as used for sorting CDXJ index lines:
+    lowercased, without scheme, fragment, www. or default port, with host parts
+    reversed and query args sorted, eg. 'com,example)/path?a=1&b=2'"""
+    parts = urlsplit(url.strip() if "://" in url else "http://" + url.strip())
+
+    host = WWW_PREFIX.sub("", (parts.hostname or "").strip("."))
+    if not re.match(r"^[\d.]+$", host):
+        host = ",".join(reversed(host.split(".")))
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+
+    if port and port != DEFAULT_PORTS.get(parts.scheme):
+        host += f":{port}"
+
+    surt = host + ")" + (parts.path or "/")
+    if parts.query:
+        surt += "?" + urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    return surt.lower()
+
+
+def match_url_key(url_key: str, search_key: str, match_type: str):
+    """Return true if CDXJ url key matches search key"""
+    if match_type == "prefix":
+        return url_key.startswith(search_key)
+
+    return url_key == search_key
+
+
+def parse_cdxj_line(line: bytes):
+    """Parse CDXJ line into url key, timestamp and json fields"""
+    url_key, timestamp, data = line.decode("utf-8").split(" ", 2)
+    return url_key, timestamp, json.loads(data)
+
+
+def get_cdxj_sort_key(line: bytes):
+    """Return url key and timestamp of CDXJ line, without parsing json"""
+    url_key, timestamp, _ = line.split(b" ", 2)
+    return url_key, timestamp
+
+
+def format_cdxj_line(url_key: str, timestamp: str, fields: dict):
+    """Serialize CDXJ line from url key, timestamp and json fields"""
+    return f"{url_key} {timestamp} {json.dumps(fields)}".encode("utf-8")
+
+
+# ============================================================================
+def decode_cdx_cursor(cursor: Optional[str]):
+    """Return (url key, timestamp) to continue lookup from, and number of
+    entries with that url key and timestamp already returned, from cursor"""
+    if not cursor:
+        return None, 0
+
+    url_key, timestamp, skip = decode_cursor(CDX_CURSOR_KEYS, cursor)
+    if (
+        not isinstance(url_key, str)
+        or not isinstance(timestamp, str)
+        or not isinstance(skip, int)
+    ):
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+
+    return (url_key, timestamp), skip
+
+
+async def search_cdx_entries(sources, limit=100, from_key=None, skip=0):
+    """Return fields of up to limit CDXJ entries, merged in url key and
+    timestamp order from sources of sorted (url key, timestamp, fields)
+    entries, and a token to continue after the last entry returned, if the
+    limit was reached. Sources are only read until the limit is reached"""
+    results = []
+    last_key = None
+    same_key_count = 0
+
+    entries = merge_sorted_async(sources, key=lambda entry: entry[:2])
+    async with aclosing(entries):
+        async for url_key, timestamp, fields in entries:
+            if (url_key, timestamp) == last_key:
+                same_key_count += 1
+            else:
+                last_key = (url_key, timestamp)
+                same_key_count = 1
+
+            # already returned with previous page
+            if last_key == from_key and same_key_count <= skip:
+                continue
+
+            results.append(fields)
+            if len(results) >= limit:
+                position = {
+                    "urlkey": url_key,
+                    "timestamp": timestamp,
+                    "skip": same_key_count,
+                }
+                return results, encode_cursor(CDX_CURSOR_KEYS, position)
+
+    return results, None
+
+
+# ============================================================================
+# pylint: disable=too-many-arguments
+async def iter_cdx_matches(
+    client, bucket, key, members, search_key, match_type, from_key=None
+):
+    """Yield matching CDXJ entries from WACZ as (url key, timestamp, fields),
+    in sorted order, starting at (url key, timestamp) from_key, if set.
+    Uses the ZipNum secondary index, if present, to read only the compressed
+    blocks which may contain matches, a few at a time, so that no more are
+    read once the consumer stops. Otherwise, scans the index from the start"""
+    members = {member.filename: member for member in members}
+
+    idx_member = members.get(IDX_MEMBER)
+    if idx_member:
+        entries = iter_zipnum_matches(
+            client, bucket, key, members, idx_member, search_key, match_type, from_key
+        )
+        async with aclosing(entries):
+            async for entry in entries:
+                yield entry
+        return
+
+    lines = iter_cdxj_lines(client, bucket, key, members.values())
+    async with aclosing(lines):
+        async for line in lines:
+            entry = parse_cdxj_line(line)
+            if match_url_key(entry[0], search_key, match_type):
+                if not from_key or entry[:2] >= from_key:
+                    yield entry
+            elif entry[0] > search_key and not entry[0].startswith(search_key):
+                # sorted, no more matches
+                break
+
+
+async def iter_cdxj_lines(client, bucket, key, members):
+    """Yield all lines of first CDXJ index found in WACZ, in sorted order,
+    streaming and decompressing the index member"""
+    members = {member.filename: member for member in members}
+
+    for name in CDXJ_MEMBERS + CDXJ_GZ_MEMBERS:
+        if name not in members:
+            continue
+
+        chunks = iter_member_chunks(client, bucket, key, members[name])
+        if name in CDXJ_GZ_MEMBERS:
+            chunks = gunzip_chunks(chunks)
+
+        async for line in split_lines(chunks):
+            if line.strip():
+                yield line
+
+        return
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+async def iter_zipnum_matches(
+    client, bucket, key, members, idx_member, search_key, match_type, from_key=None
+):
+    """Lookup search key via ZipNum secondary index. Each idx line has the
+    first url key of a gzip compressed block of CDXJ lines, and its location.
+    Blocks are read CDX_LOOKUP_BLOCKS at a time, as entries are consumed"""
+    index = idx_cache.get(key)
+    if index is None:
+        index = await load_zipnum_index(client, bucket, key, idx_member)
+        idx_cache.set(key, index)
+
+    url_keys, blocks = index
+
+    first_key = max(search_key, from_key[0]) if from_key else search_key
+
+    # block before first possible match may contain matches
+    start = max(bisect.bisect_left(url_keys, first_key) - 1, 0)
+    if match_type == "prefix":
+        end = bisect.bisect_right(url_keys, search_key + "\U0010ffff")
+    else:
+        end = bisect.bisect_right(url_keys, search_key)
+
+    for inx in range(start, end, CDX_LOOKUP_BLOCKS):
+        block_lines = await get_blocks(
+            client,
+            bucket,
+            key,
+            members,
+            blocks[inx : min(inx + CDX_LOOKUP_BLOCKS, end)],
+        )
+
+        for lines in block_lines:
+            for line in lines:
+                if not line.strip():
+                    continue
+
+                url_key, timestamp, data = line.decode("utf-8").split(" ", 2)
+                if not match_url_key(url_key, search_key, match_type):
+                    continue
+
+                if from_key and (url_key, timestamp) < from_key:
+                    continue
+
+                yield url_key, timestamp, json.loads(data)
+
+
+async def get_blocks(client, bucket, key, members, blocks):
+    """Return decompressed lines for each block, from cache if available.
+    Uncached blocks adjacent in the same file are read with a single request"""
+    block_lines = [block_cache.get((key, *block[:2])) for block in blocks]
+
+    # group runs of adjacent uncached blocks: (cdx name, offset, length, indexes)
+    ranges = []
+    for inx, (cdx_name, offset, length) in enumerate(blocks):
+        if block_lines[inx] is not None:
+            continue
+
+        if ranges and ranges[-1][0] == cdx_name:
+            _, prev_offset, prev_length, indexes = ranges[-1]
+            if prev_offset + prev_length == offset:
+                ranges[-1] = (cdx_name, prev_offset, prev_length + length, indexes)
+                indexes.append(inx)
+                continue
+
+        ranges.append((cdx_name, offset, length, [inx]))
+
+    reader = RangeReader(client, bucket, key)
+    for cdx_name, offset, length, indexes in ranges:
+        cdx_member = members.get(cdx_name)
+        if not cdx_member or cdx_member.dataOffset is None:
+            continue
+
+        data = await reader.read(cdx_member.dataOffset + offset, length)
+
+        for inx in indexes:
+            _, block_offset, block_length = blocks[inx]
+            block_start = block_offset - offset
+            lines = gunzip_block(
+                data[block_start : block_start + block_length]
+            ).splitlines()
+            block_cache.set((key, cdx_name, block_offset), lines)
+            block_lines[inx] = lines
+
+    return [lines for lines in block_lines if lines is not None]
+
+
+async def load_zipnum_index(client, bucket, key, idx_member):
+    """Load ZipNum secondary index into sorted url keys and block locations"""
+    url_keys = []
+    blocks = []
+    default_name = CDXJ_GZ_MEMBERS[0]
+
+    async for line in split_lines(iter_member_chunks(client, bucket, key, idx_member)):
+        line = line.decode("utf-8")
+        if not line.strip():
+            continue
+
+        if line.startswith("!meta"):
+            meta = json.loads(line.split(" ", 2)[2])
+            default_name = get_index_member_name(meta.get("filename"), default_name)
+            continue
+
+        url_key, _, data = line.split(" ", 2)
+        data = json.loads(data)
+
+        url_keys.append(url_key)
+        blocks.append(
+            (
+                get_index_member_name(data.get("filename"), default_name),
+                data["offset"],
+                data["length"],
+            )
+        )
+
+    return url_keys, blocks
+
+
+def get_index_member_name(filename, default_name):
+    """Return full member name for index file referenced from idx"""
+    if not filename:
+        return default_name
+
+    return filename if "/" in filename else "indexes/" + filename
+
+
+def gunzip_block(data: bytes):
+    """Decompress one or more concatenated gzip members"""
+    output = []
+    while data:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        output.append(decompressor.decompress(data))
+        data = decompressor.unused_data
+
+    return b"".join(output)
+
+
+# ============================================================================
+class ZipNumWriter:
+    """Write sorted CDXJ lines as ZipNum gzip compressed blocks, followed by
+    the secondary idx with first url key, offset and length of each block"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, block_lines=ZIPNUM_BLOCK_LINES):
+        self.block_lines = block_lines
+        self.idx_lines = []
+        self.cdx_length = 0
+        self.idx_length = 0
+        self.line_count = 0
+
+    async def iter_write(self, lines):
+        """Yield compressed blocks as lines are read, then the idx.
+        Only the current block and the idx are held in memory"""
+        block = []
+        async for line in lines:
+            block.append(line)
+            self.line_count += 1
+            if len(block) >= self.block_lines:
+                yield self._write_block(block)
+                block = []
+
+        if block:
+            yield self._write_block(block)
+
+        idx = b"".join(self.idx_lines)
+        self.idx_length = len(idx)
+        if idx:
+            yield idx
+
+    def _write_block(self, block):
+        data = gzip.compress(b"\n".join(block) + b"\n")
+
+        url_key, timestamp = get_cdxj_sort_key(block[0])
+        location = json.dumps({"offset": self.cdx_length, "length": len(data)})
+        self.idx_lines.append(
+            url_key + b" " + timestamp + b" " + location.encode("utf-8") + b"\n"
+        )
+
+        self.cdx_length += len(data)
+        return data
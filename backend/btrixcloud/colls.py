@@ -1,21 +1,47 @@
 """
 Collections API
 """
+import asyncio
 from collections import Counter
 from datetime import datetime
 import uuid
-from typing import Optional, List
+import zipfile
+from contextlib import aclosing
+from typing import Optional, List, Dict
 
 import pymongo
 from fastapi import Depends, HTTPException
 
 from pydantic import BaseModel, UUID4, Field
 
-from .basecrawls import BaseCrawlOutWithResources
+from .basecrawls import BaseCrawlOutWithResources, CrawlFile, load_wacz_directories
+from .cdx import (
+    CDXJ_GZ_MEMBERS,
+    IDX_MEMBER,
+    MATCH_TYPES,
+    MAX_CDX_LOOKUP_LIMIT,
+    ZipNumWriter,
+    decode_cdx_cursor,
+    format_cdxj_line,
+    get_cdxj_sort_key,
+    get_surt,
+    parse_cdxj_line,
+    search_cdx_entries,
+)
 from .crawls import CrawlFileOut, SUCCESSFUL_STATES
 from .db import BaseMongoModel
 from .orgs import Organization
 from .pagination import DEFAULT_PAGE_SIZE, paginated_format
+from .storages import (
+    delete_crawl_file_object,
+    do_upload_multipart,
+    iter_wacz_cdx,
+    iter_wacz_cdx_lines,
+    LOG_FETCH_CONCURRENCY,
+)
+from .uploads import MIN_UPLOAD_PART_SIZE
+from .utils import dt_now, merge_sorted_async
+from .zip import ZipMember
 
 
 # ============================================================================
@@ -34,6 +60,45 @@ class Collection(BaseMongoModel):
     tags: Optional[List[str]] = []
 
 
+# ============================================================================
+class CollIndex(BaseModel):
+    """Merged CDXJ index of all crawls in collection, stored as single object
+    of ZipNum compressed CDXJ blocks, followed by the secondary idx"""
+
+    # not set if index is empty
+    filename: Optional[str]
+    def_storage_name: Optional[str]
+
+    cdxLength: int
+    idxLength: int
+    lineCount: int
+
+    crawlIds: List[str] = []
+    updated: datetime
+
+    @property
+    def directory(self):
+        """index and idx locations, as WACZ directory members"""
+        return [
+            ZipMember(
+                filename=CDXJ_GZ_MEMBERS[0],
+                headerOffset=0,
+                compressSize=self.cdxLength,
+                fileSize=self.cdxLength,
+                compressType=zipfile.ZIP_STORED,
+                dataOffset=0,
+            ),
+            ZipMember(
+                filename=IDX_MEMBER,
+                headerOffset=self.cdxLength,
+                compressSize=self.idxLength,
+                fileSize=self.idxLength,
+                compressType=zipfile.ZIP_STORED,
+                dataOffset=self.cdxLength,
+            ),
+        ]
+
+
 # ============================================================================
 class CollIn(BaseModel):
     """Collection Passed in By User"""
@@ -79,6 +144,11 @@ class CollectionOps:
         self.crawl_manager = crawl_manager
         self.orgs = orgs
 
+        # running index update task by collection id, and those with
+        # membership changes while update is running
+        self.index_tasks = {}
+        self.index_pending = set()
+
     async def init_index(self):
         """init lookup index"""
         await self.collections.create_index(
@@ -116,6 +186,7 @@ class CollectionOps:
                 await update_collection_counts_and_tags(
                     self.collections, self.crawls, coll_id
                 )
+                self.schedule_index_update(coll_id, org)
 
             return {"added": True, "id": coll_id, "name": name}
         except pymongo.errors.DuplicateKeyError:
@@ -164,6 +235,7 @@ class CollectionOps:
             raise HTTPException(status_code=404, detail="collection_not_found")
 
         await update_collection_counts_and_tags(self.collections, self.crawls, coll_id)
+        self.schedule_index_update(coll_id, org)
 
         return await self.get_collection(coll_id, org)
 
@@ -182,6 +254,7 @@ class CollectionOps:
             raise HTTPException(status_code=404, detail="collection_not_found")
 
         await update_collection_counts_and_tags(self.collections, self.crawls, coll_id)
+        self.schedule_index_update(coll_id, org)
 
         return await self.get_collection(coll_id, org)
 
@@ -295,12 +368,341 @@ class CollectionOps:
         """Delete collection and remove from associated crawls."""
         await self.crawl_ops.remove_collection_from_all_crawls(coll_id)
 
-        result = await self.collections.delete_one({"_id": coll_id, "oid": org.id})
-        if result.deleted_count < 1:
+        result = await self.collections.find_one_and_delete(
+            {"_id": coll_id, "oid": org.id}
+        )
+        if not result:
             raise HTTPException(status_code=404, detail="collection_not_found")
 
+        if result.get("cdxIndex"):
+            await self.delete_index_file(CollIndex.parse_obj(result["cdxIndex"]), org)
+
         return {"success": True}
 
+    async def get_collection_wacz_files(self, coll_id: uuid.UUID, org: Organization):
+        """Return WACZ files of all successful crawls in collection, by crawl id"""
+        return await get_collection_wacz_files(self.crawls, coll_id, org)
+
+    async def get_collection_index(self, coll_id: uuid.UUID, org: Organization):
+        """Return stored merged CDXJ index for collection, if any"""
+        return await get_collection_index(self.collections, coll_id, org)
+
+    def schedule_index_update(self, coll_id: uuid.UUID, org: Organization):
+        """Update collection index in background. If already updating,
+        run again once done, to pick up any membership changes since"""
+        if coll_id in self.index_tasks:
+            self.index_pending.add(coll_id)
+            return
+
+        self.index_tasks[coll_id] = asyncio.create_task(
+            self._run_index_updates(coll_id, org)
+        )
+
+    async def _run_index_updates(self, coll_id: uuid.UUID, org: Organization):
+        try:
+            while True:
+                self.index_pending.discard(coll_id)
+                try:
+                    await self.update_collection_index(coll_id, org)
+                # pylint: disable=broad-exception-caught
+                except Exception as exc:
+                    print(f"Collection index update failed: {coll_id}", exc, flush=True)
+
+                if coll_id not in self.index_pending:
+                    break
+        finally:
+            self.index_tasks.pop(coll_id, None)
+
+    async def update_collection_index(self, coll_id: uuid.UUID, org: Organization):
+        """Build merged CDXJ index for collection, if crawls have changed"""
+        await update_collection_index(
+            self.collections, self.crawls, self.crawl_manager, coll_id, org
+        )
+
+    async def delete_index_file(self, index: CollIndex, org: Organization):
+        """Delete collection index file from storage"""
+        await delete_index_file(index, org, self.crawl_manager)
+
+    # pylint: disable=too-many-locals
+    async def lookup_cdx(
+        self,
+        coll_id: uuid.UUID,
+        org: Organization,
+        url: str,
+        match_type: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        """Return up to limit captures of url, or urls with url as prefix, from
+        all crawls in collection, sorted by url key and timestamp, and a token
+        to continue after the last capture returned. Uses the merged
+        collection index, if built, with crawls not yet in the index looked
+        up in their own WACZ files, and an index update scheduled for them"""
+        if match_type not in MATCH_TYPES:
+            raise HTTPException(status_code=400, detail="invalid_match_type")
+
+        from_key, skip = decode_cdx_cursor(cursor)
+
+        index = await self.get_collection_index(coll_id, org)
+        crawl_files = await self.get_collection_wacz_files(coll_id, org)
+        search_key = get_surt(url)
+
+        sources = []
+        indexed = set()
+        if index:
+            indexed = set(index.crawlIds)
+            if index.filename:
+                sources.append(
+                    filter_cdx_entries(
+                        iter_wacz_cdx(
+                            org,
+                            index,
+                            self.crawl_manager,
+                            search_key,
+                            match_type,
+                            from_key,
+                        ),
+                        crawl_files,
+                    )
+                )
+
+        not_indexed = [crawl_id for crawl_id in crawl_files if crawl_id not in indexed]
+
+        for crawl_id in not_indexed:
+            sources.extend(
+                await self.crawl_ops.get_cdx_sources(
+                    crawl_id,
+                    crawl_files[crawl_id],
+                    org,
+                    search_key,
+                    match_type,
+                    from_key,
+                    {"crawlId": crawl_id},
+                )
+            )
+
+        if not_indexed or indexed - set(crawl_files):
+            self.schedule_index_update(coll_id, org)
+
+        items, next_cursor = await search_cdx_entries(
+            sources, min(max(limit, 1), MAX_CDX_LOOKUP_LIMIT), from_key, skip
+        )
+
+        return {"items": items, "next": next_cursor}
+
+
+# ============================================================================
+async def get_collection_wacz_files(crawls, coll_id: uuid.UUID, org: Organization):
+    """Return WACZ files of all successful crawls in collection, by crawl id"""
+    cursor = crawls.find(
+        {
+            "collections": coll_id,
+            "oid": org.id,
+            "state": {"$in": SUCCESSFUL_STATES},
+        },
+        projection=["files"],
+    )
+
+    crawl_files = {}
+    async for crawl in cursor:
+        crawl_files[crawl["_id"]] = [
+            CrawlFile(**file_)
+            for file_ in crawl.get("files") or []
+            if file_["filename"].endswith(".wacz")
+        ]
+
+    return crawl_files
+
+
+async def get_collection_index(collections, coll_id: uuid.UUID, org: Organization):
+    """Return stored merged CDXJ index for collection, if any"""
+    result = await collections.find_one(
+        {"_id": coll_id, "oid": org.id}, projection=["cdxIndex"]
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="collection_not_found")
+
+    if not result.get("cdxIndex"):
+        return None
+
+    return CollIndex.parse_obj(result["cdxIndex"])
+
+
+# pylint: disable=too-many-locals
+async def update_collection_index(
+    collections, crawls, crawl_manager, coll_id: uuid.UUID, org: Organization
+):
+    """Build merged CDXJ index for all crawls in collection, if crawls
+    have changed since the stored index was built.
+
+    Lines for crawls still in the collection are streamed from the stored
+    index, so only the indexes of newly added crawls are read from their
+    WACZ files. All sources are k-way merged as they are streamed and
+    compressed blocks are uploaded as they are written, so memory use is
+    bounded by the number of sources, not by the size of the index.
+    If there are no lines, an empty index is stored, without uploading"""
+    try:
+        prev_index = await get_collection_index(collections, coll_id, org)
+    except HTTPException:
+        # collection deleted
+        return
+
+    crawl_files = await get_collection_wacz_files(crawls, coll_id, org)
+
+    indexed = set(prev_index.crawlIds) if prev_index else set()
+    added = [crawl_id for crawl_id in crawl_files if crawl_id not in indexed]
+    removed = indexed - set(crawl_files)
+
+    if not added and not removed:
+        return
+
+    if not crawl_files:
+        await save_collection_index(
+            collections, crawl_manager, coll_id, org, prev_index, None
+        )
+        return
+
+    fetch_limit = asyncio.Semaphore(LOG_FETCH_CONCURRENCY)
+    sources = []
+
+    if prev_index and prev_index.filename and indexed - removed:
+        sources.append(
+            filter_cdxj_lines(
+                iter_wacz_cdx_lines(org, prev_index, crawl_manager, fetch_limit),
+                removed,
+            )
+        )
+
+    for crawl_id in added:
+        await load_wacz_directories(
+            crawls, crawl_manager, crawl_id, crawl_files[crawl_id], org
+        )
+        for wacz_file in crawl_files[crawl_id]:
+            lines = iter_wacz_cdx_lines(org, wacz_file, crawl_manager, fetch_limit)
+            extra = {"crawlId": crawl_id, "wacz": wacz_file.filename}
+            sources.append(annotate_cdxj_lines(lines, extra))
+
+    print(
+        f"Collection index update: {coll_id}, "
+        + f"{len(added)} added, {len(removed)} removed crawls",
+        flush=True,
+    )
+
+    lines = merge_sorted_async(sources, key=get_cdxj_sort_key)
+    first_line = await anext(lines, None)
+
+    if first_line is None:
+        index = CollIndex(
+            filename=None,
+            def_storage_name=None,
+            cdxLength=0,
+            idxLength=0,
+            lineCount=0,
+            crawlIds=list(crawl_files),
+            updated=dt_now(),
+        )
+        await save_collection_index(
+            collections, crawl_manager, coll_id, org, prev_index, index
+        )
+        return
+
+    writer = ZipNumWriter()
+    filename = f"{org.id}/collections/{coll_id}/index-{uuid.uuid4()}.cdxj.zipnum"
+
+    if not await do_upload_multipart(
+        org,
+        filename,
+        writer.iter_write(prepend_line(first_line, lines)),
+        MIN_UPLOAD_PART_SIZE,
+        crawl_manager,
+    ):
+        print(f"Collection index upload failed: {coll_id}", flush=True)
+        return
+
+    index = CollIndex(
+        filename=filename,
+        def_storage_name=None if org.storage.type == "s3" else "default",
+        cdxLength=writer.cdx_length,
+        idxLength=writer.idx_length,
+        lineCount=writer.line_count,
+        crawlIds=list(crawl_files),
+        updated=dt_now(),
+    )
+
+    await save_collection_index(
+        collections, crawl_manager, coll_id, org, prev_index, index
+    )
+
+
+# pylint: disable=too-many-arguments
+async def save_collection_index(
+    collections,
+    crawl_manager,
+    coll_id: uuid.UUID,
+    org: Organization,
+    prev_index: Optional[CollIndex],
+    index: Optional[CollIndex],
+):
+    """Replace stored index, unless it has already been replaced by
+    another update, and delete the no longer used index file"""
+    query = {
+        "_id": coll_id,
+        "cdxIndex.filename": prev_index.filename if prev_index else None,
+    }
+    if index:
+        update = {"$set": {"cdxIndex": index.dict()}}
+    else:
+        update = {"$unset": {"cdxIndex": ""}}
+
+    result = await collections.find_one_and_update(query, update)
+
+    unused = prev_index if result else index
+    if unused:
+        await delete_index_file(unused, org, crawl_manager)
+
+
+async def delete_index_file(index: CollIndex, org: Organization, crawl_manager):
+    """Delete collection index file from storage, if any"""
+    if not index.filename:
+        return
+
+    try:
+        await delete_crawl_file_object(org, index, crawl_manager)
+    # pylint: disable=broad-exception-caught
+    except Exception as exc:
+        print(f"Collection index deletion failed: {index.filename}", exc)
+
+
+# ============================================================================
+async def annotate_cdxj_lines(lines, extra: Dict[str, str]):
+    """Add extra fields to json of each CDXJ line"""
+    async for line in lines:
+        url_key, timestamp, fields = parse_cdxj_line(line)
+        fields.update(extra)
+        yield format_cdxj_line(url_key, timestamp, fields)
+
+
+async def filter_cdxj_lines(lines, crawl_ids):
+    """Skip CDXJ lines from any of crawl_ids"""
+    async for line in lines:
+        if not crawl_ids or parse_cdxj_line(line)[2].get("crawlId") not in crawl_ids:
+            yield line
+
+
+async def prepend_line(line, lines):
+    """Yield line, followed by lines"""
+    yield line
+    async for next_line in lines:
+        yield next_line
+
+
+async def filter_cdx_entries(entries, crawl_ids):
+    """Yield only parsed CDXJ entries from any of crawl_ids"""
+    async with aclosing(entries):
+        async for entry in entries:
+            if entry[2].get("crawlId") in crawl_ids:
+                yield entry
+
 
 # ============================================================================
 async def update_collection_counts_and_tags(
@@ -346,10 +748,12 @@ async def update_crawl_collections(collections, crawls, crawl_id: str):
 
 
 # ============================================================================
+# pylint: disable=too-many-arguments
 async def add_successful_crawl_to_collections(
-    crawls, crawl_configs, collections, crawl_id: str, cid: uuid.UUID
+    crawls, crawl_configs, collections, orgs, crawl_manager, crawl_id, cid
 ):
-    """Add successful crawl to its auto-add collections."""
+    """Add successful crawl to its auto-add collections, and update their
+    merged indexes to include it"""
     workflow = await crawl_configs.find_one({"_id": cid})
     auto_add_collections = workflow.get("autoAddCollections")
     if auto_add_collections:
@@ -359,6 +763,16 @@ async def add_successful_crawl_to_collections(
         )
         await update_crawl_collections(collections, crawls, crawl_id)
 
+        org = Organization.from_dict(await orgs.find_one({"_id": workflow["oid"]}))
+        for coll_id in auto_add_collections:
+            try:
+                await update_collection_index(
+                    collections, crawls, crawl_manager, coll_id, org
+                )
+            # pylint: disable=broad-exception-caught
+            except Exception as exc:
+                print(f"Collection index update failed: {coll_id}", exc, flush=True)
+
 
 # ============================================================================
 # pylint: disable=too-many-locals
@@ -485,6 +899,17 @@ def init_collections_api(app, mdb, crawls, orgs, crawl_manager):
             coll_id, crawlList.crawlIds, org
         )
 
+    @app.get("/orgs/{oid}/collections/{coll_id}/cdx", tags=["collections"])
+    async def lookup_collection_cdx(
+        coll_id: uuid.UUID,
+        url: str,
+        matchType: str = "exact",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        org: Organization = Depends(org_viewer_dep),
+    ):
+        return await colls.lookup_cdx(coll_id, org, url, matchType, limit, cursor)
+
     @app.delete(
         "/orgs/{oid}/collections/{coll_id}",
         tags=["collections"],
@@ -17,7 +17,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 
 from .users import User
 from .orgs import Organization, MAX_CRAWL_SCALE
-from .pagination import DEFAULT_PAGE_SIZE, paginated_format
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    paginated_format,
+    cursor_paginated_format,
+    get_cursor_sort_keys,
+    get_cursor_paginated_items,
+)
 
 from .db import BaseMongoModel
 
@@ -200,6 +206,12 @@ class CrawlConfig(CrawlConfigCore):
         """serialize config for browsertrix-crawler"""
         return self.config.dict(exclude_unset=True, exclude_none=True)
 
+    def get_first_seed_url(self):
+        """return url of first seed, if any"""
+        if self.config.seeds:
+            return str(self.config.seeds[0].url)
+        return None
+
 
 # ============================================================================
 class CrawlConfigOut(CrawlConfig):
@@ -287,6 +299,14 @@ class CrawlConfigOps:
             [("lastRun", pymongo.DESCENDING), ("modified", pymongo.DESCENDING)]
         )
 
+        await self.crawl_configs.create_index(
+            [
+                ("oid", pymongo.ASCENDING),
+                ("modified", pymongo.DESCENDING),
+                ("_id", pymongo.DESCENDING),
+            ]
+        )
+
         await self.config_revs.create_index([("cid", pymongo.HASHED)])
 
         await self.config_revs.create_index(
@@ -459,6 +479,18 @@ class CrawlConfigOps:
                 status_code=404, detail=f"Crawl Config '{cid}' not found"
             )
 
+        # keep workflow name and description denormalized on its crawls in sync
+        if "name" in query or "description" in query:
+            await self.crawls.update_many(
+                {"cid": cid, "type": "crawl"},
+                {
+                    "$set": {
+                        "name": result.get("name"),
+                        "description": result.get("description"),
+                    }
+                },
+            )
+
         # update in crawl manager if config, schedule, scale or crawlTimeout changed
         if changed:
             crawlconfig = CrawlConfig.from_dict(result)
@@ -493,9 +525,14 @@ class CrawlConfigOps:
         schedule: Optional[bool] = None,
         sort_by: str = "lastRun",
         sort_direction: int = -1,
+        cursor: Optional[str] = None,
+        count_total: Optional[str] = None,
     ):
-        """Get all crawl configs for an organization is a member of"""
-        # pylint: disable=too-many-locals,too-many-branches
+        """Get all crawl configs for an organization is a member of
+
+        If cursor is set (empty for first page), use keyset pagination and
+        return page info with next cursor instead of total"""
+        # pylint: disable=too-many-locals,too-many-branches,too-many-statements
         # Zero-index page for query
         page = page - 1
         skip = page * page_size
@@ -535,6 +572,9 @@ class CrawlConfigOps:
         if first_seed:
             aggregate.extend([{"$match": {"firstSeed": first_seed}}])
 
+        sort_keys = None
+        secondary_keys = ()
+
         if sort_by:
             if sort_by not in (
                 "created",
@@ -548,8 +588,6 @@ class CrawlConfigOps:
             if sort_direction not in (1, -1):
                 raise HTTPException(status_code=400, detail="invalid_sort_direction")
 
-            sort_query = {sort_by: sort_direction}
-
             # Add modified as final sort key to give some order to workflows that
             # haven't been run yet.
             if sort_by in (
@@ -558,70 +596,89 @@ class CrawlConfigOps:
                 "lastCrawlStartTime",
                 "lastRun",
             ):
-                sort_query = {sort_by: sort_direction, "modified": sort_direction}
-
-            aggregate.extend([{"$sort": sort_query}])
-
-        aggregate.extend(
-            [
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "createdBy",
-                        "foreignField": "id",
-                        "as": "userName",
-                    },
-                },
-                {"$set": {"createdByName": {"$arrayElemAt": ["$userName.name", 0]}}},
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "lastStartedBy",
-                        "foreignField": "id",
-                        "as": "startedName",
-                    },
+                secondary_keys = ("modified",)
+
+            sort_keys = [(sort_by, sort_direction)]
+            sort_keys.extend((key, sort_direction) for key in secondary_keys)
+
+        # lookup only for returned page
+        page_stages = [
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "createdBy",
+                    "foreignField": "id",
+                    "as": "userName",
                 },
-                {
-                    "$set": {
-                        "lastStartedByName": {"$arrayElemAt": ["$startedName.name", 0]}
-                    }
+            },
+            {"$set": {"createdByName": {"$arrayElemAt": ["$userName.name", 0]}}},
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "lastStartedBy",
+                    "foreignField": "id",
+                    "as": "startedName",
                 },
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "modifiedBy",
-                        "foreignField": "id",
-                        "as": "modifiedUserName",
-                    },
+            },
+            {"$set": {"lastStartedByName": {"$arrayElemAt": ["$startedName.name", 0]}}},
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "modifiedBy",
+                    "foreignField": "id",
+                    "as": "modifiedUserName",
                 },
-                {
-                    "$set": {
-                        "modifiedByName": {
-                            "$arrayElemAt": ["$modifiedUserName.name", 0]
+            },
+            {
+                "$set": {
+                    "modifiedByName": {"$arrayElemAt": ["$modifiedUserName.name", 0]}
+                }
+            },
+        ]
+
+        page_info = None
+
+        if cursor is not None:
+            sort_keys = get_cursor_sort_keys(sort_by, sort_direction, secondary_keys)
+
+            items, page_info = await get_cursor_paginated_items(
+                self.crawl_configs,
+                aggregate,
+                page_stages,
+                sort_keys,
+                cursor,
+                page_size,
+                count_total,
+            )
+
+        else:
+            if sort_keys:
+                aggregate.extend([{"$sort": dict(sort_keys)}])
+
+            aggregate.extend(
+                [
+                    {
+                        "$facet": {
+                            "items": [
+                                {"$skip": skip},
+                                {"$limit": page_size},
+                                *page_stages,
+                            ],
+                            "total": [{"$count": "count"}],
                         }
-                    }
-                },
-                {
-                    "$facet": {
-                        "items": [
-                            {"$skip": skip},
-                            {"$limit": page_size},
-                        ],
-                        "total": [{"$count": "count"}],
-                    }
-                },
-            ]
-        )
+                    },
+                ]
+            )
 
-        cursor = self.crawl_configs.aggregate(aggregate)
-        results = await cursor.to_list(length=1)
-        result = results[0]
-        items = result["items"]
+            cursor = self.crawl_configs.aggregate(aggregate)
+            results = await cursor.to_list(length=1)
+            result = results[0]
+            items = result["items"]
 
-        try:
-            total = int(result["total"][0]["count"])
-        except (IndexError, ValueError):
-            total = 0
+            try:
+                total = int(result["total"][0]["count"])
+            except (IndexError, ValueError):
+                total = 0
 
         configs = []
         for res in items:
@@ -631,7 +688,7 @@ class CrawlConfigOps:
                 self._add_curr_crawl_stats(config, await self.get_running_crawl(config))
             configs.append(config)
 
-        return configs, total
+        return configs, page_info or total
 
     async def get_crawl_config_ids_for_profile(
         self, profileid: uuid.UUID, org: Optional[Organization] = None
@@ -730,6 +787,25 @@ class CrawlConfigOps:
             self.crawl_configs, cid, oid, active_only, config_cls
         )
 
+    async def get_crawl_configs_by_ids(
+        self,
+        cids: List[uuid.UUID],
+        org: Optional[Organization],
+        config_cls=CrawlConfig,
+    ):
+        """Get dict of crawl configs by id for all given ids, including inactive"""
+        if not cids:
+            return {}
+
+        query = {"_id": {"$in": cids}}
+        if org:
+            query["oid"] = org.id
+
+        cursor = self.crawl_configs.find(query)
+        results = await cursor.to_list(length=len(cids))
+        configs = [config_cls.from_dict(res) for res in results]
+        return {config.id: config for config in configs}
+
     async def get_crawl_config_revs(
         self, cid: uuid.UUID, page_size: int = DEFAULT_PAGE_SIZE, page: int = 1
     ):
@@ -1088,6 +1164,8 @@ def init_crawl_config_api(
         schedule: Optional[bool] = None,
         sortBy: str = None,
         sortDirection: int = -1,
+        cursor: Optional[str] = None,
+        countTotal: Optional[str] = None,
     ):
         # pylint: disable=duplicate-code
         if firstSeed:
@@ -1112,7 +1190,11 @@ def init_crawl_config_api(
             page=page,
             sort_by=sortBy,
             sort_direction=sortDirection,
+            cursor=cursor,
+            count_total=countTotal,
         )
+        if cursor is not None:
+            return cursor_paginated_format(crawl_configs, total, pageSize)
         return paginated_format(crawl_configs, total, page, pageSize)
 
     @router.get("/tags")
@@ -0,0 +1,496 @@
+"""
+Merged crawl logs: logs from all WACZ files of a finished crawl, merged in
+timestamp order into a single object of gzip compressed blocks of log lines,
+followed by a block index used to read only the blocks matching log filters
+"""
+import asyncio
+import gzip
+import json
+import os
+import re
+from collections import Counter
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from .basecrawls import CrawlLogFile, CrawlLogStats, get_crawl_org_and_wacz_files
+from .pagination import decode_cursor, encode_cursor
+from .storages import (
+    do_upload_multipart,
+    get_crawl_file_client,
+    get_wacz_logs,
+    LOG_FETCH_CONCURRENCY,
+)
+from .uploads import MIN_UPLOAD_PART_SIZE
+from .utils import LRUCache, merge_sorted_async, prefetch_async
+from .zip import (
+    fetch,
+    fetch_chunks,
+    get_log_line_timestamp,
+    gunzip_chunks,
+    split_lines,
+)
+
+
+# number of log lines per compressed block
+LOG_BLOCK_LINES = int(os.environ.get("LOG_BLOCK_LINES", 1000))
+
+# max lines returned by log search
+MAX_LOG_SEARCH_LIMIT = 1000
+
+LOG_SEARCH_CURSOR_KEYS = [("timestamp", 1), ("skip", 1)]
+
+# log levels counted as errors in log stats
+ERROR_LOG_LEVELS = ("error", "fatal")
+
+STATS_KEY_RX = re.compile(r"^\w+$")
+
+# parsed block indexes, by log filename and index offset
+log_index_cache = LRUCache(int(os.environ.get("LOG_INDEX_CACHE_SIZE", 64)))
+
+
+# ============================================================================
+class LogBlock(BaseModel):
+    """Compressed block of log lines, with counts of lines by level and context"""
+
+    timestamp: str
+    offset: int
+    length: int
+
+    logLevels: dict = {}
+    contexts: dict = {}
+
+    def matches(self, log_levels: List[str], contexts: List[str]):
+        """Return true if block may contain lines matching filters"""
+        if log_levels and not any(self.logLevels.get(level) for level in log_levels):
+            return False
+
+        if contexts and not any(self.contexts.get(context) for context in contexts):
+            return False
+
+        return True
+
+
+# ============================================================================
+class LogLineFilter:
+    """Filter raw JSON log lines by log level and context, without parsing
+    most lines. The value of each field is sliced out of the line after its
+    "key":"value" byte pattern, as written by the crawler. Lines where this
+    is ambiguous, such as the key not being found in that form, being found
+    more than once in either form, possibly being nested, or having an escaped
+    value, are parsed instead"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, log_levels: List[str], contexts: List[str]):
+        self.fields = []
+        for field, values in (("logLevel", log_levels), ("context", contexts)):
+            if not values:
+                continue
+
+            value_bytes = {
+                json.dumps(value, ensure_ascii=False)[1:-1].encode("utf-8")
+                for value in values
+            }
+            markers = (f'"{field}":"'.encode("utf-8"), f'"{field}": "'.encode("utf-8"))
+            self.fields.append((field, values, value_bytes, markers))
+
+    def matches(self, line: bytes):
+        """Return true if top-level log level and context of line match"""
+        for _, _, value_bytes, markers in self.fields:
+            found = self._match_bytes(line, value_bytes, markers)
+            if found is None:
+                return self._match_parsed(line)
+            if not found:
+                return False
+
+        return True
+
+    @staticmethod
+    def _match_bytes(line, value_bytes, markers):
+        found = []
+        for marker in markers:
+            start = line.find(marker)
+            if start != -1:
+                found.append((start, marker))
+                if line.find(marker, start + len(marker)) != -1:
+                    return None
+
+        if len(found) != 1:
+            return None
+
+        start, marker = found[0]
+
+        # only top-level if no object or array is opened before key
+        if line.find(b"{", 1, start) != -1 or line.find(b"[", 0, start) != -1:
+            return None
+
+        start += len(marker)
+        end = line.find(b'"', start)
+        if end == -1:
+            return None
+
+        value = line[start:end]
+        if b"\\" in value:
+            return None
+
+        return value in value_bytes
+
+    def _match_parsed(self, line):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return False
+
+        if not isinstance(entry, dict):
+            return False
+
+        return all(entry.get(field) in values for field, values, _, _ in self.fields)
+
+
+# ============================================================================
+class LogStatsCounter:
+    """Count parsed log entries by log level and context, keeping first and
+    last error entries"""
+
+    def __init__(self):
+        self.log_levels = Counter()
+        self.contexts = Counter()
+        self.first_error = None
+        self.last_error = None
+
+    def add(self, entry: dict):
+        """Add parsed log entry to counts"""
+        log_level = entry.get("logLevel")
+        context = entry.get("context")
+
+        # skip keys which can't be stored or queried as mongo fields
+        if is_stats_key(log_level):
+            self.log_levels[log_level] += 1
+        if is_stats_key(context):
+            self.contexts[context] += 1
+
+        if log_level in ERROR_LOG_LEVELS:
+            if not self.first_error:
+                self.first_error = entry
+            self.last_error = entry
+
+    def add_lines(self, lines):
+        """Add raw JSON log lines to counts, skipping invalid lines"""
+        for line in lines:
+            try:
+                self.add(json.loads(line))
+            except (json.JSONDecodeError, AttributeError):
+                continue
+
+    def get_stats(self):
+        """Return log stats for crawl"""
+        return CrawlLogStats(
+            logLevels=dict(self.log_levels),
+            contexts=dict(self.contexts),
+            firstError=self.first_error,
+            lastError=self.last_error,
+        )
+
+
+def is_stats_key(value):
+    """Return true if value is a valid log stats key"""
+    return isinstance(value, str) and bool(STATS_KEY_RX.match(value))
+
+
+# ============================================================================
+class LogBlockWriter:
+    """Write JSON log lines, already in timestamp order, as gzip compressed
+    blocks, followed by the JSON lines block index"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, block_lines=LOG_BLOCK_LINES):
+        self.block_lines = block_lines
+        self.blocks = []
+        self.offset = 0
+        self.index_length = 0
+        self.line_count = 0
+        self.stats = LogStatsCounter()
+
+    async def iter_write(self, lines):
+        """Yield compressed blocks as raw JSON lines are read, then the index.
+        Only the current block and the index are held in memory"""
+        block = []
+        timestamp = None
+        log_levels = Counter()
+        contexts = Counter()
+
+        async for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as err:
+                print(f"Error decoding json-l line: {line}. Error: {err}", flush=True)
+                continue
+
+            if not isinstance(entry, dict):
+                print(f"Skipping json-l line, not an object: {line}", flush=True)
+                continue
+
+            if not block:
+                timestamp = entry.get("timestamp", "")
+
+            block.append(line)
+            self.stats.add(entry)
+            log_levels[entry.get("logLevel")] += 1
+            contexts[entry.get("context")] += 1
+            self.line_count += 1
+
+            if len(block) >= self.block_lines:
+                yield self._write_block(block, timestamp, log_levels, contexts)
+                block = []
+                log_levels = Counter()
+                contexts = Counter()
+
+        if block:
+            yield self._write_block(block, timestamp, log_levels, contexts)
+
+        index = "".join(log_block.json() + "\n" for log_block in self.blocks)
+        index = index.encode("utf-8")
+        self.index_length = len(index)
+        yield index
+
+    def _write_block(self, block, timestamp, log_levels, contexts):
+        data = gzip.compress(b"\n".join(block) + b"\n")
+
+        self.blocks.append(
+            LogBlock(
+                timestamp=timestamp,
+                offset=self.offset,
+                length=len(data),
+                logLevels=dict(log_levels),
+                contexts=dict(contexts),
+            )
+        )
+
+        self.offset += len(data)
+        return data
+
+
+# ============================================================================
+async def add_crawl_log_file(crawls, orgs, crawl_manager, crawl_id: str):
+    """Merge logs from all WACZ files of finished crawl into a single
+    compressed log file, streaming logs and uploading blocks as written"""
+    try:
+        org, wacz_files = await get_crawl_org_and_wacz_files(crawls, orgs, crawl_id)
+        if not wacz_files:
+            return
+
+        fetch_limit = asyncio.Semaphore(LOG_FETCH_CONCURRENCY)
+        logs = [
+            get_wacz_logs(org, wacz_file, crawl_manager, fetch_limit, raw=True)
+            for wacz_file in wacz_files
+        ]
+
+        writer = LogBlockWriter()
+        filename = f"{org.id}/logs/{crawl_id}.log.gz"
+
+        if not await do_upload_multipart(
+            org,
+            filename,
+            writer.iter_write(merge_sorted_async(logs, key=get_log_line_timestamp)),
+            MIN_UPLOAD_PART_SIZE,
+            crawl_manager,
+        ):
+            print(f"Crawl log file upload failed: {crawl_id}", flush=True)
+            return
+
+        log_file = CrawlLogFile(
+            filename=filename,
+            def_storage_name=None if org.storage.type == "s3" else "default",
+            size=writer.offset + writer.index_length,
+            indexOffset=writer.offset,
+            lineCount=writer.line_count,
+        )
+
+        await crawls.find_one_and_update(
+            {"_id": crawl_id},
+            {
+                "$set": {
+                    "logFile": log_file.dict(),
+                    "logStats": writer.stats.get_stats().dict(),
+                }
+            },
+        )
+
+        print(
+            f"Crawl log file added: {crawl_id}, {writer.line_count} lines", flush=True
+        )
+
+    # pylint: disable=broad-exception-caught
+    except Exception as exc:
+        print(f"Error adding log file for crawl {crawl_id}", exc, flush=True)
+
+
+# ============================================================================
+# pylint: disable=too-many-arguments, too-many-locals
+async def get_crawl_log_chunks(
+    org,
+    log_file: CrawlLogFile,
+    crawl_manager,
+    log_levels=None,
+    contexts=None,
+    start=None,
+    end=None,
+):
+    """Yield decompressed data from merged crawl log file, reading only the
+    blocks which may contain lines matching log level and context filters,
+    and log timestamps between start and end, if set"""
+    async with get_crawl_file_client(org, log_file, crawl_manager) as (
+        client,
+        bucket,
+        key,
+    ):
+        blocks = await load_log_index(client, bucket, key, log_file)
+
+        ranges = get_log_block_ranges(blocks, log_levels, contexts, start, end)
+
+        for offset, length in ranges:
+            chunks = prefetch_async(fetch_chunks(client, bucket, key, offset, length))
+            async for chunk in gunzip_chunks(chunks):
+                if chunk:
+                    yield chunk
+
+
+# pylint: disable=too-many-arguments
+async def get_crawl_log_lines(
+    org,
+    log_file: CrawlLogFile,
+    crawl_manager,
+    log_levels=None,
+    contexts=None,
+    start=None,
+    end=None,
+):
+    """Yield raw JSON log lines from blocks of merged crawl log file which may
+    contain lines matching filters. Lines still need to be filtered"""
+    async for line in split_lines(
+        get_crawl_log_chunks(
+            org, log_file, crawl_manager, log_levels, contexts, start, end
+        )
+    ):
+        if line:
+            yield line
+
+
+def get_log_block_ranges(blocks, log_levels, contexts, start=None, end=None):
+    """Return (offset, length) ranges of blocks which may contain matching
+    lines, with runs of adjacent blocks combined to be read with one request.
+    Each block has lines from its first timestamp up to that of the next"""
+    ranges = []
+    for inx, block in enumerate(blocks):
+        if end and block.timestamp > end:
+            break
+
+        if start and inx + 1 < len(blocks) and blocks[inx + 1].timestamp < start:
+            continue
+
+        if not block.matches(log_levels, contexts):
+            continue
+
+        if ranges and sum(ranges[-1]) == block.offset:
+            ranges[-1][1] += block.length
+        else:
+            ranges.append([block.offset, block.length])
+
+    return ranges
+
+
+async def load_log_index(client, bucket, key, log_file: CrawlLogFile):
+    """Load block index from end of merged crawl log file"""
+    cache_key = (log_file.filename, log_file.indexOffset)
+    blocks = log_index_cache.get(cache_key)
+    if blocks is not None:
+        return blocks
+
+    length = log_file.size - log_file.indexOffset
+    blocks = []
+    if length:
+        data = await fetch(client, bucket, key, log_file.indexOffset, length)
+        blocks = [LogBlock.parse_raw(line) for line in data.splitlines() if line]
+
+    log_index_cache.set(cache_key, blocks)
+    return blocks
+
+
+# ============================================================================
+async def set_crawl_log_stats(crawls, crawl_id: str, stats: LogStatsCounter):
+    """Set log stats of crawl, eg. from error log lines only, if crawl
+    logs are not available to be merged"""
+    await crawls.find_one_and_update(
+        {"_id": crawl_id}, {"$set": {"logStats": stats.get_stats().dict()}}
+    )
+
+
+# ============================================================================
+def to_log_timestamp(dt_val: datetime):
+    """Format datetime as crawler log timestamp, in UTC"""
+    if dt_val.tzinfo:
+        dt_val = dt_val.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return dt_val.isoformat(timespec="milliseconds") + "Z"
+
+
+# pylint: disable=too-many-arguments
+async def search_log_lines(
+    lines, pattern=None, start=None, end=None, limit=100, cursor=None, log_filter=None
+):
+    """Return up to limit raw log lines matching regex pattern and filter,
+    with timestamps between start and end, and a token to continue the search
+    after the last line returned, if the limit was reached.
+
+    Lines are in timestamp order, so lines before start are skipped on the
+    timestamp alone, without parsing, and reading stops at end or at limit"""
+    skip_ts = None
+    skip = 0
+    if cursor:
+        skip_ts, skip = decode_cursor(LOG_SEARCH_CURSOR_KEYS, cursor)
+        if not isinstance(skip_ts, str) or not isinstance(skip, int):
+            raise HTTPException(status_code=400, detail="invalid_cursor")
+
+        if not start or skip_ts >= start:
+            start = skip_ts
+
+    results = []
+    last_ts = None
+    same_ts_count = 0
+
+    async with aclosing(lines):
+        async for line in lines:
+            timestamp = get_log_line_timestamp(line)
+            if start and timestamp < start:
+                continue
+
+            if end and timestamp > end:
+                break
+
+            if timestamp == last_ts:
+                same_ts_count += 1
+            else:
+                last_ts = timestamp
+                same_ts_count = 1
+
+            # already returned with previous page
+            if timestamp == skip_ts and same_ts_count <= skip:
+                continue
+
+            if pattern and not pattern.search(line):
+                continue
+
+            if log_filter and not log_filter.matches(line):
+                continue
+
+            results.append(line)
+            if len(results) >= limit:
+                position = {"timestamp": timestamp, "skip": same_ts_count}
+                return results, encode_cursor(LOG_SEARCH_CURSOR_KEYS, position)
+
+    return results, None
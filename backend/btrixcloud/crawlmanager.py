@@ -4,12 +4,9 @@ import os
 import asyncio
 import secrets
 import json
-import base64
 
 from datetime import timedelta
 
-from .orgs import S3Storage
-
 from .k8sapi import K8sAPI
 
 from .utils import dt_now, to_k8s_date
@@ -26,8 +23,6 @@ class CrawlManager(K8sAPI):
 
         self.cron_namespace = os.environ.get("CRON_NAMESPACE", "default")
 
-        self._default_storages = {}
-
         self.loop = asyncio.get_running_loop()
 
     # pylint: disable=too-many-arguments
@@ -213,33 +208,6 @@ class CrawlManager(K8sAPI):
         """Get access_endpoint for default storage"""
         return (await self.get_default_storage(name)).access_endpoint_url
 
-    async def get_default_storage(self, name):
-        """get default storage"""
-        if name not in self._default_storages:
-            storage_secret = await self._get_storage_secret(name)
-
-            access_endpoint_url = self._secret_data(
-                storage_secret, "STORE_ACCESS_ENDPOINT_URL"
-            )
-            endpoint_url = self._secret_data(storage_secret, "STORE_ENDPOINT_URL")
-            access_key = self._secret_data(storage_secret, "STORE_ACCESS_KEY")
-            secret_key = self._secret_data(storage_secret, "STORE_SECRET_KEY")
-            region = self._secret_data(storage_secret, "STORE_REGION") or ""
-            use_access_for_presign = (
-                self._secret_data(storage_secret, "STORE_USE_ACCESS_FOR_PRESIGN") == "1"
-            )
-
-            self._default_storages[name] = S3Storage(
-                access_key=access_key,
-                secret_key=secret_key,
-                endpoint_url=endpoint_url,
-                access_endpoint_url=access_endpoint_url,
-                region=region,
-                use_access_for_presign=use_access_for_presign,
-            )
-
-        return self._default_storages[name]
-
     async def get_profile_browser_metadata(self, browserid):
         """get browser profile labels"""
         try:
@@ -292,10 +260,6 @@ class CrawlManager(K8sAPI):
 
     # ========================================================================
     # Internal Methods
-    def _secret_data(self, secret, name):
-        """decode secret data"""
-        return base64.standard_b64decode(secret.data[name]).decode()
-
     async def _create_config_map(self, crawlconfig, **data):
         """Create Config Map based on CrawlConfig"""
         data["crawl-config.json"] = json.dumps(crawlconfig.get_raw_config())
@@ -318,20 +282,6 @@ class CrawlManager(K8sAPI):
             namespace=self.namespace, body=config_map
         )
 
-    async def _get_storage_secret(self, storage_name):
-        """Check if storage_name is valid by checking existing secret"""
-        try:
-            return await self.core_api.read_namespaced_secret(
-                f"storage-{storage_name}",
-                namespace=self.namespace,
-            )
-        # pylint: disable=broad-except
-        except Exception:
-            # pylint: disable=broad-exception-raised,raise-missing-from
-            raise Exception(f"Storage {storage_name} not found")
-
-        return None
-
     async def _delete_crawl_configs(self, label):
         """Delete Crawl Cron Job and all dependent resources, including configmap and secrets"""
 
@@ -2,19 +2,19 @@
 # pylint: disable=too-many-lines
 
 import asyncio
-import heapq
 import uuid
 import json
 import re
 import urllib.parse
+import zipfile
 
-from typing import Optional, List, Dict, Union
+from typing import Optional, List, Dict, Tuple, Union
 from datetime import datetime
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, UUID4, conint, HttpUrl, Field
-from redis import asyncio as aioredis, exceptions
+from redis import exceptions
 import pymongo
 
 from .crawlconfigs import (
@@ -26,18 +26,58 @@ from .crawlconfigs import (
 )
 from .db import BaseMongoModel
 from .orgs import Organization, MAX_CRAWL_SCALE
-from .pagination import DEFAULT_PAGE_SIZE, paginated_format
-from .storages import get_wacz_logs
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    paginated_format,
+    cursor_paginated_format,
+    get_cursor_sort_keys,
+    get_cursor_paginated_items,
+)
+from .cdx import (
+    decode_cdx_cursor,
+    get_surt,
+    search_cdx_entries,
+    MATCH_TYPES,
+    MAX_CDX_LOOKUP_LIMIT,
+)
+from .crawllogs import (
+    ERROR_LOG_LEVELS,
+    LogLineFilter,
+    MAX_LOG_SEARCH_LIMIT,
+    get_crawl_log_chunks,
+    get_crawl_log_lines,
+    is_stats_key,
+    search_log_lines,
+    to_log_timestamp,
+)
+from .storages import (
+    iter_wacz_cdx,
+    get_wacz_logs,
+    get_wacz_member_gzip,
+    LOG_FETCH_CONCURRENCY,
+)
 from .users import User
-from .utils import dt_now, get_redis_crawl_stats, parse_jsonl_error_messages
+from .utils import (
+    accepts_encoding,
+    dt_now,
+    get_redis_crawls_stats,
+    merge_sorted_async,
+    parse_jsonl_error_messages,
+    RedisClientCache,
+)
 from .basecrawls import (
     CrawlFile,
     CrawlFileOut,
+    CrawlLogFile,
+    CrawlLogStats,
     BaseCrawl,
     BaseCrawlOps,
     UpdateCrawl,
     DeleteCrawlList,
 )
+from .zip import get_log_line_timestamp
 
 
 RUNNING_STATES = ("running", "pending-wait", "generate-wacz", "uploading-wacz")
@@ -54,6 +94,79 @@ NON_RUNNING_STATES = (*FAILED_STATES, *SUCCESSFUL_STATES)
 
 ALL_CRAWL_STATES = (*RUNNING_AND_STARTING_STATES, *NON_RUNNING_STATES)
 
+QUEUE_FILTER_STEP = 1000
+
+QUEUE_MATCH_MIN_STEP = 100
+QUEUE_MATCH_MAX_STEP = 5000
+
+# queue match stream cursor: score and member of last returned entry, or
+# position of next entry for old crawler list queue
+QUEUE_CURSOR_KEYS = [("score", 1), ("member", 1)]
+LIST_QUEUE_CURSOR_KEYS = [("offset", 1)]
+
+# lua script for atomically removing crawl queue entries and their urls
+# from the seen set, in either mode:
+# - "match": ARGV[2] is a lua pattern, scan ARGV[4] queue entries from offset
+#   ARGV[3] and remove all entries with matching urls. entries with
+#   non-ascii urls are returned for matching by the caller, as lua
+#   patterns match bytes instead of characters
+# - "remove": ARGV[2...] are queue entries to remove
+# returns number of entries removed, number of entries scanned, followed
+# by any entries left for the caller to match
+FILTER_QUEUE_SCRIPT = """
+local q_key = KEYS[1]
+local s_key = KEYS[2]
+local removed = 0
+local undecided = {}
+
+local function remove_entry(entry, url)
+    if redis.call('zrem', q_key, entry) == 1 then
+        if url then
+            redis.call('srem', s_key, url)
+        end
+        removed = removed + 1
+    end
+end
+
+local function get_url(entry)
+    local ok, data = pcall(cjson.decode, entry)
+    if ok and type(data) == 'table' and type(data.url) == 'string' then
+        return data.url
+    end
+    return nil
+end
+
+if ARGV[1] == 'match' then
+    local start = tonumber(ARGV[3])
+    local entries = redis.call('zrange', q_key, start, start + tonumber(ARGV[4]) - 1)
+    for _, entry in ipairs(entries) do
+        local url = get_url(entry)
+        if url then
+            if string.find(url, '[\\128-\\255]') then
+                table.insert(undecided, entry)
+            elseif string.find(url, ARGV[2]) then
+                remove_entry(entry, url)
+            end
+        end
+    end
+    return {removed, #entries, unpack(undecided)}
+end
+
+for i = 2, #ARGV do
+    remove_entry(ARGV[i], get_url(ARGV[i]))
+end
+return {removed, #ARGV - 1}
+"""
+
+LUA_PATTERN_CLASSES = {
+    "d": "%d",
+    "D": "%D",
+    "s": "%s",
+    "S": "%S",
+    "w": "[%w_]",
+    "W": "[^%w_]",
+}
+
 
 # ============================================================================
 class CrawlScale(BaseModel):
@@ -72,6 +185,11 @@ class Crawl(BaseCrawl, CrawlConfigCore):
 
     cid_rev: int = 0
 
+    # denormalized from workflow, for filtering and sorting
+    name: Optional[str]
+    description: Optional[str]
+    firstSeed: Optional[str]
+
     # schedule: Optional[str]
     manual: Optional[bool]
 
@@ -128,6 +246,8 @@ class ListCrawlOut(BaseMongoModel):
     seedCount: Optional[int] = 0
     errors: Optional[List[str]]
 
+    logStats: Optional[CrawlLogStats]
+
     stopping: Optional[bool] = False
 
     collections: Optional[List[UUID4]] = []
@@ -168,10 +288,15 @@ class CrawlOps(BaseCrawlOps):
         self.user_manager = users
         self.orgs = orgs
 
+        self.redis_clients = RedisClientCache()
+
         self.crawl_configs.set_crawl_ops(self)
 
     async def init_index(self):
-        """init index for crawls db collection"""
+        """init index for crawls and presigned urls db collections"""
+        if self.presigned_urls is not None:
+            await self.presigned_urls.create_index("expireAt", expireAfterSeconds=0)
+
         await self.crawls.create_index([("type", pymongo.HASHED)])
 
         await self.crawls.create_index(
@@ -187,11 +312,44 @@ class CrawlOps(BaseCrawlOps):
             [("type", pymongo.HASHED), ("state", pymongo.DESCENDING)]
         )
 
+        # keyset pagination
+        await self.crawls.create_index(
+            [
+                ("oid", pymongo.ASCENDING),
+                ("started", pymongo.DESCENDING),
+                ("_id", pymongo.DESCENDING),
+            ]
+        )
+        await self.crawls.create_index(
+            [
+                ("oid", pymongo.ASCENDING),
+                ("finished", pymongo.DESCENDING),
+                ("_id", pymongo.DESCENDING),
+            ]
+        )
+
+        # filtering on denormalized workflow fields
+        await self.crawls.create_index(
+            [("oid", pymongo.ASCENDING), ("name", pymongo.ASCENDING)]
+        )
+        await self.crawls.create_index(
+            [("oid", pymongo.ASCENDING), ("description", pymongo.ASCENDING)]
+        )
+        await self.crawls.create_index(
+            [("oid", pymongo.ASCENDING), ("firstSeed", pymongo.ASCENDING)]
+        )
+
         await self.crawls.create_index([("finished", pymongo.DESCENDING)])
         await self.crawls.create_index([("oid", pymongo.HASHED)])
         await self.crawls.create_index([("cid", pymongo.HASHED)])
         await self.crawls.create_index([("state", pymongo.HASHED)])
 
+        for log_level in ERROR_LOG_LEVELS:
+            await self.crawls.create_index(
+                [(f"logStats.logLevels.{log_level}", pymongo.DESCENDING)],
+                sparse=True,
+            )
+
     async def list_crawls(
         self,
         org: Optional[Organization] = None,
@@ -204,13 +362,20 @@ class CrawlOps(BaseCrawlOps):
         name: str = None,
         description: str = None,
         collection_id: uuid.UUID = None,
+        has_log_level: Optional[List[str]] = None,
         page_size: int = DEFAULT_PAGE_SIZE,
         page: int = 1,
         sort_by: str = None,
         sort_direction: int = -1,
         resources: bool = False,
+        cursor: Optional[str] = None,
+        count_total: Optional[str] = None,
     ):
-        """List all finished crawls from the db"""
+        """List all finished crawls from the db
+
+        If cursor is set (empty for first page), use keyset pagination and
+        return page info with next cursor, and total only if count_total is
+        set, instead of total"""
         # pylint: disable=too-many-locals,too-many-branches,too-many-statements
         # Zero-index page for query
         page = page - 1
@@ -239,42 +404,32 @@ class CrawlOps(BaseCrawlOps):
         if crawl_id:
             query["_id"] = crawl_id
 
-        # pylint: disable=duplicate-code
-        aggregate = [
-            {"$match": query},
-            {"$set": {"firstSeedObject": {"$arrayElemAt": ["$config.seeds", 0]}}},
-            {"$set": {"firstSeed": "$firstSeedObject.url"}},
-            {"$unset": ["firstSeedObject", "errors"]},
-            {
-                "$lookup": {
-                    "from": "crawl_configs",
-                    "localField": "cid",
-                    "foreignField": "_id",
-                    "as": "crawlConfig",
-                },
-            },
-            {"$set": {"name": {"$arrayElemAt": ["$crawlConfig.name", 0]}}},
-            {
-                "$set": {
-                    "description": {"$arrayElemAt": ["$crawlConfig.description", 0]}
-                }
-            },
-        ]
+        if collection_id:
+            query["collections"] = {"$in": [collection_id]}
 
-        if not resources:
-            aggregate.extend([{"$unset": ["files"]}])
+        if first_seed:
+            query["firstSeed"] = first_seed
 
         if name:
-            aggregate.extend([{"$match": {"name": name}}])
+            query["name"] = name
 
         if description:
-            aggregate.extend([{"$match": {"description": description}}])
+            query["description"] = description
 
-        if first_seed:
-            aggregate.extend([{"$match": {"firstSeed": first_seed}}])
+        # crawls with any lines logged at one of the log levels
+        if has_log_level:
+            if not all(is_stats_key(log_level) for log_level in has_log_level):
+                raise HTTPException(status_code=400, detail="invalid_log_level")
 
-        if collection_id:
-            aggregate.extend([{"$match": {"collections": {"$in": [collection_id]}}}])
+            query["$or"] = [
+                {f"logStats.logLevels.{log_level}": {"$gt": 0}}
+                for log_level in has_log_level
+            ]
+
+        # pylint: disable=duplicate-code
+        aggregate = [{"$match": query}]
+
+        page_stages = [{"$unset": ["errors"] if resources else ["errors", "files"]}]
 
         if sort_by:
             if sort_by not in ("started", "finished", "fileSize", "firstSeed"):
@@ -282,24 +437,42 @@ class CrawlOps(BaseCrawlOps):
             if sort_direction not in (1, -1):
                 raise HTTPException(status_code=400, detail="invalid_sort_direction")
 
+        cls = ListCrawlOut
+        if resources:
+            cls = ListCrawlOutWithResources
+
+        if cursor is not None:
+            sort_keys = get_cursor_sort_keys(sort_by, sort_direction)
+
+            items, page_info = await get_cursor_paginated_items(
+                self.crawls,
+                aggregate,
+                page_stages,
+                sort_keys,
+                cursor,
+                page_size,
+                count_total,
+            )
+
+            crawls = [cls.from_dict(result) for result in items]
+            crawls = await self._resolve_crawls_refs(
+                crawls, org, add_first_seed=False, resources=resources
+            )
+            return crawls, page_info
+
+        if sort_by:
             aggregate.extend([{"$sort": {sort_by: sort_direction}}])
 
+        # workflow and user names are resolved in batch for the returned page
+        # only, see _resolve_crawls_refs()
         aggregate.extend(
             [
-                {
-                    "$lookup": {
-                        "from": "users",
-                        "localField": "userid",
-                        "foreignField": "id",
-                        "as": "userName",
-                    },
-                },
-                {"$set": {"userName": {"$arrayElemAt": ["$userName.name", 0]}}},
                 {
                     "$facet": {
                         "items": [
                             {"$skip": skip},
                             {"$limit": page_size},
+                            *page_stages,
                         ],
                         "total": [{"$count": "count"}],
                     }
@@ -318,17 +491,10 @@ class CrawlOps(BaseCrawlOps):
         except (IndexError, ValueError):
             total = 0
 
-        cls = ListCrawlOut
-        if resources:
-            cls = ListCrawlOutWithResources
-
-        crawls = []
-        for result in items:
-            crawl = cls.from_dict(result)
-            crawl = await self._resolve_crawl_refs(
-                crawl, org, add_first_seed=False, resources=resources
-            )
-            crawls.append(crawl)
+        crawls = [cls.from_dict(result) for result in items]
+        crawls = await self._resolve_crawls_refs(
+            crawls, org, add_first_seed=False, resources=resources
+        )
 
         return crawls, total
 
@@ -359,52 +525,117 @@ class CrawlOps(BaseCrawlOps):
         resources: bool = False,
     ):
         """Resolve running crawl data"""
-        # pylint: disable=too-many-branches
-        config = await self.crawl_configs.get_crawl_config(
-            crawl.cid, org, active_only=False
+        crawls = await self._resolve_crawls_refs(
+            [crawl], org, add_first_seed=add_first_seed, resources=resources
         )
+        return crawls[0]
 
-        if config:
-            if not crawl.name:
-                crawl.name = config.name
-
-            if not crawl.description:
-                crawl.description = config.description
-
-            if config.config.seeds:
-                if add_first_seed:
-                    first_seed = config.config.seeds[0]
-                    if isinstance(first_seed, HttpUrl):
-                        crawl.firstSeed = first_seed
-                    elif isinstance(first_seed, Seed):
-                        crawl.firstSeed = first_seed.url
-                crawl.seedCount = len(config.config.seeds)
-
-        if hasattr(crawl, "profileid") and crawl.profileid:
-            crawl.profileName = await self.crawl_configs.profiles.get_profile_name(
-                crawl.profileid, org
-            )
+    async def _resolve_crawls_refs(
+        self,
+        crawls: List[Union[CrawlOut, ListCrawlOut]],
+        org: Optional[Organization],
+        add_first_seed: bool = True,
+        resources: bool = False,
+    ):
+        """Resolve running crawl data for a list of crawls
+
+        workflows, profiles and users referenced by all crawls are each
+        loaded with a single query, and stats for all running crawls are
+        fetched concurrently"""
+        # pylint: disable=too-many-branches, too-many-locals
+        if not crawls:
+            return crawls
 
-        user = await self.user_manager.get(crawl.userid)
-        if user:
-            crawl.userName = user.name
+        cids = list({crawl.cid for crawl in crawls})
+        profileids = list(
+            {
+                crawl.profileid
+                for crawl in crawls
+                if hasattr(crawl, "profileid") and crawl.profileid
+            }
+        )
+        userids = list({str(crawl.userid) for crawl in crawls})
+
+        configs, profile_names, users = await asyncio.gather(
+            self.crawl_configs.get_crawl_configs_by_ids(cids, org),
+            self.crawl_configs.profiles.get_profile_names(profileids, org),
+            self.user_manager.get_user_names_by_ids(userids),
+        )
+
+        user_names = {user["id"]: user.get("name") for user in users}
 
         # if running, get stats directly from redis
         # more responsive, saves db update in operator
-        if crawl.state in RUNNING_STATES:
+        running_stats = await self.get_running_crawls_stats(
+            [crawl.id for crawl in crawls if crawl.state in RUNNING_STATES]
+        )
+
+        for crawl in crawls:
+            if crawl.id in running_stats:
+                crawl.stats = running_stats[crawl.id]
+
+        for crawl in crawls:
+            config = configs.get(crawl.cid)
+
+            if config:
+                if not crawl.name:
+                    crawl.name = config.name
+
+                if not crawl.description:
+                    crawl.description = config.description
+
+                if config.config.seeds:
+                    if add_first_seed:
+                        first_seed = config.config.seeds[0]
+                        if isinstance(first_seed, HttpUrl):
+                            crawl.firstSeed = first_seed
+                        elif isinstance(first_seed, Seed):
+                            crawl.firstSeed = first_seed.url
+                    crawl.seedCount = len(config.config.seeds)
+
+            if hasattr(crawl, "profileid") and crawl.profileid:
+                crawl.profileName = profile_names.get(crawl.profileid)
+
+            if crawl.userid in user_names:
+                crawl.userName = user_names[crawl.userid]
+
+        # sign files of all crawls together
+        if resources:
+            signed = [crawl for crawl in crawls if crawl.state in SUCCESSFUL_STATES]
+            crawl_resources = await self._resolve_crawls_signed_urls(
+                [(crawl.id, crawl.files) for crawl in signed], org
+            )
+            for crawl, resources_ in zip(signed, crawl_resources):
+                crawl.resources = resources_
+
+        return crawls
+
+    async def get_running_crawls_stats(self, crawl_ids: List[str]):
+        """get stats for running crawls from redis, as dict by crawl id
+        crawls are grouped by redis endpoint, with stats for each group
+        fetched in one pipelined round trip, and all groups concurrently"""
+        crawl_ids_by_url = {}
+        for crawl_id in crawl_ids:
+            redis_url = self.crawl_manager.get_redis_url(crawl_id)
+            crawl_ids_by_url.setdefault(redis_url, []).append(crawl_id)
+
+        async def get_stats(redis_url, crawl_ids):
             try:
-                redis = await self.get_redis(crawl.id)
-                crawl.stats = await get_redis_crawl_stats(redis, crawl.id)
+                async with self.redis_clients.get(redis_url) as redis:
+                    return await get_redis_crawls_stats(redis, crawl_ids)
             # redis not available, ignore
             except exceptions.ConnectionError:
-                pass
+                return {}
 
-        if resources and crawl.state in SUCCESSFUL_STATES:
-            crawl.resources = await self._resolve_signed_urls(
-                crawl.files, org, crawl.id
-            )
+        results = await asyncio.gather(
+            *[get_stats(url, ids) for url, ids in crawl_ids_by_url.items()]
+        )
+
+        all_stats = {}
+        for stats in results:
+            all_stats.update(stats)
 
-        return crawl
+        return all_stats
 
     async def delete_crawls(
         self, org: Organization, delete_list: DeleteCrawlList, type_="crawl"
@@ -430,6 +661,157 @@ class CrawlOps(BaseCrawlOps):
                 wacz_files.append(file_)
         return wacz_files
 
+    # pylint: disable=too-many-arguments
+    async def lookup_cdx(
+        self,
+        crawl_id: str,
+        org: Organization,
+        url: str,
+        match_type: str = "exact",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        """Return up to limit captures of url, or urls with url as prefix, from
+        the CDXJ indexes of all WACZ files in crawl, sorted by url key and
+        timestamp, and a token to continue after the last capture returned"""
+        if match_type not in MATCH_TYPES:
+            raise HTTPException(status_code=400, detail="invalid_match_type")
+
+        from_key, skip = decode_cdx_cursor(cursor)
+
+        wacz_files = await self.get_wacz_files(crawl_id, org)
+
+        sources = await self.get_cdx_sources(
+            crawl_id, wacz_files, org, get_surt(url), match_type, from_key
+        )
+
+        items, next_cursor = await search_cdx_entries(
+            sources, min(max(limit, 1), MAX_CDX_LOOKUP_LIMIT), from_key, skip
+        )
+
+        return {"items": items, "next": next_cursor}
+
+    # pylint: disable=too-many-arguments
+    async def get_cdx_sources(
+        self,
+        crawl_id: str,
+        wacz_files: List[CrawlFile],
+        org: Organization,
+        search_key: str,
+        match_type: str,
+        from_key: Optional[Tuple[str, str]] = None,
+        extra: Optional[dict] = None,
+    ):
+        """Return async iterators of sorted (url key, timestamp, fields) CDXJ
+        entries matching search key, one per WACZ file, with WACZ filename
+        and any extra fields added. Entries are only read as consumed"""
+        await self.load_wacz_directories(crawl_id, wacz_files, org)
+
+        fetch_limit = asyncio.Semaphore(LOG_FETCH_CONCURRENCY)
+
+        return [
+            iter_wacz_cdx(
+                org,
+                wacz_file,
+                self.crawl_manager,
+                search_key,
+                match_type,
+                from_key,
+                {"wacz": wacz_file.filename, **(extra or {})},
+                fetch_limit,
+            )
+            for wacz_file in wacz_files
+        ]
+
+    # pylint: disable=too-many-arguments
+    async def iter_crawl_log_lines(
+        self,
+        crawl_raw: dict,
+        org: Organization,
+        log_levels: Optional[List[str]] = None,
+        contexts: Optional[List[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        wacz_files: Optional[List[CrawlFile]] = None,
+    ):
+        """Return async iterator of raw JSON log lines of finished crawl, in
+        timestamp order, from merged log file if available, or else merged
+        from logs of all WACZ files. Lines still need to be filtered"""
+        if crawl_raw.get("logFile"):
+            log_file = CrawlLogFile.parse_obj(crawl_raw["logFile"])
+            return get_crawl_log_lines(
+                org, log_file, self.crawl_manager, log_levels, contexts, start, end
+            )
+
+        if wacz_files is None:
+            wacz_files = await self.get_wacz_files(crawl_raw["_id"], org)
+            await self.load_wacz_directories(crawl_raw["_id"], wacz_files, org)
+
+        # all files fetched concurrently, sharing storage request limit.
+        # lines are merged and copied as is, parsing only filter candidates
+        fetch_limit = asyncio.Semaphore(LOG_FETCH_CONCURRENCY)
+        logs = [
+            get_wacz_logs(org, wacz_file, self.crawl_manager, fetch_limit, raw=True)
+            for wacz_file in wacz_files
+        ]
+        return merge_sorted_async(logs, key=get_log_line_timestamp)
+
+    # pylint: disable=too-many-arguments, too-many-locals
+    async def search_crawl_logs(
+        self,
+        crawl_id: str,
+        org: Organization,
+        query: Optional[str] = None,
+        regex: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        log_levels: Optional[List[str]] = None,
+        contexts: Optional[List[str]] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        """Search logs of finished crawl for lines matching substring or regex,
+        returning up to limit matches and a token to continue the search"""
+        crawl_raw = await self.get_crawl_raw(crawl_id, org)
+        if not crawl_raw.get("finished"):
+            raise HTTPException(status_code=400, detail="crawl_not_finished")
+
+        pattern = None
+        try:
+            if regex:
+                pattern = re.compile(regex.encode("utf-8"))
+            elif query:
+                pattern = re.compile(re.escape(query.encode("utf-8")), re.IGNORECASE)
+        except re.error:
+            # pylint: disable=raise-missing-from
+            raise HTTPException(status_code=400, detail="invalid_regex")
+
+        start_ts = to_log_timestamp(start) if start else None
+        end_ts = to_log_timestamp(end) if end else None
+
+        log_filter = None
+        if log_levels or contexts:
+            log_filter = LogLineFilter(log_levels, contexts)
+
+        lines = await self.iter_crawl_log_lines(
+            crawl_raw, org, log_levels, contexts, start_ts, end_ts
+        )
+
+        results, next_cursor = await search_log_lines(
+            lines,
+            pattern,
+            start_ts,
+            end_ts,
+            min(max(limit, 1), MAX_LOG_SEARCH_LIMIT),
+            cursor,
+            log_filter,
+        )
+
+        return {
+            "items": parse_jsonl_error_messages(results),
+            "next": next_cursor,
+        }
+
     async def add_new_crawl(self, crawl_id: str, crawlconfig: CrawlConfig, user: User):
         """initialize new crawl"""
         new_crawl = await add_new_crawl(self.crawls, crawl_id, crawlconfig, user.id)
@@ -466,6 +848,7 @@ class CrawlOps(BaseCrawlOps):
         # if cancelation, set the finish time here
         if state == "canceled":
             data["finished"] = dt_now()
+            await self.close_redis(crawl_id)
 
         await self.crawls.find_one_and_update(
             {
@@ -540,15 +923,13 @@ class CrawlOps(BaseCrawlOps):
 
         total = 0
         results = []
-        redis = None
 
         try:
-            redis = await self.get_redis(crawl_id)
-
-            total = await self._crawl_queue_len(redis, f"{crawl_id}:q")
-            results = await self._crawl_queue_range(
-                redis, f"{crawl_id}:q", offset, count
-            )
+            async with self.get_redis(crawl_id) as redis:
+                total = await self._crawl_queue_len(redis, f"{crawl_id}:q")
+                results = await self._crawl_queue_range(
+                    redis, f"{crawl_id}:q", offset, count
+                )
             results = [json.loads(result)["url"] for result in results]
         except exceptions.ConnectionError:
             # can't connect to redis, likely not initialized yet
@@ -564,43 +945,268 @@ class CrawlOps(BaseCrawlOps):
     async def match_crawl_queue(self, crawl_id, regex):
         """get list of urls that match regex"""
         total = 0
-        redis = None
+        matched = []
+        regex = re.compile(regex)
+
+        async with self.get_redis(crawl_id) as redis:
+            try:
+                total = await self._crawl_queue_len(redis, f"{crawl_id}:q")
+                is_list = await redis.type(f"{crawl_id}:q") == "list"
+            except exceptions.ConnectionError:
+                # can't connect to redis, likely not initialized yet
+                return {"total": total, "matched": matched}
+
+            matched = [
+                url
+                async for url, _ in self._iter_crawl_queue_matches(
+                    redis, crawl_id, regex, is_list
+                )
+            ]
+
+        return {"total": total, "matched": matched}
 
+    async def stream_crawl_queue_matches(
+        self, crawl_id, regex, cursor: Optional[str] = None, limit=0
+    ):
+        """return generator of json lines for urls that match regex,
+        resuming after cursor and stopping after limit matches, if set
+
+        the last line contains the queue total, the number of matches,
+        and the cursor to resume from, or null if end of queue was reached
+
+        the cursor is the score and member of the last entry returned, so
+        that entries popped from the queue meanwhile don't cause entries to
+        be skipped or repeated. for old crawler list queues, the cursor is
+        only the position of the next entry, and is best-effort"""
+        regex = re.compile(regex)
+
+        is_list = False
         try:
-            redis = await self.get_redis(crawl_id)
-            total = await self._crawl_queue_len(redis, f"{crawl_id}:q")
+            async with self.get_redis(crawl_id) as redis:
+                is_list = await redis.type(f"{crawl_id}:q") == "list"
         except exceptions.ConnectionError:
             # can't connect to redis, likely not initialized yet
             pass
 
-        regex = re.compile(regex)
-        matched = []
-        step = 50
+        cursor_keys = LIST_QUEUE_CURSOR_KEYS if is_list else QUEUE_CURSOR_KEYS
+        after = decode_queue_cursor(cursor_keys, cursor) if cursor else None
+
+        async def stream_matches():
+            total = 0
+            matched = 0
+            next_cursor = None
+
+            # client held while streaming, not closed until released
+            async with self.get_redis(crawl_id) as redis:
+                try:
+                    total = await self._crawl_queue_len(redis, f"{crawl_id}:q")
+                except exceptions.ConnectionError:
+                    # can't connect to redis, likely not initialized yet
+                    pass
+
+                async for url, position in self._iter_crawl_queue_matches(
+                    redis, crawl_id, regex, is_list, after
+                ):
+                    yield (json.dumps({"url": url}) + "\n").encode("utf-8")
+                    matched += 1
+                    if limit and matched >= limit:
+                        next_cursor = encode_cursor(
+                            cursor_keys,
+                            {
+                                key: value
+                                for (key, _), value in zip(cursor_keys, position)
+                            },
+                        )
+                        break
+
+            done = {"total": total, "matched": matched, "cursor": next_cursor}
+            yield (json.dumps(done) + "\n").encode("utf-8")
+
+        return stream_matches()
+
+    async def _iter_crawl_queue_matches(
+        self, redis, crawl_id, regex, is_list, after=None
+    ):
+        """yield (url, position) for each queue entry matching regex, after
+        position, if set. position is (score, member) of the entry, or
+        (offset of next entry,) for old crawler list queue"""
+        if is_list:
+            entries = self._iter_crawl_queue_list(
+                redis, f"{crawl_id}:q", after[0] if after else 0
+            )
+        else:
+            entries = self._iter_crawl_queue_zset(redis, f"{crawl_id}:q", after)
+
+        async for entry, position in entries:
+            url = json.loads(entry)["url"]
+            if regex.search(url):
+                yield url, position
+
+    async def _iter_crawl_queue_list(self, redis, q_key, offset):
+        """yield (entry, (offset of next entry,)) for old crawler list queue,
+        starting at offset, in batches growing from QUEUE_MATCH_MIN_STEP to
+        QUEUE_MATCH_MAX_STEP, so that first matches are returned quickly"""
+        step = QUEUE_MATCH_MIN_STEP
+
+        while True:
+            results = list(await self._crawl_queue_range(redis, q_key, offset, step))
+            if not results:
+                break
 
-        for count in range(0, total, step):
-            results = await self._crawl_queue_range(redis, f"{crawl_id}:q", count, step)
             for result in results:
-                url = json.loads(result)["url"]
-                if regex.search(url):
-                    matched.append(url)
+                offset += 1
+                yield result, (offset,)
+
+            step = min(step * 2, QUEUE_MATCH_MAX_STEP)
+
+    async def _iter_crawl_queue_zset(self, redis, q_key, after=None):
+        """yield (entry, (score, entry)) for sorted set queue entries in queue
+        order, after (score, entry), if set, in batches growing from
+        QUEUE_MATCH_MIN_STEP to QUEUE_MATCH_MAX_STEP
+
+        each batch is read by score from the score of the last entry, so that
+        entries removed from the head of the queue meanwhile don't shift the
+        position. entries with that score already read are skipped with an
+        offset, overlapping by one entry to check none were removed"""
+        step = QUEUE_MATCH_MIN_STEP
+
+        # number of entries with score of last entry, up to last entry
+        same_score = 0
+
+        while True:
+            start = max(same_score - 1, 0)
+            results = await redis.zrangebyscore(
+                q_key,
+                after[0] if after else "-inf",
+                "+inf",
+                start=start,
+                num=step,
+                withscores=True,
+            )
+            if start and (not results or (results[0][1], results[0][0]) > after):
+                # entries before last entry removed, read score from start
+                same_score = 0
+                continue
 
-        return {"total": total, "matched": matched}
+            if not results:
+                break
+
+            new_results = [
+                (entry, score)
+                for entry, score in results
+                if not after or (score, entry) > after
+            ]
+            if not new_results:
+                if len(results) < step:
+                    break
+
+                same_score = start + len(results)
+                continue
+
+            for entry, score in new_results:
+                yield entry, (score, entry)
+
+            last_score = new_results[-1][1]
+            if results[0][1] == last_score and after and after[0] == last_score:
+                same_score = start + len(results)
+            else:
+                same_score = sum(1 for _, score in results if score == last_score)
+
+            if len(results) < step:
+                break
+
+            after = (last_score, new_results[-1][0])
+            step = min(step * 2, QUEUE_MATCH_MAX_STEP)
 
     async def filter_crawl_queue(self, crawl_id, regex):
         """filter out urls that match regex"""
-        # pylint: disable=too-many-locals
         total = 0
-        redis = None
 
+        q_key = f"{crawl_id}:q"
+
+        async with self.get_redis(crawl_id) as redis:
+            try:
+                total = await self._crawl_queue_len(redis, q_key)
+                if not total:
+                    return 0
+
+                if await redis.type(q_key) == "list":
+                    return await self._filter_crawl_queue_list(
+                        redis, crawl_id, regex, total
+                    )
+
+            except exceptions.ConnectionError:
+                # can't connect to redis, likely not initialized yet
+                return 0
+
+            return await self._filter_crawl_queue_zset(redis, crawl_id, regex, total)
+
+    async def _filter_crawl_queue_zset(self, redis, crawl_id, regex, total):
+        """filter out urls that match regex from sorted set queue
+
+        matching entries are removed from the queue and seen set atomically
+        via lua script, in chunks of QUEUE_FILTER_STEP. if the regex can be
+        expressed as a lua pattern, the matching is also done in redis,
+        otherwise, each chunk is matched here and only the matches are
+        sent back for removal"""
+        # pylint: disable=too-many-locals
         q_key = f"{crawl_id}:q"
         s_key = f"{crawl_id}:s"
 
-        try:
-            redis = await self.get_redis(crawl_id)
-            total = await self._crawl_queue_len(redis, f"{crawl_id}:q")
-        except exceptions.ConnectionError:
-            # can't connect to redis, likely not initialized yet
-            pass
+        filter_script = redis.register_script(FILTER_QUEUE_SCRIPT)
+        lua_pattern = regex_to_lua_pattern(regex)
+        regex = re.compile(regex)
+
+        async def remove_matching(results):
+            matched = [
+                result for result in results if regex.search(json.loads(result)["url"])
+            ]
+            if not matched:
+                return 0
+
+            res = await filter_script(keys=[q_key, s_key], args=["remove", *matched])
+            return res[0]
+
+        offset = 0
+        num_removed = 0
+
+        while True:
+            if lua_pattern is not None:
+                res = await filter_script(
+                    keys=[q_key, s_key],
+                    args=["match", lua_pattern, offset, QUEUE_FILTER_STEP],
+                )
+                removed, scanned = res[0], res[1]
+                if len(res) > 2:
+                    removed += await remove_matching(res[2:])
+            else:
+                results = await redis.zrange(
+                    q_key, offset, offset + QUEUE_FILTER_STEP - 1
+                )
+                scanned = len(results)
+                removed = await remove_matching(results)
+
+            # removed entries shift remaining entries back
+            offset += scanned - removed
+
+            if removed:
+                num_removed += removed
+                print(
+                    f"Removed {removed} from queue, {num_removed} total, "
+                    + f"scanned {offset + num_removed} of {total}",
+                    flush=True,
+                )
+
+            if scanned < QUEUE_FILTER_STEP:
+                break
+
+        return num_removed
+
+    async def _filter_crawl_queue_list(self, redis, crawl_id, regex, total):
+        """filter out urls that match regex from list queue (older crawlers)"""
+        # pylint: disable=too-many-locals
+        q_key = f"{crawl_id}:q"
+        s_key = f"{crawl_id}:s"
 
         dircount = -1
         regex = re.compile(regex)
@@ -609,11 +1215,8 @@ class CrawlOps(BaseCrawlOps):
         count = 0
         num_removed = 0
 
-        # pylint: disable=fixme
-        # todo: do this in a more efficient way?
-        # currently quite inefficient as redis does not have a way
-        # to atomically check and remove value from list
-        # so removing each jsob block by value
+        # redis does not have a way to atomically check and remove value
+        # from list, so removing each json block by value
         while count < total:
             if dircount == -1 and count > total / 2:
                 dircount = 1
@@ -627,8 +1230,6 @@ class CrawlOps(BaseCrawlOps):
                 url = json.loads(result)["url"]
                 if regex.search(url):
                     srems.append(url)
-                    # await redis.srem(s_key, url)
-                    # res = await self._crawl_queue_rem(redis, q_key, result, dircount)
                     qrems.append(result)
 
             if not srems:
@@ -653,9 +1254,9 @@ class CrawlOps(BaseCrawlOps):
         upper_bound = skip + page_size - 1
 
         try:
-            redis = await self.get_redis(crawl_id)
-            errors = await redis.lrange(f"{crawl_id}:e", skip, upper_bound)
-            total = await redis.llen(f"{crawl_id}:e")
+            async with self.get_redis(crawl_id) as redis:
+                errors = await redis.lrange(f"{crawl_id}:e", skip, upper_bound)
+                total = await redis.llen(f"{crawl_id}:e")
         except exceptions.ConnectionError:
             # pylint: disable=raise-missing-from
             raise HTTPException(status_code=503, detail="redis_connection_error")
@@ -663,13 +1264,17 @@ class CrawlOps(BaseCrawlOps):
         parsed_errors = parse_jsonl_error_messages(errors)
         return parsed_errors, total
 
-    async def get_redis(self, crawl_id):
-        """get redis url for crawl id"""
+    def get_redis(self, crawl_id):
+        """context manager for shared redis client for crawl id"""
         redis_url = self.crawl_manager.get_redis_url(crawl_id)
 
-        return await aioredis.from_url(
-            redis_url, encoding="utf-8", decode_responses=True
-        )
+        return self.redis_clients.get(redis_url)
+
+    async def close_redis(self, crawl_id):
+        """close shared redis client for crawl id, if any"""
+        redis_url = self.crawl_manager.get_redis_url(crawl_id)
+
+        await self.redis_clients.close(redis_url)
 
     async def add_or_remove_exclusion(self, crawl_id, regex, org, user, add):
         """add new exclusion to config or remove exclusion from config
@@ -707,6 +1312,84 @@ class CrawlOps(BaseCrawlOps):
         return resp
 
 
+# ============================================================================
+def decode_queue_cursor(cursor_keys, cursor: str):
+    """Decode queue match cursor into (score, member) of last entry returned,
+    or (offset of next entry,) for old crawler list queue"""
+    values = decode_cursor(cursor_keys, cursor)
+    if cursor_keys == LIST_QUEUE_CURSOR_KEYS:
+        valid = isinstance(values[0], int) and values[0] >= 0
+    else:
+        valid = isinstance(values[0], (int, float)) and isinstance(values[1], str)
+
+    if not valid:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+
+    return tuple(values)
+
+
+# ============================================================================
+def regex_to_lua_pattern(regex):
+    """translate regex to an equivalent lua pattern, if possible
+    supports literal characters, escapes, ., \\d, \\s, \\w, the *, + and ?
+    quantifiers and ^ and $ anchors
+    returns None if regex uses features that lua patterns don't support"""
+    # pylint: disable=too-many-branches
+    pattern = []
+    # if last pattern item is single char class that can be quantified
+    quantifiable = False
+    i = 0
+
+    while i < len(regex):
+        char = regex[i]
+        i += 1
+
+        if char == "^" and i == 1:
+            pattern.append("^")
+            quantifiable = False
+
+        elif char == "$" and i == len(regex):
+            pattern.append("$")
+            quantifiable = False
+
+        elif char == ".":
+            pattern.append(".")
+            quantifiable = True
+
+        elif char == "\\":
+            if i == len(regex):
+                return None
+
+            char = regex[i]
+            i += 1
+            if char in LUA_PATTERN_CLASSES:
+                pattern.append(LUA_PATTERN_CLASSES[char])
+            elif char.isascii() and not char.isalnum():
+                pattern.append("%" + char)
+            else:
+                return None
+
+            quantifiable = True
+
+        elif char in "*+?":
+            # no lazy or possessive quantifiers in lua
+            if not quantifiable or regex[i : i + 1] in ("*", "+", "?", "{"):
+                return None
+
+            pattern.append(char)
+            quantifiable = False
+
+        elif char in "^$()[]{}|":
+            return None
+
+        else:
+            pattern.append("%" + char if char in "%-" else char)
+            # non-ascii chars are multiple bytes in lua
+            quantifiable = char.isascii()
+
+    return "".join(pattern)
+
+
 # ============================================================================
 async def add_new_crawl(
     crawls, crawl_id: str, crawlconfig: CrawlConfig, userid: UUID4, manual=True
@@ -721,6 +1404,9 @@ async def add_new_crawl(
         oid=crawlconfig.oid,
         cid=crawlconfig.id,
         cid_rev=crawlconfig.rev,
+        name=crawlconfig.name,
+        description=crawlconfig.description,
+        firstSeed=crawlconfig.get_first_seed_url(),
         scale=crawlconfig.scale,
         jobType=crawlconfig.jobType,
         config=crawlconfig.config,
@@ -823,8 +1509,11 @@ def init_crawls_api(app, mdb, users, crawl_manager, crawl_config_ops, orgs, user
         name: Optional[str] = None,
         description: Optional[str] = None,
         collectionId: Optional[UUID4] = None,
+        hasLogLevel: Optional[str] = None,
         sortBy: Optional[str] = None,
         sortDirection: Optional[int] = -1,
+        cursor: Optional[str] = None,
+        countTotal: Optional[str] = None,
         runningOnly: Optional[bool] = True,
     ):
         if not user.is_superuser:
@@ -852,11 +1541,16 @@ def init_crawls_api(app, mdb, users, crawl_manager, crawl_config_ops, orgs, user
             name=name,
             description=description,
             collection_id=collectionId,
+            has_log_level=hasLogLevel.split(",") if hasLogLevel else None,
             page_size=pageSize,
             page=page,
             sort_by=sortBy,
             sort_direction=sortDirection,
+            cursor=cursor,
+            count_total=countTotal,
         )
+        if cursor is not None:
+            return cursor_paginated_format(crawls, total, pageSize)
         return paginated_format(crawls, total, page, pageSize)
 
     @app.get("/orgs/{oid}/crawls", tags=["crawls"])
@@ -871,8 +1565,11 @@ def init_crawls_api(app, mdb, users, crawl_manager, crawl_config_ops, orgs, user
         name: Optional[str] = None,
         description: Optional[str] = None,
         collectionId: Optional[UUID4] = None,
+        hasLogLevel: Optional[str] = None,
         sortBy: Optional[str] = None,
         sortDirection: Optional[int] = -1,
+        cursor: Optional[str] = None,
+        countTotal: Optional[str] = None,
     ):
         # pylint: disable=duplicate-code
         if state:
@@ -897,11 +1594,16 @@ def init_crawls_api(app, mdb, users, crawl_manager, crawl_config_ops, orgs, user
             name=name,
             description=description,
             collection_id=collectionId,
+            has_log_level=hasLogLevel.split(",") if hasLogLevel else None,
             page_size=pageSize,
             page=page,
             sort_by=sortBy,
             sort_direction=sortDirection,
+            cursor=cursor,
+            count_total=countTotal,
         )
+        if cursor is not None:
+            return cursor_paginated_format(crawls, total, pageSize)
         return paginated_format(crawls, total, page, pageSize)
 
     @app.post(
@@ -1054,6 +1756,24 @@ def init_crawls_api(app, mdb, users, crawl_manager, crawl_config_ops, orgs, user
 
         return await ops.match_crawl_queue(crawl_id, regex)
 
+    @app.get(
+        "/orgs/{oid}/crawls/{crawl_id}/queueMatchAll/stream",
+        tags=["crawls"],
+    )
+    async def stream_crawl_queue_matches(
+        crawl_id,
+        regex: str,
+        cursor: Optional[str] = None,
+        limit: conint(ge=0) = 0,
+        org: Organization = Depends(org_crawl_dep),
+    ):
+        await ops.get_crawl_raw(crawl_id, org)
+
+        return StreamingResponse(
+            await ops.stream_crawl_queue_matches(crawl_id, regex, cursor, limit),
+            media_type="application/x-ndjson",
+        )
+
     @app.post(
         "/orgs/{oid}/crawls/{crawl_id}/exclusions",
         tags=["crawls"],
@@ -1081,11 +1801,12 @@ def init_crawls_api(app, mdb, users, crawl_manager, crawl_config_ops, orgs, user
     @app.get("/orgs/{oid}/crawls/{crawl_id}/logs", tags=["crawls"])
     async def stream_crawl_logs(
         crawl_id,
+        request: Request,
         org: Organization = Depends(org_viewer_dep),
         logLevel: Optional[str] = None,
         context: Optional[str] = None,
     ):
-        crawl = await ops.get_crawl(crawl_id, org)
+        crawl_raw = await ops.get_crawl_raw(crawl_id, org)
 
         log_levels = []
         contexts = []
@@ -1094,29 +1815,95 @@ def init_crawls_api(app, mdb, users, crawl_manager, crawl_config_ops, orgs, user
         if context:
             contexts = context.split(",")
 
-        def stream_json_lines(iterator, log_levels, contexts):
-            """Return iterator as generator, filtering as necessary"""
-            for line_dict in iterator:
-                if log_levels and line_dict["logLevel"] not in log_levels:
-                    continue
-                if contexts and line_dict["context"] not in contexts:
+        async def stream_json_lines(lines, log_filter=None):
+            """Return raw JSON lines as generator, filtering as necessary"""
+            async for line in lines:
+                if log_filter and not log_filter.matches(line):
                     continue
 
-                # Convert to JSON-lines bytes
-                json_str = json.dumps(line_dict, ensure_ascii=False) + "\n"
-                yield json_str.encode("utf-8")
+                yield line + b"\n"
 
-        # If crawl is finished, stream logs from WACZ files
-        if crawl.finished:
-            logs = []
+        if not crawl_raw.get("finished"):
+            raise HTTPException(status_code=400, detail="crawl_not_finished")
+
+        unfiltered = not log_levels and not contexts
+        accepts_gzip = accepts_encoding(
+            request.headers.get("accept-encoding", ""), "gzip"
+        )
+
+        wacz_files = None
+
+        # Unfiltered single log: send compressed log data as is, as gzip
+        if unfiltered and accepts_gzip:
             wacz_files = await ops.get_wacz_files(crawl_id, org)
-            for wacz_file in wacz_files:
-                wacz_logs = await get_wacz_logs(org, wacz_file, crawl_manager)
-                logs.append(wacz_logs)
-            heap_iter = heapq.merge(*logs, key=lambda entry: entry["timestamp"])
-            return StreamingResponse(stream_json_lines(heap_iter, log_levels, contexts))
+            await ops.load_wacz_directories(crawl_id, wacz_files, org)
+
+            log_members = [
+                (wacz_file, member)
+                for wacz_file in wacz_files
+                for member in wacz_file.directory
+                if member.filename.startswith("logs/")
+            ]
+            if len(log_members) == 1:
+                wacz_file, member = log_members[0]
+                if (
+                    member.compressType == zipfile.ZIP_DEFLATED
+                    and member.crc is not None
+                ):
+                    return StreamingResponse(
+                        get_wacz_member_gzip(org, wacz_file, member, crawl_manager),
+                        headers={"Content-Encoding": "gzip"},
+                    )
 
-        raise HTTPException(status_code=400, detail="crawl_not_finished")
+        log_filter = None if unfiltered else LogLineFilter(log_levels, contexts)
+
+        # If merged log file was created at crawl finish, stream unfiltered
+        # decompressed data from it as is
+        if unfiltered and crawl_raw.get("logFile"):
+            log_file = CrawlLogFile.parse_obj(crawl_raw["logFile"])
+            return StreamingResponse(get_crawl_log_chunks(org, log_file, crawl_manager))
+
+        lines = await ops.iter_crawl_log_lines(
+            crawl_raw, org, log_levels, contexts, wacz_files=wacz_files
+        )
+        return StreamingResponse(stream_json_lines(lines, log_filter))
+
+    @app.get("/orgs/{oid}/crawls/{crawl_id}/logs/search", tags=["crawls"])
+    async def search_crawl_logs(
+        crawl_id,
+        org: Organization = Depends(org_viewer_dep),
+        q: Optional[str] = None,
+        regex: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        logLevel: Optional[str] = None,
+        context: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        return await ops.search_crawl_logs(
+            crawl_id,
+            org,
+            query=q,
+            regex=regex,
+            start=start,
+            end=end,
+            log_levels=logLevel.split(",") if logLevel else None,
+            contexts=context.split(",") if context else None,
+            limit=limit,
+            cursor=cursor,
+        )
+
+    @app.get("/orgs/{oid}/crawls/{crawl_id}/cdx", tags=["crawls"])
+    async def lookup_crawl_cdx(
+        crawl_id: str,
+        url: str,
+        matchType: str = "exact",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        org: Organization = Depends(org_viewer_dep),
+    ):
+        return await ops.lookup_cdx(crawl_id, org, url, matchType, limit, cursor)
 
     @app.get(
         "/orgs/{oid}/crawls/{crawl_id}/errors",
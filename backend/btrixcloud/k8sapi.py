@@ -1,4 +1,5 @@
 """ K8S API Access """
+import base64
 import os
 import traceback
 
@@ -14,6 +15,7 @@ from kubernetes_asyncio.utils import create_from_dict
 from kubernetes_asyncio.client.exceptions import ApiException
 
 from fastapi.templating import Jinja2Templates
+from .orgs import S3Storage
 from .utils import get_templates_dir, dt_now, to_k8s_date
 
 
@@ -46,6 +48,8 @@ class K8sAPI:
         self.add_custom_resource("CrawlJob", "crawljobs")
         self.add_custom_resource("ProfileJob", "profilejobs")
 
+        self._default_storages = {}
+
     def add_custom_resource(self, name, plural):
         """add custom resource"""
         self.custom_resources[name] = plural
@@ -54,6 +58,51 @@ class K8sAPI:
         """return custom API"""
         return self.custom_resources[kind] if kind in self.custom_resources else None
 
+    async def get_default_storage(self, name):
+        """get default storage"""
+        if name not in self._default_storages:
+            storage_secret = await self._get_storage_secret(name)
+
+            access_endpoint_url = self._secret_data(
+                storage_secret, "STORE_ACCESS_ENDPOINT_URL"
+            )
+            endpoint_url = self._secret_data(storage_secret, "STORE_ENDPOINT_URL")
+            access_key = self._secret_data(storage_secret, "STORE_ACCESS_KEY")
+            secret_key = self._secret_data(storage_secret, "STORE_SECRET_KEY")
+            region = self._secret_data(storage_secret, "STORE_REGION") or ""
+            use_access_for_presign = (
+                self._secret_data(storage_secret, "STORE_USE_ACCESS_FOR_PRESIGN") == "1"
+            )
+
+            self._default_storages[name] = S3Storage(
+                access_key=access_key,
+                secret_key=secret_key,
+                endpoint_url=endpoint_url,
+                access_endpoint_url=access_endpoint_url,
+                region=region,
+                use_access_for_presign=use_access_for_presign,
+            )
+
+        return self._default_storages[name]
+
+    def _secret_data(self, secret, name):
+        """decode secret data"""
+        return base64.standard_b64decode(secret.data[name]).decode()
+
+    async def _get_storage_secret(self, storage_name):
+        """Check if storage_name is valid by checking existing secret"""
+        try:
+            return await self.core_api.read_namespaced_secret(
+                f"storage-{storage_name}",
+                namespace=self.namespace,
+            )
+        # pylint: disable=broad-except
+        except Exception:
+            # pylint: disable=broad-exception-raised,raise-missing-from
+            raise Exception(f"Storage {storage_name} not found")
+
+        return None
+
     def get_redis_url(self, crawl_id):
         """get redis url for crawl id"""
         redis_id = f"redis-{crawl_id}"
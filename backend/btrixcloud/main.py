@@ -19,12 +19,13 @@ from .orgs import init_orgs_api
 
 from .profiles import init_profiles_api
 
-from .storages import init_storages_api
+from .storages import init_storages_api, s3_clients
 from .uploads import init_uploads_api
 from .crawlconfigs import init_crawl_config_api
 from .colls import init_collections_api
+from .pages import init_pages_api
 from .crawls import init_crawls_api
-from .basecrawls import init_base_crawls_api
+from .basecrawls import init_base_crawls_api, presign_refresher
 
 from .crawlmanager import CrawlManager
 from .utils import run_once_lock, register_exit_handler
@@ -86,7 +87,7 @@ def main():
 
     crawl_manager = CrawlManager()
 
-    init_storages_api(org_ops, crawl_manager, current_active_user)
+    init_storages_api(app, org_ops, crawl_manager, current_active_user)
 
     init_uploads_api(
         app, mdb, user_manager, crawl_manager, org_ops, current_active_user
@@ -122,6 +123,10 @@ def main():
 
     crawl_config_ops.set_coll_ops(coll_ops)
 
+    org_ops.set_base_crawl_ops(crawls)
+
+    page_ops = init_pages_api(app, mdb, org_ops)
+
     # run only in first worker
     if run_once_lock("btrix-init-db"):
         asyncio.create_task(
@@ -132,6 +137,7 @@ def main():
                 crawls,
                 crawl_config_ops,
                 coll_ops,
+                page_ops,
                 invites,
                 db_inited,
             )
@@ -168,3 +174,11 @@ async def startup():
     """init on startup"""
     register_exit_handler()
     main()
+
+
+# ============================================================================
+@app_root.on_event("shutdown")
+async def shutdown():
+    """close shared storage clients and stop presigned url refresh on shutdown"""
+    await presign_refresher.stop()
+    await s3_clients.close_all()
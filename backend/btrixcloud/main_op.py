@@ -4,6 +4,8 @@
 from fastapi import FastAPI
 
 from .operator import init_operator_webhook
+from .storages import s3_clients
+from .basecrawls import presign_refresher
 
 from .utils import register_exit_handler
 
@@ -22,3 +24,11 @@ async def startup():
     """init on startup"""
     register_exit_handler()
     main()
+
+
+# ============================================================================
+@app_root.on_event("shutdown")
+async def shutdown():
+    """close shared storage clients and stop presigned url refresh on shutdown"""
+    await presign_refresher.stop()
+    await s3_clients.close_all()
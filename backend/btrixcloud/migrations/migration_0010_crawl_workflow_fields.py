@@ -0,0 +1,61 @@
+"""
+Migration 0010 - Denormalize workflow name, description and first seed into crawls
+"""
+from btrixcloud.migrations import BaseMigration
+
+
+MIGRATION_VERSION = "0010"
+
+
+class Migration(BaseMigration):
+    """Migration class."""
+
+    def __init__(self, mdb, migration_version=MIGRATION_VERSION):
+        super().__init__(mdb, migration_version)
+
+    async def migrate_up(self):
+        """Perform migration up.
+
+        Set name and description from workflow and firstSeed from crawl config
+        on all existing crawls, so they can be filtered and sorted by index
+        """
+        crawls = self.mdb["crawls"]
+        crawl_configs = self.mdb["crawl_configs"]
+
+        async for config in crawl_configs.find(
+            {}, projection=["_id", "name", "description"]
+        ):
+            config_id = config["_id"]
+            try:
+                await crawls.update_many(
+                    {"cid": config_id, "type": "crawl"},
+                    {
+                        "$set": {
+                            "name": config.get("name"),
+                            "description": config.get("description"),
+                        }
+                    },
+                )
+            # pylint: disable=broad-exception-caught
+            except Exception as err:
+                print(
+                    f"Error setting workflow fields on crawls for {config_id}: {err}",
+                    flush=True,
+                )
+
+        try:
+            await crawls.update_many(
+                {"type": "crawl"},
+                [
+                    {
+                        "$set": {
+                            "firstSeedObject": {"$arrayElemAt": ["$config.seeds", 0]}
+                        }
+                    },
+                    {"$set": {"firstSeed": "$firstSeedObject.url"}},
+                    {"$unset": ["firstSeedObject"]},
+                ],
+            )
+        # pylint: disable=broad-exception-caught
+        except Exception as err:
+            print(f"Error setting firstSeed on existing crawls: {err}", flush=True)
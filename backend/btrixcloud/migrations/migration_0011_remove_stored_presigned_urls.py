@@ -0,0 +1,37 @@
+"""
+Migration 0011 - Remove presigned urls stored on crawl files
+"""
+from btrixcloud.migrations import BaseMigration
+
+
+MIGRATION_VERSION = "0011"
+
+
+class Migration(BaseMigration):
+    """Migration class."""
+
+    def __init__(self, mdb, migration_version=MIGRATION_VERSION):
+        super().__init__(mdb, migration_version)
+
+    async def migrate_up(self):
+        """Perform migration up.
+
+        Unset presignedUrl and expireAt on files of all existing crawls,
+        as presigned urls are now kept in the presigned_urls collection
+        """
+        # pylint: disable=duplicate-code
+        crawls = self.mdb["crawls"]
+
+        try:
+            await crawls.update_many(
+                {"files.presignedUrl": {"$exists": True}},
+                {
+                    "$unset": {
+                        "files.$[].presignedUrl": "",
+                        "files.$[].expireAt": "",
+                    }
+                },
+            )
+        # pylint: disable=broad-exception-caught
+        except Exception as err:
+            print(f"Error removing presigned urls from crawls: {err}", flush=True)
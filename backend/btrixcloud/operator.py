@@ -12,19 +12,21 @@ import yaml
 import humanize
 
 from pydantic import BaseModel
-from redis import asyncio as aioredis
 
 from .utils import (
     from_k8s_date,
     to_k8s_date,
     dt_now,
     get_redis_crawl_stats,
+    RedisClientCache,
 )
 from .k8sapi import K8sAPI
 
 from .db import init_db
 from .orgs import inc_org_stats, get_max_concurrent_crawls
 from .colls import add_successful_crawl_to_collections
+from .crawllogs import add_crawl_log_file, set_crawl_log_stats, LogStatsCounter
+from .pages import add_crawl_pages
 from .crawlconfigs import stats_recompute_last
 from .crawls import (
     CrawlFile,
@@ -116,9 +118,12 @@ class BtrixOperator(K8sAPI):
         self.crawls = mdb["crawls"]
         self.crawl_configs = mdb["crawl_configs"]
         self.orgs = mdb["organizations"]
+        self.pages = mdb["pages"]
 
         self.done_key = "crawls-done"
 
+        self.redis_clients = RedisClientCache()
+
         with open(self.config_file, encoding="utf-8") as fh_config:
             self.shared_params = yaml.safe_load(fh_config)
 
@@ -168,9 +173,7 @@ class BtrixOperator(K8sAPI):
             # if not yet finished, assume it was canceled, mark as such
             print(f"Finalizing crawl {crawl_id}, finished {status.finished}")
             if not status.finished:
-                finalize = await self.cancel_crawl(
-                    redis_url, crawl_id, cid, status, "canceled"
-                )
+                finalize = await self.cancel_crawl(crawl_id, cid, status, "canceled")
             else:
                 finalize = True
 
@@ -184,7 +187,7 @@ class BtrixOperator(K8sAPI):
         # pylint: disable=bare-except, broad-except
         except:
             # fail crawl if config somehow missing, shouldn't generally happen
-            await self.cancel_crawl(redis_url, crawl_id, cid, status, "failed")
+            await self.cancel_crawl(crawl_id, cid, status, "failed")
 
             return self._done_response(status)
 
@@ -404,12 +407,11 @@ class BtrixOperator(K8sAPI):
             print("PVC Delete failed", exc, flush=True)
 
     # pylint: disable=too-many-arguments
-    async def cancel_crawl(self, redis_url, crawl_id, cid, status, state):
+    async def cancel_crawl(self, crawl_id, cid, status, state):
         """immediately cancel crawl with specified state
         return true if db mark_finished update succeeds"""
         try:
-            redis = await self._get_redis(redis_url)
-            await self.mark_finished(redis, crawl_id, uuid.UUID(cid), status, state)
+            await self.mark_finished(crawl_id, uuid.UUID(cid), status, state)
             return True
         # pylint: disable=bare-except
         except:
@@ -435,26 +437,17 @@ class BtrixOperator(K8sAPI):
 
         return self._done_response(status, finalized)
 
-    async def _get_redis(self, redis_url):
-        """init redis, ensure connectivity"""
-        redis = None
-        try:
-            redis = await aioredis.from_url(
-                redis_url, encoding="utf-8", decode_responses=True
-            )
-            # test connection
-            await redis.ping()
-            return redis
-
-        # pylint: disable=bare-except
-        except:
-            return None
-
     async def sync_crawl_state(self, redis_url, crawl, status, pods):
         """sync crawl state for running crawl"""
-        redis = await self._get_redis(redis_url)
-        if not redis:
-            return status
+        # connectivity is checked for new clients
+        async with self.redis_clients.get(redis_url, ping=True) as redis:
+            if not redis:
+                return status
+
+            return await self._sync_crawl_state(redis, crawl, status, pods)
+
+    async def _sync_crawl_state(self, redis, crawl, status, pods):
+        """sync crawl state from shared redis client"""
 
         # if not prev_start_time:
         #    await redis.set("start_time", str(self.started))
@@ -527,8 +520,9 @@ class BtrixOperator(K8sAPI):
     # pylint: disable=too-many-branches
     async def update_crawl_state(self, redis, crawl, status, pods):
         """update crawl state and check if crawl is now done"""
-        results = await redis.hvals(f"{crawl.id}:status")
-        stats = await get_redis_crawl_stats(redis, crawl.id)
+        results, stats = await asyncio.gather(
+            redis.hvals(f"{crawl.id}:status"), get_redis_crawl_stats(redis, crawl.id)
+        )
 
         # check crawl expiry
         if crawl.expire_time and datetime.utcnow() > crawl.expire_time:
@@ -582,7 +576,7 @@ class BtrixOperator(K8sAPI):
             # if only one page found, and no files, assume failed
             if status.pagesFound == 1 and not status.filesAdded:
                 return await self.mark_finished(
-                    redis, crawl.id, crawl.cid, status, state="failed"
+                    crawl.id, crawl.cid, status, state="failed"
                 )
 
             completed = status.pagesDone and status.pagesDone >= status.pagesFound
@@ -590,7 +584,7 @@ class BtrixOperator(K8sAPI):
             state = "complete" if completed else "partial_complete"
 
             status = await self.mark_finished(
-                redis, crawl.id, crawl.cid, status, state, crawl, stats
+                crawl.id, crawl.cid, status, state, crawl, stats
             )
 
         # check if all crawlers failed
@@ -601,16 +595,12 @@ class BtrixOperator(K8sAPI):
             else:
                 state = "failed"
 
-            status = await self.mark_finished(
-                redis, crawl.id, crawl.cid, status, state=state
-            )
+            status = await self.mark_finished(crawl.id, crawl.cid, status, state=state)
 
         return status
 
     # pylint: disable=too-many-arguments
-    async def mark_finished(
-        self, redis, crawl_id, cid, status, state, crawl=None, stats=None
-    ):
+    async def mark_finished(self, crawl_id, cid, status, state, crawl=None, stats=None):
         """mark crawl as finished, set finished timestamp and final state"""
 
         finished = dt_now()
@@ -640,29 +630,44 @@ class BtrixOperator(K8sAPI):
             await self.inc_crawl_complete_stats(crawl, finished)
 
         asyncio.create_task(
-            self.do_crawl_finished_tasks(
-                redis, crawl_id, cid, status.filesAddedSize, state
-            )
+            self.do_crawl_finished_tasks(crawl_id, cid, status.filesAddedSize, state)
         )
 
         return status
 
     # pylint: disable=too-many-arguments
-    async def do_crawl_finished_tasks(
-        self, redis, crawl_id, cid, files_added_size, state
-    ):
+    async def do_crawl_finished_tasks(self, crawl_id, cid, files_added_size, state):
         """Run tasks after crawl completes in asyncio.task coroutine."""
-        await stats_recompute_last(
-            self.crawl_configs, self.crawls, cid, files_added_size, 1
-        )
+        redis_url = self.get_redis_url(crawl_id)
+        try:
+            await stats_recompute_last(
+                self.crawl_configs, self.crawls, cid, files_added_size, 1
+            )
 
-        if redis:
-            await self.add_crawl_errors_to_db(redis, crawl_id)
+            async with self.redis_clients.get(redis_url, ping=True) as redis:
+                if redis:
+                    await self.add_crawl_errors_to_db(redis, crawl_id)
+
+            await add_crawl_log_file(self.crawls, self.orgs, self, crawl_id)
+
+            if state in SUCCESSFUL_STATES:
+                await add_successful_crawl_to_collections(
+                    self.crawls,
+                    self.crawl_configs,
+                    self.collections,
+                    self.orgs,
+                    self,
+                    crawl_id,
+                    cid,
+                )
 
-        if state in SUCCESSFUL_STATES:
-            await add_successful_crawl_to_collections(
-                self.crawls, self.crawl_configs, self.collections, crawl_id, cid
-            )
+                await add_crawl_pages(
+                    self.pages, self.crawls, self.orgs, self, crawl_id
+                )
+
+        finally:
+            # crawl is done, redis client no longer needed
+            await self.redis_clients.close(redis_url)
 
     async def inc_crawl_complete_stats(self, crawl, finished):
         """Increment Crawl Stats"""
@@ -676,8 +681,10 @@ class BtrixOperator(K8sAPI):
         await inc_org_stats(self.orgs, crawl.oid, duration)
 
     async def add_crawl_errors_to_db(self, redis, crawl_id, inc=100):
-        """Pull crawl errors from redis and write to mongo db"""
+        """Pull crawl errors from redis and write to mongo db, along with
+        log stats of errors, replaced with stats of all logs once merged"""
         index = 0
+        stats = LogStatsCounter()
         try:
             # ensure this only runs once
             if not await redis.setnx("errors-exported", "1"):
@@ -691,12 +698,15 @@ class BtrixOperator(K8sAPI):
                     break
 
                 await add_crawl_errors(self.crawls, crawl_id, errors)
+                stats.add_lines(errors)
 
                 if len(errors) < inc:
                     # If we have fewer than inc errors, we can assume this is the
                     # last page of data to add.
                     break
                 index += 1
+
+            await set_crawl_log_stats(self.crawls, crawl_id, stats)
         # likely redis has already been deleted, so nothing to do
         # pylint: disable=bare-except
         except:
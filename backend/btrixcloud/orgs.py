@@ -188,6 +188,12 @@ class OrgOps:
 
         self.invites = invites
 
+        self.base_crawl_ops = None
+
+    def set_base_crawl_ops(self, base_crawl_ops):
+        """set base crawl ops"""
+        self.base_crawl_ops = base_crawl_ops
+
     async def init_index(self):
         """init lookup index"""
         while True:
@@ -322,10 +328,16 @@ class OrgOps:
         self, org: Organization, storage: Union[S3Storage, DefaultStorage]
     ):
         """Update storage on an existing organization"""
-        return await self.orgs.find_one_and_update(
+        res = await self.orgs.find_one_and_update(
             {"_id": org.id}, {"$set": {"storage": storage.dict()}}
         )
 
+        # urls signed for previous storage no longer valid
+        if self.base_crawl_ops:
+            await self.base_crawl_ops.invalidate_org_presigned_urls(org)
+
+        return res
+
     async def update_quotas(self, org: Organization, quotas: OrgQuotas):
         """update organization quotas"""
         return await self.orgs.find_one_and_update(
@@ -0,0 +1,193 @@
+"""
+Pages API, for pages extracted from crawl WACZ pages lists
+"""
+import asyncio
+import re
+import uuid
+from datetime import datetime
+from typing import Optional
+
+import pymongo
+from fastapi import Depends, HTTPException
+from pydantic import UUID4, ValidationError
+
+from .basecrawls import get_crawl_org_and_wacz_files
+from .db import BaseMongoModel
+from .orgs import Organization
+from .pagination import DEFAULT_PAGE_SIZE, PaginatedResponseModel, paginated_format
+from .storages import get_wacz_pages, LOG_FETCH_CONCURRENCY
+
+
+PAGES_INSERT_BATCH_SIZE = 1000
+
+
+# ============================================================================
+class Page(BaseMongoModel):
+    """Page captured in crawl, from WACZ pages list"""
+
+    oid: UUID4
+    crawl_id: str
+
+    url: str
+    title: Optional[str]
+    ts: Optional[datetime]
+    status: Optional[int]
+
+    # WACZ file containing page
+    filename: str
+
+
+# ============================================================================
+class PageOps:
+    """ops for querying crawl pages"""
+
+    def __init__(self, mdb):
+        self.pages = mdb["pages"]
+        self.crawls = mdb["crawls"]
+
+    async def init_index(self):
+        """init lookup index"""
+        await self.pages.create_index(
+            [("crawl_id", pymongo.ASCENDING), ("url", pymongo.ASCENDING)]
+        )
+
+        await self.pages.create_index(
+            [("oid", pymongo.ASCENDING), ("url", pymongo.ASCENDING)]
+        )
+
+    # pylint: disable=too-many-arguments
+    async def list_pages(
+        self,
+        crawl_id: str,
+        org: Organization,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page: int = 1,
+        url: Optional[str] = None,
+        url_prefix: Optional[str] = None,
+        search: Optional[str] = None,
+    ):
+        """List pages of crawl, sorted by url"""
+        crawl = await self.crawls.find_one(
+            {"_id": crawl_id, "oid": org.id}, projection=["_id"]
+        )
+        if not crawl:
+            raise HTTPException(status_code=404, detail="crawl_not_found")
+
+        # Zero-index page for query
+        page = page - 1
+        skip = page * page_size
+
+        query = {"crawl_id": crawl_id, "oid": org.id}
+
+        if url:
+            query["url"] = url
+
+        elif url_prefix:
+            query["url"] = {"$regex": "^" + re.escape(url_prefix)}
+
+        if search:
+            regex = {"$regex": re.escape(search), "$options": "i"}
+            query["$or"] = [{"url": regex}, {"title": regex}]
+
+        total = await self.pages.count_documents(query)
+
+        cursor = self.pages.find(query).sort("url", pymongo.ASCENDING)
+        results = await cursor.skip(skip).limit(page_size).to_list(length=page_size)
+
+        return [Page.from_dict(res) for res in results], total
+
+
+# ============================================================================
+async def add_crawl_pages(pages, crawls, orgs, crawl_manager, crawl_id: str):
+    """Extract pages from pages lists of all WACZ files in finished crawl,
+    streaming each list from storage and inserting pages in batches"""
+    try:
+        org, wacz_files = await get_crawl_org_and_wacz_files(crawls, orgs, crawl_id)
+
+        # in case finished tasks are run again for crawl
+        await pages.delete_many({"crawl_id": crawl_id})
+
+        fetch_limit = asyncio.Semaphore(LOG_FETCH_CONCURRENCY)
+        count = 0
+
+        for crawl_file in wacz_files:
+            batch = []
+            try:
+                async for page in get_wacz_pages(
+                    org, crawl_file, crawl_manager, fetch_limit
+                ):
+                    try:
+                        batch.append(
+                            Page(
+                                id=uuid.uuid4(),
+                                oid=org.id,
+                                crawl_id=crawl_id,
+                                url=page["url"],
+                                title=page.get("title"),
+                                ts=page.get("ts"),
+                                status=page.get("status"),
+                                filename=crawl_file.filename,
+                            ).to_dict()
+                        )
+                    except ValidationError as err:
+                        print(f"Error parsing page: {page}. Error: {err}", flush=True)
+                        continue
+
+                    if len(batch) >= PAGES_INSERT_BATCH_SIZE:
+                        await pages.insert_many(batch, ordered=False)
+                        count += len(batch)
+                        batch = []
+
+            # pylint: disable=broad-exception-caught
+            except Exception as exc:
+                print(
+                    f"Error reading pages from {crawl_file.filename}", exc, flush=True
+                )
+
+            # keep pages read before any error
+            if batch:
+                await pages.insert_many(batch, ordered=False)
+                count += len(batch)
+
+        print(f"Pages added for crawl {crawl_id}: {count}", flush=True)
+
+    # pylint: disable=broad-exception-caught
+    except Exception as exc:
+        print(f"Error adding pages for crawl {crawl_id}", exc, flush=True)
+
+
+# ============================================================================
+def init_pages_api(app, mdb, orgs):
+    """init pages api"""
+    # pylint: disable=invalid-name, too-many-arguments
+
+    ops = PageOps(mdb)
+
+    org_viewer_dep = orgs.org_viewer_dep
+
+    @app.get(
+        "/orgs/{oid}/crawls/{crawl_id}/pages",
+        tags=["crawls"],
+        response_model=PaginatedResponseModel,
+    )
+    async def list_crawl_pages(
+        crawl_id: str,
+        org: Organization = Depends(org_viewer_dep),
+        pageSize: int = DEFAULT_PAGE_SIZE,
+        page: int = 1,
+        url: Optional[str] = None,
+        urlPrefix: Optional[str] = None,
+        search: Optional[str] = None,
+    ):
+        pages, total = await ops.list_pages(
+            crawl_id,
+            org,
+            page_size=pageSize,
+            page=page,
+            url=url,
+            url_prefix=urlPrefix,
+            search=search,
+        )
+        return paginated_format(pages, total, page, pageSize)
+
+    return ops
@@ -1,11 +1,29 @@
 """API pagination"""
-from typing import Any, List, Optional
+import asyncio
+import base64
+import binascii
+import json
 
+from typing import Any, List, Optional, Tuple
+
+from bson import json_util
+from bson.binary import UuidRepresentation
+from bson.json_util import JSONOptions, JSONMode
+from fastapi import HTTPException
 from pydantic import BaseModel
 
 
 DEFAULT_PAGE_SIZE = 1_000
 
+# approx totals stop counting past this many matching documents
+MAX_APPROX_TOTAL = 10_000
+
+CURSOR_JSON_OPTIONS = JSONOptions(
+    json_mode=JSONMode.RELAXED,
+    uuid_representation=UuidRepresentation.STANDARD,
+    tz_aware=False,
+)
+
 
 # ============================================================================
 class PaginatedResponseModel(BaseModel):
@@ -17,6 +35,17 @@ class PaginatedResponseModel(BaseModel):
     pageSize: int
 
 
+# ============================================================================
+class CursorPaginatedResponseModel(BaseModel):
+    """Cursor paginated response model"""
+
+    items: List[Any]
+    next: Optional[str]
+    pageSize: int
+    total: Optional[int]
+    totalApprox: bool = False
+
+
 # ============================================================================
 def paginated_format(
     items: Optional[List[Any]],
@@ -26,3 +55,174 @@ def paginated_format(
 ):
     """Return items in paged format."""
     return {"items": items, "total": total, "page": page, "pageSize": page_size}
+
+
+# ============================================================================
+def cursor_paginated_format(
+    items: Optional[List[Any]],
+    page_info: dict,
+    page_size: int = DEFAULT_PAGE_SIZE,
+):
+    """Return items in cursor paged format, page_info as returned
+    from get_cursor_page()"""
+    return {
+        "items": items,
+        "next": page_info.get("next"),
+        "pageSize": page_size,
+        "total": page_info.get("total"),
+        "totalApprox": page_info.get("totalApprox", False),
+    }
+
+
+# ============================================================================
+def encode_cursor(sort_keys: List[Tuple[str, int]], item: dict):
+    """Encode opaque cursor token for position after item"""
+    values = [item.get(key) for key, _ in sort_keys]
+    data = json_util.dumps(
+        {"s": sort_keys, "v": values}, json_options=CURSOR_JSON_OPTIONS
+    )
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("utf-8")
+
+
+def decode_cursor(sort_keys: List[Tuple[str, int]], cursor: str):
+    """Decode cursor token into sort key values, ensuring it was
+    created for the same sort"""
+    try:
+        data = json_util.loads(
+            base64.urlsafe_b64decode(cursor.encode("utf-8")),
+            json_options=CURSOR_JSON_OPTIONS,
+        )
+        if [tuple(key) for key in data["s"]] != list(sort_keys):
+            raise ValueError("sort mismatch")
+
+        values = data["v"]
+        if len(values) != len(sort_keys):
+            raise ValueError("invalid values")
+
+        return values
+
+    except (ValueError, TypeError, KeyError, binascii.Error, json.JSONDecodeError):
+        # pylint: disable=raise-missing-from
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+
+
+def get_cursor_sort_keys(
+    sort_by: Optional[str], sort_direction: int = -1, secondary_keys=()
+):
+    """Return sort keys for keyset pagination, always ending with _id
+    to give a unique, stable order"""
+    if sort_direction not in (1, -1):
+        raise HTTPException(status_code=400, detail="invalid_sort_direction")
+
+    sort_keys = [(key, sort_direction) for key in (sort_by, *secondary_keys) if key]
+    sort_keys.append(("_id", sort_direction))
+    return sort_keys
+
+
+def get_cursor_query(sort_keys: List[Tuple[str, int]], values: List[Any]):
+    """Return query matching all documents sorted after the cursor values.
+
+    Null (or missing) values sort first ascending and last descending,
+    but are never matched by $gt/$lt, so they are handled explicitly"""
+    clauses = []
+    for inx, (key, direction) in enumerate(sort_keys):
+        value = values[inx]
+        if direction == 1:
+            after = {key: {"$ne": None}} if value is None else {key: {"$gt": value}}
+        elif value is None:
+            # descending, nothing sorts after null
+            after = None
+        else:
+            after = {"$or": [{key: {"$lt": value}}, {key: None}]}
+
+        if after is not None:
+            prev = [
+                {prev_key: values[i]} for i, (prev_key, _) in enumerate(sort_keys[:inx])
+            ]
+            clauses.append({"$and": prev + [after]} if prev else after)
+
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+
+def get_cursor_stages(
+    sort_keys: List[Tuple[str, int]], cursor: str, page_size: int = DEFAULT_PAGE_SIZE
+):
+    """Return aggregate stages for keyset pagination, starting after cursor,
+    or at the beginning if cursor is empty. One more item than the page size
+    is fetched to determine if there is a next page"""
+    stages = []
+    if cursor:
+        values = decode_cursor(sort_keys, cursor)
+        stages.append({"$match": get_cursor_query(sort_keys, values)})
+
+    stages.append({"$sort": dict(sort_keys)})
+    stages.append({"$limit": page_size + 1})
+    return stages
+
+
+def get_cursor_page(
+    items: List[dict], sort_keys: List[Tuple[str, int]], page_size: int
+):
+    """Trim items fetched with get_cursor_stages() to page size,
+    return items and page info with the next cursor, if any"""
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(sort_keys, items[-1])
+
+    return items, {"next": next_cursor}
+
+
+async def get_total_count(collection, aggregate: List[dict], count_total: str):
+    """Count documents matching aggregate filter stages.
+    If count_total is 'approx', stop counting after MAX_APPROX_TOTAL,
+    returning MAX_APPROX_TOTAL as a lower bound, otherwise count exactly"""
+    if count_total not in ("exact", "approx"):
+        raise HTTPException(status_code=400, detail="invalid_count_total")
+
+    aggregate = list(aggregate)
+    approx = count_total == "approx"
+    if approx:
+        aggregate.append({"$limit": MAX_APPROX_TOTAL + 1})
+
+    aggregate.append({"$count": "count"})
+
+    results = await collection.aggregate(aggregate).to_list(length=1)
+    total = int(results[0]["count"]) if results else 0
+
+    if approx and total > MAX_APPROX_TOTAL:
+        return MAX_APPROX_TOTAL, True
+
+    return total, False
+
+
+# pylint: disable=too-many-arguments
+async def get_cursor_paginated_items(
+    collection,
+    aggregate: List[dict],
+    page_stages: List[dict],
+    sort_keys: List[Tuple[str, int]],
+    cursor: str,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    count_total: Optional[str] = None,
+):
+    """Run keyset paginated aggregate, with page_stages (eg. lookups)
+    applied only to items in the returned page.
+    Returns items and page info, including total only if count_total is set"""
+
+    async def get_items():
+        return await collection.aggregate(
+            aggregate + get_cursor_stages(sort_keys, cursor, page_size) + page_stages
+        ).to_list(length=page_size + 1)
+
+    if count_total:
+        items, (total, approx) = await asyncio.gather(
+            get_items(), get_total_count(collection, aggregate, count_total)
+        )
+    else:
+        items, total, approx = await get_items(), None, False
+
+    items, page_info = get_cursor_page(items, sort_keys, page_size)
+    page_info["total"] = total
+    page_info["totalApprox"] = approx
+    return items, page_info
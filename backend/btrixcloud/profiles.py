@@ -327,6 +327,21 @@ class ProfileOps:
         except:
             return None
 
+    async def get_profile_names(
+        self, profileids: List[uuid.UUID], org: Optional[Organization] = None
+    ):
+        """return dict of profile names by id for given profile ids and org"""
+        if not profileids:
+            return {}
+
+        query = {"_id": {"$in": profileids}}
+        if org:
+            query["oid"] = org.id
+
+        cursor = self.profiles.find(query, projection=["name"])
+        results = await cursor.to_list(length=len(profileids))
+        return {res["_id"]: res.get("name") for res in results}
+
     async def get_crawl_configs_for_profile(
         self, profileid: uuid.UUID, org: Optional[Organization] = None
     ):
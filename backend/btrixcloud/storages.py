@@ -1,25 +1,77 @@
 """
 Storage API
 """
+import asyncio
+import hashlib
+import hmac
+import math
+import os
+import time
+
+from collections import OrderedDict
+from datetime import datetime
 from typing import Union
-from urllib.parse import urlsplit
-from contextlib import asynccontextmanager
+from urllib.parse import quote, urlsplit
+from contextlib import aclosing, asynccontextmanager
 
 from fastapi import Depends, HTTPException
+from aiobotocore.config import AioConfig
 from aiobotocore.session import get_session
 
 from .orgs import Organization, DefaultStorage, S3Storage
 from .users import User
-from .zip import get_zip_file, extract_and_parse_log_file
+from .cdx import iter_cdx_matches, iter_cdxj_lines
+from .utils import LRUCache, merge_sorted_async
+from .zip import (
+    block_cache,
+    get_zip_directory,
+    extract_and_parse_log_file,
+    get_log_entry_timestamp,
+    get_log_line_timestamp,
+    iter_log_lines,
+    iter_member_gzip,
+)
+
+
+# region used for signing, if storage has no region set
+DEFAULT_REGION = "us-east-1"
+
+# connection pool size of each shared s3 client
+S3_MAX_POOL_CONNECTIONS = int(os.environ.get("S3_MAX_POOL_CONNECTIONS", 50))
+
+# max concurrent storage requests when reading WACZ members, kept below
+# the pool size, so that one read can't take all connections of a client
+LOG_FETCH_CONCURRENCY = min(
+    int(os.environ.get("LOG_FETCH_CONCURRENCY", 16)), S3_MAX_POOL_CONNECTIONS // 2
+)
+
+PAGE_LIST_MEMBERS = ("pages/pages.jsonl", "pages/extraPages.jsonl")
+
+# max number of multipart upload parts uploaded at once
+UPLOAD_PART_CONCURRENCY = int(os.environ.get("UPLOAD_PART_CONCURRENCY", 4))
+
+# s3 limit on number of parts in multipart upload
+MAX_UPLOAD_PARTS = 10_000
+
+# if total size is not known, part size is doubled after this many parts
+UPLOAD_PART_SIZE_DOUBLE_EVERY = 1000
 
 
 # ============================================================================
-def init_storages_api(org_ops, crawl_manager, user_dep):
+def init_storages_api(app, org_ops, crawl_manager, user_dep):
     """API for updating storage for an org"""
 
     router = org_ops.router
     org_owner_dep = org_ops.org_owner_dep
 
+    @app.get("/orgs/all/storage/blockCache", tags=["organizations"])
+    async def get_block_cache_stats(user: User = Depends(user_dep)):
+        if not user.is_superuser:
+            raise HTTPException(status_code=403, detail="Not Allowed")
+
+        # for this api worker process only
+        return block_cache.get_stats()
+
     # pylint: disable=bare-except, raise-missing-from
     @router.patch("/storage", tags=["organizations"])
     async def update_storage(
@@ -44,38 +96,206 @@ def init_storages_api(org_ops, crawl_manager, user_dep):
                     detail="Could not verify custom storage. Check credentials are valid?",
                 )
 
+        prev_storage = org.storage
+
         await org_ops.update_storage(org, storage)
 
+        # rotate clients for previous credentials
+        if prev_storage.type == "s3":
+            await s3_clients.close(prev_storage)
+
         await crawl_manager.update_org_storage(org.id, str(user.id), org.storage)
 
         return {"updated": True}
 
 
 # ============================================================================
-@asynccontextmanager
-async def get_s3_client(storage, use_access=False):
-    """context manager for s3 client"""
-    endpoint_url = (
-        storage.endpoint_url if not use_access else storage.access_endpoint_url
-    )
-    if not endpoint_url.endswith("/"):
-        endpoint_url += "/"
+class S3ClientCache:
+    """Shared cache of long-lived s3 clients, keyed by endpoint, credentials
+    and region, so that connection pools are reused across requests.
+
+    Clients are closed when the storage is updated, when not used for
+    idle_ttl seconds, or when least recently used and the cache is full.
+    Clients still in use are closed once released"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, max_size=None, idle_ttl=None, max_pool_connections=None):
+        self.max_size = max_size or int(os.environ.get("S3_CLIENT_CACHE_SIZE", 50))
+        self.idle_ttl = idle_ttl or int(os.environ.get("S3_CLIENT_IDLE_SECS", 600))
+        self.max_pool_connections = max_pool_connections or S3_MAX_POOL_CONNECTIONS
+
+        # client key -> S3ClientEntry
+        self.clients = OrderedDict()
+        self.lock = asyncio.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.opened = 0
+        self.closed = 0
+
+    @staticmethod
+    def get_client_key(storage, use_access=False):
+        """Return key of client for storage endpoint and credentials"""
+        endpoint_url = (
+            storage.endpoint_url if not use_access else storage.access_endpoint_url
+        )
+        return (endpoint_url, storage.access_key, storage.secret_key, storage.region)
+
+    @asynccontextmanager
+    async def get(self, storage, use_access=False):
+        """Yield cached client, bucket and key prefix for storage,
+        creating a new client if needed"""
+        entry = await self._acquire(storage, use_access)
+        try:
+            yield entry.client, entry.bucket, entry.key
+        finally:
+            entry.users -= 1
+            if entry.closing and not entry.users:
+                await self._close_client(entry)
+
+    async def close(self, storage):
+        """Close clients for storage, for both endpoints"""
+        for use_access in (False, True):
+            client_key = self.get_client_key(storage, use_access)
+            entry = self.clients.pop(client_key, None)
+            if entry:
+                await self._release(entry)
+
+    async def close_all(self):
+        """Close all cached clients"""
+        while self.clients:
+            _, entry = self.clients.popitem()
+            await self._release(entry)
+
+    async def evict_idle(self):
+        """Close clients which have not been used for idle_ttl seconds"""
+        expire_before = time.monotonic() - self.idle_ttl
+        while self.clients:
+            client_key, entry = next(iter(self.clients.items()))
+            if entry.last_used > expire_before:
+                break
+
+            del self.clients[client_key]
+            await self._release(entry)
+
+    def stats(self):
+        """Return cache hit/miss and open client counters"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "open": len(self.clients),
+            "inUse": sum(entry.users for entry in self.clients.values()),
+            "opened": self.opened,
+            "closed": self.closed,
+        }
+
+    async def _acquire(self, storage, use_access):
+        await self.evict_idle()
+
+        client_key = self.get_client_key(storage, use_access)
+        entry = self.clients.get(client_key)
+        if not entry:
+            # ensure only one client is created per key
+            async with self.lock:
+                entry = self.clients.get(client_key)
+                if not entry:
+                    self.misses += 1
+                    entry = await self._create_client(storage, use_access)
+                    self.clients[client_key] = entry
+
+                    # count as user before any await, so it is not closed
+                    entry.users += 1
+
+                    while len(self.clients) > self.max_size:
+                        _, oldest = self.clients.popitem(last=False)
+                        await self._release(oldest)
+                else:
+                    self.hits += 1
+                    entry.users += 1
+        else:
+            self.hits += 1
+            entry.users += 1
+
+        entry.last_used = time.monotonic()
+
+        # may have been evicted or closed by another caller while awaiting
+        if self.clients.get(client_key) is entry:
+            self.clients.move_to_end(client_key)
 
-    parts = urlsplit(endpoint_url)
-    bucket, key = parts.path[1:].split("/", 1)
+        return entry
+
+    async def _create_client(self, storage, use_access):
+        endpoint_url = (
+            storage.endpoint_url if not use_access else storage.access_endpoint_url
+        )
+        if not endpoint_url.endswith("/"):
+            endpoint_url += "/"
+
+        parts = urlsplit(endpoint_url)
+        bucket, key = parts.path[1:].split("/", 1)
+
+        endpoint_url = parts.scheme + "://" + parts.netloc
+
+        session = get_session()
+
+        # pylint: disable=unnecessary-dunder-call
+        client = await session.create_client(
+            "s3",
+            region_name=storage.region or None,
+            endpoint_url=endpoint_url,
+            aws_access_key_id=storage.access_key,
+            aws_secret_access_key=storage.secret_key,
+            config=AioConfig(max_pool_connections=self.max_pool_connections),
+        ).__aenter__()
+
+        self.opened += 1
+        return S3ClientEntry(client, bucket, key)
+
+    async def _release(self, entry):
+        """Close client now, or when last user releases it"""
+        entry.closing = True
+        if not entry.users:
+            await self._close_client(entry)
+
+    async def _close_client(self, entry):
+        if entry.closed:
+            return
+
+        entry.closed = True
+        self.closed += 1
+        try:
+            await entry.client.close()
+        # pylint: disable=bare-except
+        except:
+            pass
 
-    endpoint_url = parts.scheme + "://" + parts.netloc
 
-    session = get_session()
+# ============================================================================
+class S3ClientEntry:
+    """Cached s3 client, with bucket and key prefix parsed from endpoint"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, client, bucket, key):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
 
-    async with session.create_client(
-        "s3",
-        region_name=storage.region,
-        endpoint_url=endpoint_url,
-        aws_access_key_id=storage.access_key,
-        aws_secret_access_key=storage.secret_key,
-    ) as client:
-        yield client, bucket, key
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.closing = False
+        self.closed = False
+
+
+s3_clients = S3ClientCache()
+
+
+# ============================================================================
+def get_s3_client(storage, use_access=False):
+    """context manager for s3 client, bucket and key prefix for storage,
+    using shared long-lived client"""
+    return s3_clients.get(storage, use_access)
 
 
 # ============================================================================
@@ -110,11 +330,30 @@ async def do_upload_single(org, filename, data, crawl_manager, storage_name="def
 
 
 # ============================================================================
-# pylint: disable=too-many-arguments,too-many-locals
+def get_upload_part_size(min_size, part_number, total_size=None):
+    """Return size of multipart upload part, so that the upload stays within
+    the max number of parts: fixed, if the total size is known, or else
+    doubling after every UPLOAD_PART_SIZE_DOUBLE_EVERY parts"""
+    if total_size is not None:
+        return max(min_size, math.ceil(total_size / MAX_UPLOAD_PARTS))
+
+    return min_size * 2 ** ((part_number - 1) // UPLOAD_PART_SIZE_DOUBLE_EVERY)
+
+
+# ============================================================================
+# pylint: disable=too-many-arguments,too-many-locals,too-many-statements
 async def do_upload_multipart(
-    org, filename, file_, min_size, crawl_manager, storage_name="default"
+    org,
+    filename,
+    file_,
+    min_size,
+    crawl_manager,
+    storage_name="default",
+    total_size=None,
 ):
-    """do upload to specified key using multipart chunking"""
+    """do upload to specified key using multipart chunking, uploading up to
+    UPLOAD_PART_CONCURRENCY parts at once. Next part is only read once an
+    upload slot is available, so at most that many parts are held in memory"""
     s3storage = None
 
     if org.storage.type == "s3":
@@ -149,13 +388,13 @@ async def do_upload_multipart(
 
         upload_id = mup_resp["UploadId"]
 
-        parts = []
-        part_number = 1
-
-        try:
-            while True:
-                chunk = await get_next_chunk(file_, min_size)
+        etags = {}
+        errors = []
+        tasks = set()
+        upload_slots = asyncio.Semaphore(UPLOAD_PART_CONCURRENCY)
 
+        async def upload_part(part_number, chunk):
+            try:
                 resp = await client.upload_part(
                     Bucket=bucket,
                     Body=chunk,
@@ -166,68 +405,223 @@ async def do_upload_multipart(
 
                 print(f"part added: {part_number} {len(chunk)} {upload_id}", flush=True)
 
-                parts.append({"PartNumber": part_number, "ETag": resp["ETag"]})
+                etags[part_number] = resp["ETag"]
+            # pylint: disable=broad-exception-caught
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                upload_slots.release()
 
-                part_number += 1
+        async def abort_upload():
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            try:
+                await client.abort_multipart_upload(
+                    Bucket=bucket, Key=key, UploadId=upload_id
+                )
+            # pylint: disable=broad-exception-caught
+            except Exception as exc:
+                print(f"Multipart upload abort failed: {exc}", flush=True)
+
+        try:
+            part_number = 1
+            while True:
+                part_size = get_upload_part_size(min_size, part_number, total_size)
+
+                await upload_slots.acquire()
+                if errors:
+                    raise errors[0]
+
+                chunk = await get_next_chunk(file_, part_size)
 
-                if len(chunk) < min_size:
+                # skip empty last part, unless file is empty
+                if chunk or part_number == 1:
+                    task = asyncio.create_task(upload_part(part_number, chunk))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    upload_slots.release()
+
+                if len(chunk) < part_size:
                     break
 
+                part_number += 1
+
+            await asyncio.gather(*tasks)
+            if errors:
+                raise errors[0]
+
             await client.complete_multipart_upload(
                 Bucket=bucket,
                 Key=key,
                 UploadId=upload_id,
-                MultipartUpload={"Parts": parts},
+                MultipartUpload={
+                    "Parts": [
+                        {"PartNumber": number, "ETag": etags[number]}
+                        for number in sorted(etags)
+                    ]
+                },
             )
 
             print(f"Multipart upload succeeded: {upload_id}")
 
             return True
+        # also abort if cancelled, eg. on client disconnect
         # pylint: disable=broad-exception-caught
-        except Exception as exc:
-            await client.abort_multipart_upload(
-                Bucket=bucket, Key=key, UploadId=upload_id
-            )
+        except BaseException as exc:
+            await abort_upload()
 
-            print(exc)
+            print(repr(exc))
             print(f"Multipart upload failed: {upload_id}")
 
+            if not isinstance(exc, Exception):
+                raise
+
             return False
 
 
+# ============================================================================
+class S3Presigner:
+    """Presign get_object urls for storage locally, with the same AWS SigV4
+    query string auth as the s3 client. The signing key is derived once per
+    day, so each url needs only a hash and a single HMAC, and many urls can
+    be signed quickly, without a client call for each"""
+
+    # pylint: disable=too-few-public-methods, too-many-instance-attributes
+
+    def __init__(self, storage):
+        endpoint_url = (
+            storage.access_endpoint_url
+            if storage.use_access_for_presign
+            else storage.endpoint_url
+        )
+        if not endpoint_url.endswith("/"):
+            endpoint_url += "/"
+
+        parts = urlsplit(endpoint_url)
+        self.bucket, self.key_prefix = parts.path[1:].split("/", 1)
+        self.origin = parts.scheme + "://" + parts.netloc
+        self.host = parts.netloc
+
+        self.access_key = storage.access_key
+        self.secret_key = storage.secret_key
+        # same default as s3 client, if no region set
+        self.region = storage.region or DEFAULT_REGION
+
+        # rewrite to access endpoint, if not signed for it
+        self.replace = None
+        if (
+            not storage.use_access_for_presign
+            and storage.access_endpoint_url
+            and storage.access_endpoint_url != storage.endpoint_url
+        ):
+            self.replace = (storage.endpoint_url, storage.access_endpoint_url)
+
+        self.signing_date = None
+        self.signing_key = None
+
+    def get_presigned_url(self, filename: str, duration: int, now=None):
+        """Return presigned url for file, valid for duration seconds"""
+        now = now or datetime.utcnow()
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+
+        path = quote(f"/{self.bucket}/{self.key_prefix}{filename}", safe="/~")
+        query = (
+            "X-Amz-Algorithm=AWS4-HMAC-SHA256"
+            f"&X-Amz-Credential={quote(self.access_key + '/' + scope, safe='~')}"
+            f"&X-Amz-Date={amz_date}"
+            f"&X-Amz-Expires={duration}"
+            "&X-Amz-SignedHeaders=host"
+        )
+
+        canonical_request = (
+            f"GET\n{path}\n{query}\nhost:{self.host}\n\nhost\nUNSIGNED-PAYLOAD"
+        )
+        string_to_sign = (
+            f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n"
+            + hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+        )
+        signature = hmac.new(
+            self._get_signing_key(amz_date[:8]),
+            string_to_sign.encode("utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+
+        url = f"{self.origin}{path}?{query}&X-Amz-Signature={signature}"
+        if self.replace:
+            url = url.replace(*self.replace)
+
+        return url
+
+    def _get_signing_key(self, date: str):
+        if date != self.signing_date:
+            key = ("AWS4" + self.secret_key).encode("utf-8")
+            for value in (date, self.region, "s3", "aws4_request"):
+                key = hmac.new(key, value.encode("utf-8"), hashlib.sha256).digest()
+
+            self.signing_key = key
+            self.signing_date = date
+
+        return self.signing_key
+
+
+presigners = LRUCache(int(os.environ.get("S3_PRESIGNER_CACHE_SIZE", 100)))
+
+
+def get_presigner(storage):
+    """Return cached presigner for storage"""
+    presigner_key = (
+        storage.endpoint_url,
+        storage.access_endpoint_url,
+        storage.use_access_for_presign,
+        storage.access_key,
+        storage.secret_key,
+        storage.region,
+    )
+    presigner = presigners.get(presigner_key)
+    if not presigner:
+        presigner = S3Presigner(storage)
+        presigners.set(presigner_key, presigner)
+
+    return presigner
+
+
 # ============================================================================
 async def get_presigned_url(org, crawlfile, crawl_manager, duration=3600):
     """generate pre-signed url for crawl file"""
-    if crawlfile.def_storage_name:
-        s3storage = await crawl_manager.get_default_storage(crawlfile.def_storage_name)
+    urls = await get_presigned_urls(org, [crawlfile], crawl_manager, duration)
+    return urls[0]
 
-    elif org.storage.type == "s3":
-        s3storage = org.storage
 
-    else:
-        raise TypeError("No Default Storage Found, Invalid Storage Type")
+async def get_presigned_urls(org, crawlfiles, crawl_manager, duration=3600):
+    """generate pre-signed urls for crawl files in one pass, looking up
+    storage and presigner once for each storage used"""
+    storage_presigners = {}
+    now = datetime.utcnow()
 
-    async with get_s3_client(s3storage, s3storage.use_access_for_presign) as (
-        client,
-        bucket,
-        key,
-    ):
-        key += crawlfile.filename
+    urls = []
+    for crawlfile in crawlfiles:
+        storage_name = crawlfile.def_storage_name
+        presigner = storage_presigners.get(storage_name)
+        if not presigner:
+            if storage_name:
+                s3storage = await crawl_manager.get_default_storage(storage_name)
 
-        presigned_url = await client.generate_presigned_url(
-            "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=duration
-        )
+            elif org.storage.type == "s3":
+                s3storage = org.storage
 
-        if (
-            not s3storage.use_access_for_presign
-            and s3storage.access_endpoint_url
-            and s3storage.access_endpoint_url != s3storage.endpoint_url
-        ):
-            presigned_url = presigned_url.replace(
-                s3storage.endpoint_url, s3storage.access_endpoint_url
-            )
+            else:
+                raise TypeError("No Default Storage Found, Invalid Storage Type")
 
-    return presigned_url
+            presigner = get_presigner(s3storage)
+            storage_presigners[storage_name] = presigner
+
+        urls.append(presigner.get_presigned_url(crawlfile.filename, duration, now))
+
+    return urls
 
 
 # ============================================================================
@@ -257,8 +651,10 @@ async def delete_crawl_file_object(org, crawlfile, crawl_manager):
 
 
 # ============================================================================
-async def get_wacz_logs(org, crawlfile, crawl_manager):
-    """Return combined and sorted list of log line dicts from all logs in WACZ."""
+@asynccontextmanager
+async def get_crawl_file_client(org, crawlfile, crawl_manager, fetch_limit=None):
+    """Yield s3 client, bucket and full key for reading crawl file,
+    with number of concurrent requests limited by fetch_limit, if set"""
     if crawlfile.def_storage_name:
         s3storage = await crawl_manager.get_default_storage(crawlfile.def_storage_name)
 
@@ -273,20 +669,204 @@ async def get_wacz_logs(org, crawlfile, crawl_manager):
         bucket,
         key,
     ):
-        key += crawlfile.filename
-        cd_start, zip_file = await get_zip_file(client, bucket, key)
-        log_files = [
-            f
-            for f in zip_file.filelist
-            if f.filename.startswith("logs/") and not f.is_dir()
+        if fetch_limit:
+            client = ConcurrencyLimitedClient(client, fetch_limit)
+
+        yield client, bucket, key + crawlfile.filename
+
+
+# ============================================================================
+async def get_wacz_directory(org, crawlfile, crawl_manager, fetch_limit=None):
+    """Read list of zip members from WACZ central directory"""
+    async with get_crawl_file_client(org, crawlfile, crawl_manager, fetch_limit) as (
+        client,
+        bucket,
+        key,
+    ):
+        return await get_zip_directory(client, bucket, key)
+
+
+# ============================================================================
+# pylint: disable=too-many-arguments
+async def iter_wacz_cdx(
+    org,
+    crawlfile,
+    crawl_manager,
+    search_key,
+    match_type,
+    from_key=None,
+    extra=None,
+    fetch_limit=None,
+):
+    """Yield CDXJ entries matching SURT search key from WACZ index, in sorted
+    order, with any extra fields added, starting at from_key, if set.
+    Crawl file directory must already be loaded"""
+    async with get_crawl_file_client(org, crawlfile, crawl_manager, fetch_limit) as (
+        client,
+        bucket,
+        key,
+    ):
+        entries = iter_cdx_matches(
+            client, bucket, key, crawlfile.directory, search_key, match_type, from_key
+        )
+        async with aclosing(entries):
+            async for url_key, timestamp, fields in entries:
+                if extra:
+                    fields.update(extra)
+                yield url_key, timestamp, fields
+
+
+# ============================================================================
+async def iter_wacz_cdx_lines(org, crawlfile, crawl_manager, fetch_limit=None):
+    """Yield all CDXJ lines from WACZ index in sorted order, streamed from
+    storage. Uses stored WACZ directory from crawl file, if available"""
+    async with get_crawl_file_client(org, crawlfile, crawl_manager, fetch_limit) as (
+        client,
+        bucket,
+        key,
+    ):
+        members = crawlfile.directory
+        if members is None:
+            members = await get_zip_directory(client, bucket, key)
+
+        async for line in iter_cdxj_lines(client, bucket, key, members):
+            yield line
+
+
+# ============================================================================
+async def get_wacz_pages(org, crawlfile, crawl_manager, fetch_limit=None):
+    """Yield page dicts from pages lists in WACZ, streamed from storage,
+    skipping the header line of each list"""
+    async with get_crawl_file_client(org, crawlfile, crawl_manager, fetch_limit) as (
+        client,
+        bucket,
+        key,
+    ):
+        members = crawlfile.directory
+        if members is None:
+            members = await get_zip_directory(client, bucket, key)
+
+        for member in members:
+            if member.filename not in PAGE_LIST_MEMBERS:
+                continue
+
+            async for page in extract_and_parse_log_file(client, bucket, key, member):
+                if isinstance(page, dict) and page.get("url"):
+                    yield page
+
+
+# ============================================================================
+async def get_wacz_logs(org, crawlfile, crawl_manager, fetch_limit=None, raw=False):
+    """Yield log line dicts from all logs in WACZ, merged in timestamp order.
+    If raw, yield the JSON lines as bytes, as stored, without parsing.
+    Logs are streamed from storage, holding only a chunk of each in memory.
+    All logs are fetched concurrently, with number of concurrent storage requests
+    limited by fetch_limit semaphore, which may be shared across WACZ files.
+    Uses stored WACZ directory from crawl file, if available"""
+    if not fetch_limit:
+        fetch_limit = asyncio.Semaphore(LOG_FETCH_CONCURRENCY)
+
+    if raw:
+        extract, key_func = iter_log_lines, get_log_line_timestamp
+    else:
+        extract, key_func = extract_and_parse_log_file, get_log_entry_timestamp
+
+    async with get_crawl_file_client(org, crawlfile, crawl_manager, fetch_limit) as (
+        client,
+        bucket,
+        key,
+    ):
+        members = crawlfile.directory
+        if members is None:
+            members = await get_zip_directory(client, bucket, key)
+
+        log_iters = [
+            extract(client, bucket, key, member)
+            for member in members
+            if member.filename.startswith("logs/")
         ]
 
-        combined_log_lines = []
+        async for log_line in merge_sorted_async(log_iters, key=key_func):
+            yield log_line
 
-        for log_zipinfo in log_files:
-            parsed_log_lines = await extract_and_parse_log_file(
-                client, bucket, key, log_zipinfo, cd_start
-            )
-            combined_log_lines.extend(parsed_log_lines)
 
-        return combined_log_lines
+# ============================================================================
+async def get_wacz_member_gzip(org, crawlfile, member, crawl_manager):
+    """Yield deflated WACZ member as gzip stream, without decompressing"""
+    async with get_crawl_file_client(org, crawlfile, crawl_manager) as (
+        client,
+        bucket,
+        key,
+    ):
+        async for chunk in iter_member_gzip(client, bucket, key, member):
+            yield chunk
+
+
+# ============================================================================
+class ConcurrencyLimitedClient:
+    """Wrap s3 client to limit number of concurrent object requests.
+    A get_object request holds its slot until its body is read or closed"""
+
+    def __init__(self, client, limit: asyncio.Semaphore):
+        self.client = client
+        self.limit = limit
+
+    async def head_object(self, **kwargs):
+        """head_object, waiting for available request slot"""
+        async with self.limit:
+            return await self.client.head_object(**kwargs)
+
+    async def get_object(self, **kwargs):
+        """get_object, waiting for available request slot"""
+        await self.limit.acquire()
+        try:
+            response = await self.client.get_object(**kwargs)
+        except BaseException:
+            self.limit.release()
+            raise
+
+        response["Body"] = LimitedStreamingBody(response["Body"], self.limit)
+        return response
+
+
+# ============================================================================
+class LimitedStreamingBody:
+    """Wrap response body to release request slot once body is closed,
+    or has been read fully"""
+
+    def __init__(self, body, limit: asyncio.Semaphore):
+        self.body = body
+        self.limit = limit
+        self.released = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def read(self, amt=None):
+        """read from body, releasing slot once all read"""
+        try:
+            data = await self.body.read(amt)
+        except BaseException:
+            await self.aclose()
+            raise
+
+        if amt is None or not data:
+            self.release()
+
+        return data
+
+    async def aclose(self):
+        """close body and release slot"""
+        try:
+            await self.body.aclose()
+        finally:
+            self.release()
+
+    def release(self):
+        """release slot, if not yet released"""
+        if not self.released:
+            self.released = True
+            self.limit.release()
@@ -6,7 +6,7 @@ import os
 import base64
 
 from io import BufferedReader
-from typing import Optional, List
+from typing import Optional, List, Union
 from fastapi import Depends, UploadFile, File
 
 from fastapi import HTTPException
@@ -26,7 +26,13 @@ from .basecrawls import (
 )
 from .users import User
 from .orgs import Organization
-from .pagination import PaginatedResponseModel, paginated_format, DEFAULT_PAGE_SIZE
+from .pagination import (
+    CursorPaginatedResponseModel,
+    PaginatedResponseModel,
+    paginated_format,
+    cursor_paginated_format,
+    DEFAULT_PAGE_SIZE,
+)
 from .storages import do_upload_single, do_upload_multipart
 from .utils import dt_now
 
@@ -74,8 +80,9 @@ class UploadOps(BaseCrawlOps):
         org: Organization,
         user: User,
         replaceId: Optional[str],
+        total_size: Optional[int] = None,
     ):
-        """Upload streaming file, length unknown"""
+        """Upload streaming file, length unknown, or total_size if reported"""
 
         prev_upload = None
         if replaceId:
@@ -104,6 +111,7 @@ class UploadOps(BaseCrawlOps):
             stream_iter(),
             MIN_UPLOAD_PART_SIZE,
             self.crawl_manager,
+            total_size=total_size,
         ):
             print("Stream Upload Failed", flush=True)
             raise HTTPException(status_code=400, detail="upload_failed")
@@ -264,12 +272,32 @@ def init_uploads_api(app, mdb, users, crawl_manager, orgs, user_dep):
         org: Organization = Depends(org_crawl_dep),
         user: User = Depends(user_dep),
     ):
+        total_size = None
+        content_length = request.headers.get("content-length")
+        if content_length:
+            try:
+                total_size = int(content_length)
+            except ValueError:
+                total_size = -1
+
+            if total_size < 0:
+                raise HTTPException(status_code=400, detail="invalid_content_length")
+
         return await ops.upload_stream(
-            request.stream(), filename, name, notes, org, user, replaceId
+            request.stream(),
+            filename,
+            name,
+            notes,
+            org,
+            user,
+            replaceId,
+            total_size=total_size,
         )
 
     @app.get(
-        "/orgs/{oid}/uploads", tags=["uploads"], response_model=PaginatedResponseModel
+        "/orgs/{oid}/uploads",
+        tags=["uploads"],
+        response_model=Union[PaginatedResponseModel, CursorPaginatedResponseModel],
     )
     async def list_uploads(
         org: Organization = Depends(org_viewer_dep),
@@ -281,6 +309,8 @@ def init_uploads_api(app, mdb, users, crawl_manager, orgs, user_dep):
         collectionId: Optional[UUID4] = None,
         sortBy: Optional[str] = "finished",
         sortDirection: Optional[int] = -1,
+        cursor: Optional[str] = None,
+        countTotal: Optional[str] = None,
     ):
         uploads, total = await ops.list_all_base_crawls(
             org,
@@ -294,7 +324,11 @@ def init_uploads_api(app, mdb, users, crawl_manager, orgs, user_dep):
             sort_direction=sortDirection,
             type_="upload",
             cls_type=UploadedCrawlOut,
+            cursor=cursor,
+            count_total=countTotal,
         )
+        if cursor is not None:
+            return cursor_paginated_format(uploads, total, pageSize)
         return paginated_format(uploads, total, page, pageSize)
 
     @app.get(
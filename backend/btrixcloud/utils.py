@@ -2,14 +2,18 @@
 
 import os
 import asyncio
+import heapq
 import json
 import sys
 import signal
 import atexit
+import time
 
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from redis import asyncio as exceptions
+from redis import asyncio as aioredis, exceptions
 
 
 def get_templates_dir():
@@ -39,19 +43,299 @@ def ts_now():
 
 async def get_redis_crawl_stats(redis, crawl_id):
     """get page stats"""
+    stats = await get_redis_crawls_stats(redis, [crawl_id])
+    return stats[crawl_id]
+
+
+async def get_redis_crawls_stats(redis, crawl_ids):
+    """get page stats for multiple crawls from same redis, in one round trip
+    returns dict of stats by crawl id"""
+    async with redis.pipeline(transaction=False) as pipe:
+        for crawl_id in crawl_ids:
+            pipe.get(f"{crawl_id}:d")
+            pipe.scard(f"{crawl_id}:s")
+            pipe.hvals(f"{crawl_id}:size")
+
+        results = await pipe.execute(raise_on_error=False)
+
+    all_stats = {}
+    old_crawl_ids = []
+
+    for inx, crawl_id in enumerate(crawl_ids):
+        pages_done, pages_found, archive_size = results[inx * 3 : inx * 3 + 3]
+
+        for res in (pages_found, archive_size):
+            if isinstance(res, Exception):
+                raise res
+
+        if isinstance(pages_done, exceptions.ResponseError):
+            # crawler <=0.9.0, done key is a list
+            old_crawl_ids.append(crawl_id)
+            pages_done = 0
+        elif isinstance(pages_done, Exception):
+            raise pages_done
+        else:
+            # crawler >0.9.0, done key is a value
+            pages_done = int(pages_done or 0)
+
+        archive_size = sum(int(x) for x in archive_size)
+
+        all_stats[crawl_id] = {
+            "found": pages_found,
+            "done": pages_done,
+            "size": archive_size,
+        }
+
+    if old_crawl_ids:
+        async with redis.pipeline(transaction=False) as pipe:
+            for crawl_id in old_crawl_ids:
+                pipe.llen(f"{crawl_id}:d")
+
+            for crawl_id, pages_done in zip(old_crawl_ids, await pipe.execute()):
+                all_stats[crawl_id]["done"] = pages_done
+
+    return all_stats
+
+
+class LRUCache:
+    """Simple in-process cache, bounded by number of entries,
+    evicting least recently used entries when full"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """return cached value for key, or default if not cached"""
+        if key not in self.items:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def set(self, key, value):
+        """add or replace cached value for key"""
+        self.items[key] = value
+        self.items.move_to_end(key)
+
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def peek(self, key, default=None):
+        """return cached value for key, without updating recency or counts"""
+        return self.items.get(key, default)
+
+    def pop(self, key, default=None):
+        """remove and return cached value for key, if any"""
+        return self.items.pop(key, default)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class RedisClientCache:
+    """Shared cache of per-crawl redis clients, keyed by redis url
+
+    Clients (and their connection pools) are reused across calls.
+    The least recently used client is closed when the cache is full,
+    and clients not used for idle_ttl seconds are closed on next access.
+    Clients still in use are closed once released.
+    """
+
+    def __init__(self, max_size=None, idle_ttl=None):
+        self.max_size = max_size or int(os.environ.get("REDIS_CLIENT_CACHE_SIZE", 200))
+        self.idle_ttl = idle_ttl or int(os.environ.get("REDIS_CLIENT_IDLE_SECS", 300))
+
+        # redis_url -> RedisClientEntry
+        self.clients = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.opened = 0
+        self.closed = 0
+
+    @asynccontextmanager
+    async def get(self, redis_url, ping=False):
+        """yield cached client for redis_url, creating a new one if needed
+        if ping is set, check connectivity of newly created client,
+        yielding None if redis can not be reached"""
+        entry = await self._acquire(redis_url, ping)
+        if not entry:
+            yield None
+            return
+
+        try:
+            yield entry.client
+        finally:
+            entry.users -= 1
+            if entry.closing:
+                await self._release(entry)
+
+    async def close(self, redis_url):
+        """close and remove client for redis_url, if any,
+        once no longer in use"""
+        entry = self.clients.pop(redis_url, None)
+        if entry:
+            await self._release(entry)
+
+    async def close_all(self):
+        """close all cached clients"""
+        entries = list(self.clients.values())
+        self.clients.clear()
+        for entry in entries:
+            await self._release(entry)
+
+    async def evict_idle(self):
+        """close clients which have not been used for idle_ttl seconds"""
+        expire_before = time.monotonic() - self.idle_ttl
+        expired = [
+            redis_url
+            for redis_url, entry in self.clients.items()
+            if entry.last_used <= expire_before
+        ]
+        for redis_url in expired:
+            await self.close(redis_url)
+
+    def stats(self):
+        """return cache hit/miss and open client counters"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "opened": self.opened,
+            "closed": self.closed,
+            "open": len(self.clients),
+            "inUse": sum(entry.users for entry in self.clients.values()),
+        }
+
+    async def _acquire(self, redis_url, ping):
+        await self.evict_idle()
+
+        entry = self.clients.get(redis_url)
+        created = not entry
+        if entry:
+            self.hits += 1
+            self.clients.move_to_end(redis_url)
+        else:
+            self.misses += 1
+            redis = aioredis.from_url(
+                redis_url, encoding="utf-8", decode_responses=True
+            )
+            entry = RedisClientEntry(redis)
+            self.clients[redis_url] = entry
+            self.opened += 1
+
+        # count as user before any await, so it is not closed while in use
+        entry.users += 1
+        entry.last_used = time.monotonic()
+
+        while len(self.clients) > self.max_size:
+            _, oldest = self.clients.popitem(last=False)
+            await self._release(oldest)
+
+        if ping and created:
+            try:
+                await entry.client.ping()
+            # pylint: disable=bare-except
+            except:
+                entry.users -= 1
+                if self.clients.get(redis_url) is entry:
+                    del self.clients[redis_url]
+                await self._release(entry)
+                return None
+
+        return entry
+
+    async def _release(self, entry):
+        """close client now, or when last user releases it"""
+        entry.closing = True
+        if entry.users or entry.closed:
+            return
+
+        self.closed += 1
+        entry.closed = True
+        try:
+            await entry.client.close()
+        # pylint: disable=broad-except
+        except Exception as exc:
+            print(f"Redis client close failed: {exc}", flush=True)
+
+
+class RedisClientEntry:
+    """Cached redis client, with number of current users"""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, client):
+        self.client = client
+
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.closing = False
+        self.closed = False
+
+
+async def merge_sorted_async(iterators, key):
+    """k-way merge of already sorted async iterators, like heapq.merge(),
+    holding only the current item of each iterator in memory"""
+    heap = []
+
+    async def push_next(inx, iterator):
+        try:
+            item = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        heapq.heappush(heap, (key(item), inx, item, iterator))
+
+    await asyncio.gather(
+        *[push_next(inx, iterator) for inx, iterator in enumerate(iterators)]
+    )
+
     try:
-        # crawler >0.9.0, done key is a value
-        pages_done = int(await redis.get(f"{crawl_id}:d") or 0)
-    except exceptions.ResponseError:
-        # crawler <=0.9.0, done key is a list
-        pages_done = await redis.llen(f"{crawl_id}:d")
+        while heap:
+            _, inx, item, iterator = heapq.heappop(heap)
+            yield item
+            await push_next(inx, iterator)
 
-    pages_found = await redis.scard(f"{crawl_id}:s")
-    archive_size = await redis.hvals(f"{crawl_id}:size")
-    archive_size = sum(int(x) for x in archive_size)
+    # if merge is closed early, also close iterators still being read
+    finally:
+        for iterator in iterators:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
 
-    stats = {"found": pages_found, "done": pages_done, "size": archive_size}
-    return stats
+
+async def prefetch_async(iterator, size=1):
+    """Iterate async iterator in a background task, reading up to size items
+    ahead of the consumer so that fetching overlaps with processing"""
+    queue = asyncio.Queue(maxsize=size)
+    end = object()
+
+    async def produce():
+        try:
+            async for item in iterator:
+                await queue.put((item, None))
+        # pylint: disable=broad-exception-caught
+        except Exception as exc:
+            await queue.put((None, exc))
+            return
+
+        await queue.put((end, None))
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            item, exc = await queue.get()
+            if exc:
+                raise exc
+            if item is end:
+                break
+            yield item
+    finally:
+        task.cancel()
 
 
 def run_once_lock(name):
@@ -101,3 +385,24 @@ def parse_jsonl_error_messages(errors):
                 flush=True,
             )
     return parsed_errors
+
+
+def accepts_encoding(accept_encoding, coding):
+    """Return true if Accept-Encoding header value explicitly lists
+    content coding with non-zero q-value"""
+    for item in accept_encoding.split(","):
+        name, *params = item.split(";")
+        if name.strip().lower() != coding:
+            continue
+
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    return float(value.strip()) > 0
+                except ValueError:
+                    return False
+
+        return True
+
+    return False
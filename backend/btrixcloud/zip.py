@@ -1,6 +1,7 @@
 """
 Methods for interacting with zip/WACZ files
 """
+import asyncio
 import io
 import json
 import os
@@ -8,7 +9,12 @@ import struct
 import zipfile
 import zlib
 
-from fastapi import HTTPException
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import BaseModel
+
+from .utils import LRUCache, prefetch_async
 
 
 # ============================================================================
@@ -16,100 +22,581 @@ EOCD_RECORD_SIZE = 22
 ZIP64_EOCD_RECORD_SIZE = 56
 ZIP64_EOCD_LOCATOR_SIZE = 20
 
-MAX_STANDARD_ZIP_SIZE = 4_294_967_295
+EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_EOCD_LOCATOR_SIGNATURE = b"PK\x06\x07"
+
+# EOCD record with max length zip comment
+MAX_EOCD_SEARCH_SIZE = EOCD_RECORD_SIZE + 65_535
+
+# initial read from end of file, should include central directory for most WACZs
+TAIL_READ_SIZE = 65_536
+
+# max size of each chunk read when streaming files from storage
+CHUNK_SIZE = 262_144
+
+# gzip header for deflate data, with no file name or modification time
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+LOG_TIMESTAMP_PREFIX = b'{"timestamp":"'
+
+# size of aligned blocks read through block cache
+BLOCK_CACHE_BLOCK_SIZE = int(os.environ.get("BLOCK_CACHE_BLOCK_SIZE", 65_536))
+
+# max total size of cached blocks, per process
+BLOCK_CACHE_MAX_BYTES = int(os.environ.get("BLOCK_CACHE_MAX_BYTES", 67_108_864))
+
+# larger reads, such as whole logs, are streamed without caching,
+# so that they don't evict the directories and indexes cached by other reads
+BLOCK_CACHE_MAX_READ = int(os.environ.get("BLOCK_CACHE_MAX_READ", 4_194_304))
+
+# larger reads are fetched in ranged requests of this size, each read fully
+# before it is yielded, so that no connection is held by a paused consumer
+RANGE_WINDOW_SIZE = int(os.environ.get("RANGE_WINDOW_SIZE", 1_048_576))
 
 
 # ============================================================================
-async def extract_and_parse_log_file(client, bucket, key, log_zipinfo, cd_start):
-    """Return parsed JSON from extracted and uncompressed log"""
-    # pylint: disable=too-many-locals
-    file_head = await fetch(
-        client, bucket, key, cd_start + log_zipinfo.header_offset + 26, 4
-    )
-    name_len = parse_little_endian_to_int(file_head[0:2])
-    extra_len = parse_little_endian_to_int(file_head[2:4])
+class ZipMember(BaseModel):
+    """Location of a zip member, with offsets from start of zip file.
+    If dataOffset is known, member can be read with a single ranged request"""
 
-    content = await fetch(
-        client,
-        bucket,
-        key,
-        cd_start + log_zipinfo.header_offset + 30 + name_len + extra_len,
-        log_zipinfo.compress_size,
-    )
+    filename: str
+    headerOffset: int
+    compressSize: int
+    fileSize: int
+    compressType: int
+    dataOffset: Optional[int]
 
-    if log_zipinfo.compress_type == zipfile.ZIP_DEFLATED:
-        uncompressed_content = zlib.decompressobj(-zlib.MAX_WBITS).decompress(content)
-    else:
-        uncompressed_content = content
+    # crc32 of uncompressed data, not set on directories stored without it
+    crc: Optional[int]
 
-    content_length = len(uncompressed_content)
-    if not log_zipinfo.file_size == content_length:
-        # pylint: disable=line-too-long
-        detail = f"Error extracting log file {log_zipinfo.filename} from WACZ {os.path.basename(key)}."
-        detail += f" Expected {log_zipinfo.file_size} bytes uncompressed but found {content_length}"
-        print(detail, flush=True)
-        raise HTTPException(status_code=500, detail=detail)
 
-    parsed_log_lines = []
+# ============================================================================
+class BlockCache:
+    """Process-wide LRU cache of fixed size aligned blocks of objects in
+    storage, bounded by total size. Concurrent reads of the same block share
+    a single pending fetch. Objects are cached by bucket and key, so must not
+    be modified once written, as is the case for WACZ files"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        max_bytes=BLOCK_CACHE_MAX_BYTES,
+        block_size=BLOCK_CACHE_BLOCK_SIZE,
+        max_read=BLOCK_CACHE_MAX_READ,
+    ):
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.max_read = max_read
+
+        self.blocks = OrderedDict()
+        self.size = 0
+
+        # futures of blocks being fetched, by block key
+        self.pending = {}
+
+        # object sizes, by bucket and key, known from tail reads
+        self.object_sizes = LRUCache(10_000)
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        self.uncached_reads = 0
+        self.bytes_fetched = 0
+
+    def get(self, block_key):
+        """Return cached block, or None if not cached"""
+        data = self.blocks.get(block_key)
+        if data is not None:
+            self.hits += 1
+            self.blocks.move_to_end(block_key)
+        return data
+
+    def set(self, block_key, data: bytes):
+        """Add block, evicting least recently used blocks over max size"""
+        prev = self.blocks.pop(block_key, None)
+        if prev is not None:
+            self.size -= len(prev)
+
+        self.blocks[block_key] = data
+        self.size += len(data)
+
+        while self.size > self.max_bytes and self.blocks:
+            _, evicted = self.blocks.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def is_cached_or_pending(self, block_key):
+        """Return true if block is cached or being fetched"""
+        return block_key in self.blocks or block_key in self.pending
+
+    def get_stats(self):
+        """Return cache size and hit rate metrics"""
+        lookups = self.hits + self.shared + self.misses
+        return {
+            "blocks": len(self.blocks),
+            "size": self.size,
+            "maxSize": self.max_bytes,
+            "hits": self.hits,
+            "shared": self.shared,
+            "misses": self.misses,
+            "hitRate": (self.hits + self.shared) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "uncachedReads": self.uncached_reads,
+            "bytesFetched": self.bytes_fetched,
+        }
+
+
+block_cache = BlockCache()
+
+
+# ============================================================================
+class RangeReader:
+    """Random access reader for object in storage, reading byte ranges
+    as aligned blocks through the block cache"""
+
+    def __init__(self, client, bucket, key, cache: Optional[BlockCache] = None):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.cache = cache or block_cache
+        self.block_size = self.cache.block_size
+
+    async def read(self, start, length):
+        """Read byte range"""
+        return b"".join([chunk async for chunk in self.iter_range(start, length)])
+
+    async def read_tail(self, length):
+        """Read last length bytes of object, returning data and object size.
+        If object size is not yet known, read with a suffix range request,
+        caching all whole blocks and the last block of the object"""
+        size = self.cache.object_sizes.get((self.bucket, self.key))
+        if size is not None:
+            start = max(size - length, 0)
+            return await self.read(start, size - start), size
+
+        data, size = await fetch_tail(self.client, self.bucket, self.key, length)
+        self.cache.misses += 1
+        self.cache.bytes_fetched += len(data)
+        self.cache.object_sizes.set((self.bucket, self.key), size)
+
+        data_start = size - len(data)
+        inx = -(-data_start // self.block_size)
+        while inx * self.block_size < size:
+            offset = inx * self.block_size - data_start
+            self.cache.set(
+                self._block_key(inx), data[offset : offset + self.block_size]
+            )
+            inx += 1
+
+        return data, size
+
+    async def iter_range(self, start, length):
+        """Yield data of byte range in chunks, using cached blocks and
+        waiting for pending fetches of blocks, if any. Each run of other
+        blocks is fetched with a single request, caching blocks as read.
+        Larger ranges are fetched uncached, one window at a time"""
+        if length <= 0:
+            return
+
+        if length > self.cache.max_read:
+            self.cache.uncached_reads += 1
+            async for chunk in fetch_windows(
+                self.client, self.bucket, self.key, start, length
+            ):
+                self.cache.bytes_fetched += len(chunk)
+                yield chunk
+            return
+
+        end = start + length
+
+        # don't request blocks past end of object, if size is known
+        size = self.cache.object_sizes.get((self.bucket, self.key))
+        if size is not None:
+            end = min(end, size)
+            if start >= end:
+                return
+
+        inx = start // self.block_size
+        last = (end - 1) // self.block_size
+
+        while inx <= last:
+            data = await self._get_cached_block(inx)
+            if data is not None:
+                yield self._slice_block(inx, data, start, end)
+                inx += 1
+                continue
+
+            run_last = inx
+            while run_last < last and not self.cache.is_cached_or_pending(
+                self._block_key(run_last + 1)
+            ):
+                run_last += 1
+
+            for block_inx, data in await self._fetch_blocks(inx, run_last):
+                yield self._slice_block(block_inx, data, start, end)
+
+            inx = run_last + 1
+
+    async def _get_cached_block(self, inx):
+        block_key = self._block_key(inx)
+        data = self.cache.get(block_key)
+        if data is None and block_key in self.cache.pending:
+            self.cache.shared += 1
+            # None if fetch failed or was cancelled, block is then fetched
+            data = await asyncio.shield(self.cache.pending[block_key])
+
+        return data
+
+    async def _fetch_blocks(self, first, last):
+        """Fetch run of blocks with a single request and return them.
+        The run is read fully before returning, never paced by the consumer
+        of the range, so that other readers waiting on its pending blocks
+        can't be blocked by a suspended stream. Runs are at most max_read"""
+        loop = asyncio.get_running_loop()
+        block_keys = [self._block_key(inx) for inx in range(first, last + 1)]
+        for block_key in block_keys:
+            self.cache.pending[block_key] = loop.create_future()
+
+        self.cache.misses += len(block_keys)
+
+        blocks = []
+        inx = first
+        buff = b""
+        try:
+            async for chunk in fetch_chunks(
+                self.client,
+                self.bucket,
+                self.key,
+                first * self.block_size,
+                len(block_keys) * self.block_size,
+            ):
+                self.cache.bytes_fetched += len(chunk)
+                buff += chunk
+                while len(buff) >= self.block_size:
+                    data = buff[: self.block_size]
+                    buff = buff[self.block_size :]
+                    self._set_block(inx, data)
+                    blocks.append((inx, data))
+                    inx += 1
+
+            # last block of object
+            if buff:
+                self.cache.object_sizes.set(
+                    (self.bucket, self.key), inx * self.block_size + len(buff)
+                )
+                self._set_block(inx, buff)
+                blocks.append((inx, buff))
+
+        finally:
+            for block_key in block_keys:
+                future = self.cache.pending.pop(block_key, None)
+                if future and not future.done():
+                    future.set_result(None)
+
+        return blocks
+
+    def _set_block(self, inx, data):
+        block_key = self._block_key(inx)
+        self.cache.set(block_key, data)
+
+        future = self.cache.pending.pop(block_key, None)
+        if future and not future.done():
+            future.set_result(data)
+
+    def _slice_block(self, inx, data, start, end):
+        block_start = inx * self.block_size
+        return data[max(start - block_start, 0) : end - block_start]
+
+    def _block_key(self, inx):
+        return (self.bucket, self.key, inx)
 
-    for json_line in uncompressed_content.decode("utf-8").split("\n"):
-        if not json_line:
+
+# ============================================================================
+async def extract_and_parse_log_file(client, bucket, key, log_member: ZipMember):
+    """Yield parsed JSON lines from log in WACZ, streaming the compressed
+    content in chunks and inflating and splitting lines incrementally"""
+    content_length = 0
+
+    async for json_line in split_lines(
+        iter_member_chunks(client, bucket, key, log_member)
+    ):
+        content_length += len(json_line) + 1
+        if not json_line.strip():
             continue
         try:
-            result = json.loads(json_line)
-            parsed_log_lines.append(result)
+            yield json.loads(json_line)
         except json.JSONDecodeError as err:
             print(f"Error decoding json-l line: {json_line}. Error: {err}", flush=True)
 
-    return parsed_log_lines
+    # last line may not be newline terminated
+    if content_length not in (log_member.fileSize, log_member.fileSize + 1):
+        # already streaming, can only report error
+        # pylint: disable=line-too-long
+        detail = f"Error extracting log file {log_member.filename} from WACZ {os.path.basename(key)}."
+        detail += f" Expected {log_member.fileSize} bytes uncompressed but found {content_length}"
+        print(detail, flush=True)
+
 
+async def iter_log_lines(client, bucket, key, log_member: ZipMember):
+    """Yield raw, non-empty JSON lines from log in WACZ, without parsing"""
+    async for line in split_lines(iter_member_chunks(client, bucket, key, log_member)):
+        if line.strip():
+            yield line
 
-async def get_zip_file(client, bucket, key):
-    """Fetch enough of the WACZ file be able to read the zip filelist"""
-    file_size = await get_file_size(client, bucket, key)
-    eocd_record = await fetch(
-        client, bucket, key, file_size - EOCD_RECORD_SIZE, EOCD_RECORD_SIZE
-    )
 
-    if file_size <= MAX_STANDARD_ZIP_SIZE:
-        cd_start, cd_size = get_central_directory_metadata_from_eocd(eocd_record)
-        central_directory = await fetch(client, bucket, key, cd_start, cd_size)
-        return (
-            cd_start,
-            zipfile.ZipFile(io.BytesIO(central_directory + eocd_record)),
+def get_log_entry_timestamp(entry: dict):
+    """Return timestamp of parsed log line"""
+    return entry["timestamp"]
+
+
+def get_log_line_timestamp(line: bytes):
+    """Return timestamp of raw JSON log line. Crawler log lines start with the
+    timestamp, so it is sliced out without parsing, if possible"""
+    if line.startswith(LOG_TIMESTAMP_PREFIX):
+        end = line.find(b'"', len(LOG_TIMESTAMP_PREFIX))
+        if end > 0:
+            return line[len(LOG_TIMESTAMP_PREFIX) : end].decode("utf-8")
+
+    try:
+        return json.loads(line).get("timestamp", "")
+    except (json.JSONDecodeError, AttributeError):
+        return ""
+
+
+async def iter_member_gzip(client, bucket, key, member: ZipMember):
+    """Yield deflated zip member as a gzip stream, without decompressing it:
+    the raw deflate data is wrapped with a gzip header and crc32 trailer"""
+    data_offset = member.dataOffset
+    if data_offset is None:
+        data_offset = await get_member_data_offset(client, bucket, key, member)
+
+    yield GZIP_HEADER
+
+    async for chunk in prefetch_async(
+        fetch_chunks(client, bucket, key, data_offset, member.compressSize)
+    ):
+        yield chunk
+
+    yield struct.pack("<II", member.crc, member.fileSize & 0xFFFFFFFF)
+
+
+async def iter_member_chunks(client, bucket, key, member: ZipMember):
+    """Yield uncompressed content of zip member in chunks"""
+    data_offset = member.dataOffset
+    if data_offset is None:
+        data_offset = await get_member_data_offset(client, bucket, key, member)
+
+    # read next chunk while current one is being processed
+    reader = RangeReader(client, bucket, key)
+    chunks = prefetch_async(reader.iter_range(data_offset, member.compressSize))
+
+    if member.compressType == zipfile.ZIP_DEFLATED:
+        chunks = inflate_chunks(chunks)
+
+    async for chunk in chunks:
+        yield chunk
+
+
+async def get_member_data_offset(client, bucket, key, member: ZipMember):
+    """Get offset of zip member data from its local file header"""
+    reader = RangeReader(client, bucket, key)
+    file_head = await reader.read(member.headerOffset + 26, 4)
+    name_len = parse_little_endian_to_int(file_head[0:2])
+    extra_len = parse_little_endian_to_int(file_head[2:4])
+    return member.headerOffset + 30 + name_len + extra_len
+
+
+async def get_zip_directory(client, bucket, key):
+    """Return list of ZipMembers for all files in zip. The data offset is looked
+    up for all except WARCs, which are not read from here, so that they can be
+    read with a single request once the directory is stored"""
+    cd_start, zip_file = await get_zip_file(client, bucket, key)
+
+    members = [
+        ZipMember(
+            filename=zipinfo.filename,
+            headerOffset=cd_start + zipinfo.header_offset,
+            compressSize=zipinfo.compress_size,
+            fileSize=zipinfo.file_size,
+            compressType=zipinfo.compress_type,
+            crc=zipinfo.CRC,
         )
+        for zipinfo in zip_file.filelist
+        if not zipinfo.is_dir()
+    ]
 
-    zip64_eocd_record = await fetch(
-        client,
-        bucket,
-        key,
-        file_size
-        - (EOCD_RECORD_SIZE + ZIP64_EOCD_LOCATOR_SIZE + ZIP64_EOCD_RECORD_SIZE),
-        ZIP64_EOCD_RECORD_SIZE,
+    to_lookup = [
+        member for member in members if not member.filename.startswith("archive/")
+    ]
+    data_offsets = await asyncio.gather(
+        *[get_member_data_offset(client, bucket, key, member) for member in to_lookup]
     )
-    zip64_eocd_locator = await fetch(
-        client,
-        bucket,
-        key,
-        file_size - (EOCD_RECORD_SIZE + ZIP64_EOCD_LOCATOR_SIZE),
-        ZIP64_EOCD_LOCATOR_SIZE,
+    for member, data_offset in zip(to_lookup, data_offsets):
+        member.dataOffset = data_offset
+
+    return members
+
+
+# pylint: disable=too-many-arguments
+async def fetch_chunks(client, bucket, key, start, length, chunk_size=CHUNK_SIZE):
+    """Fetch a byte range from a file in object storage, yielding it
+    in chunks of at most chunk_size as it is received"""
+    end = start + length - 1
+    response = await client.get_object(
+        Bucket=bucket, Key=key, Range=f"bytes={start}-{end}"
     )
-    cd_start, cd_size = get_central_directory_metadata_from_eocd64(zip64_eocd_record)
-    central_directory = await fetch(client, bucket, key, cd_start, cd_size)
+    async with response["Body"] as body:
+        while True:
+            chunk = await body.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def fetch_windows(
+    client, bucket, key, start, length, window_size=RANGE_WINDOW_SIZE
+):
+    """Fetch a byte range from a file in object storage with a ranged request
+    per window of at most window_size, yielding each window once fully read"""
+    end = start + length
+    while start < end:
+        data = await fetch(client, bucket, key, start, min(window_size, end - start))
+        if not data:
+            break
+        yield data
+        start += len(data)
+
+
+async def inflate_chunks(chunks):
+    """Incrementally inflate raw deflate stream chunks"""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+async def gunzip_chunks(chunks):
+    """Incrementally decompress concatenated gzip members"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        while chunk:
+            yield decompressor.decompress(chunk)
+            if not decompressor.eof:
+                break
+
+            chunk = decompressor.unused_data
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+async def split_lines(chunks):
+    """Split chunks into lines, without the trailing newline"""
+    remainder = b""
+    async for chunk in chunks:
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line
+
+    if remainder:
+        yield remainder
+
+
+async def get_zip_file(client, bucket, key):
+    """Fetch enough of the WACZ file be able to read the zip filelist,
+    reading through the block cache
+
+    The end of the file is read with a single suffix range request, which
+    in the common case includes the EOCD, any zip64 records and the central
+    directory. Only the missing range is fetched if the central directory
+    (or a long zip comment) does not fit"""
+    # pylint: disable=too-many-locals
+    reader = RangeReader(client, bucket, key)
+    buff, file_size = await reader.read_tail(TAIL_READ_SIZE)
+    buff_start = file_size - len(buff)
+
+    async def extend_to(start):
+        """prepend data from start, if not already in buffer"""
+        nonlocal buff, buff_start
+        start = max(start, 0)
+        if start < buff_start:
+            buff = await reader.read(start, buff_start - start) + buff
+            buff_start = start
+
+    def read(start, length):
+        return buff[start - buff_start : start - buff_start + length]
+
+    eocd_pos = find_eocd(buff)
+    if eocd_pos == -1 and buff_start:
+        # zip comment longer than initial read
+        await extend_to(file_size - MAX_EOCD_SEARCH_SIZE)
+        eocd_pos = find_eocd(buff)
+
+    if eocd_pos == -1:
+        raise zipfile.BadZipFile(f"End of central directory not found: {key}")
+
+    eocd_start = buff_start + eocd_pos
+    eocd_record = read(eocd_start, EOCD_RECORD_SIZE)
+    cd_start, _ = get_central_directory_metadata_from_eocd(eocd_record)
+
+    # zip64 locator, if present, immediately precedes the EOCD
+    locator_start = eocd_start - ZIP64_EOCD_LOCATOR_SIZE
+    if locator_start >= 0:
+        await extend_to(locator_start)
+        zip64_eocd_locator = read(locator_start, ZIP64_EOCD_LOCATOR_SIZE)
+
+        if zip64_eocd_locator[:4] == ZIP64_EOCD_LOCATOR_SIGNATURE:
+            zip64_eocd_start = parse_little_endian_to_int(zip64_eocd_locator[8:16])
+            await extend_to(zip64_eocd_start)
+            zip64_eocd_record = read(zip64_eocd_start, ZIP64_EOCD_RECORD_SIZE)
+            cd_start, _ = get_central_directory_metadata_from_eocd64(zip64_eocd_record)
+
+    await extend_to(cd_start)
+
+    # central directory through EOCD, including zip64 records, with comment
+    # removed as zipfile does not handle comments containing the EOCD signature
+    comment_len_start = eocd_start + EOCD_RECORD_SIZE - 2
+    zip_data = buff[cd_start - buff_start : comment_len_start - buff_start]
     return (
         cd_start,
-        zipfile.ZipFile(
-            io.BytesIO(
-                central_directory + zip64_eocd_record + zip64_eocd_locator + eocd_record
-            )
-        ),
+        zipfile.ZipFile(io.BytesIO(zip_data + b"\x00\x00")),
     )
 
 
-async def get_file_size(client, bucket, key):
-    """Get WACZ file size from HEAD request"""
-    head_response = await client.head_object(Bucket=bucket, Key=key)
-    return head_response["ContentLength"]
+def find_eocd(buff):
+    """Return position of EOCD record in buffer containing end of zip file,
+    or -1 if not found. The comment length must reach the end of the file,
+    as the signature may also appear in the comment itself"""
+    pos = len(buff)
+    while True:
+        pos = buff.rfind(EOCD_SIGNATURE, 0, pos)
+        if pos < 0:
+            return -1
+
+        comment_len_bytes = buff[pos + 20 : pos + 22]
+        if len(comment_len_bytes) == 2 and (
+            pos + EOCD_RECORD_SIZE + parse_little_endian_to_int(comment_len_bytes)
+            == len(buff)
+        ):
+            return pos
+
+
+async def fetch_tail(client, bucket, key, length):
+    """Fetch last length bytes of a file in object storage with a suffix range,
+    returning data and total file size"""
+    response = await client.get_object(Bucket=bucket, Key=key, Range=f"bytes=-{length}")
+    data = await response["Body"].read()
+
+    # Content-Range: bytes start-end/size
+    content_range = response.get("ContentRange")
+    file_size = int(content_range.rsplit("/", 1)[1]) if content_range else len(data)
+    return data, file_size
 
 
 async def fetch(client, bucket, key, start, length):
@@ -138,10 +625,10 @@ def get_central_directory_metadata_from_eocd64(eocd64):
 def parse_little_endian_to_int(little_endian_bytes):
     """Convert little endian used in zip spec to int"""
     byte_length = len(little_endian_bytes)
-    format_character = "q"
+    format_character = "Q"
     if byte_length == 4:
-        format_character = "i"
+        format_character = "I"
     elif byte_length == 2:
-        format_character = "h"
+        format_character = "H"
 
     return struct.unpack("<" + format_character, little_endian_bytes)[0]
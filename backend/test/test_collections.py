@@ -267,6 +267,45 @@ def test_get_collection_replay(
         assert resource["size"]
 
 
+def test_collection_cdx_lookup(
+    crawler_auth_headers, default_org_id, crawler_crawl_id, admin_crawl_id
+):
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/collections/{_coll_id}/cdx?url=https://webrecorder.net/&matchType=prefix",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data["items"]) > 0
+    for capture in data["items"]:
+        assert capture["url"].startswith("https://webrecorder.net/")
+        assert capture["crawlId"] in (crawler_crawl_id, admin_crawl_id)
+        assert capture["wacz"]
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/collections/{_coll_id}/cdx?url=https://webrecorder.net/&matchType=prefix&limit=1",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 200
+    first_page = r.json()
+    assert len(first_page["items"]) == 1
+    assert first_page["next"]
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/collections/{_coll_id}/cdx?url=https://webrecorder.net/&matchType=prefix&limit=1&cursor={first_page['next']}",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == 1
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/collections/{_coll_id}/cdx?url=https://webrecorder.net/&matchType=invalid",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_match_type"
+
+
 def test_add_upload_to_collection(crawler_auth_headers, default_org_id):
     with open(os.path.join(curr_dir, "data", "example.wacz"), "rb") as fh:
         r = requests.put(
@@ -0,0 +1,137 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+crawllogs = pytest.importorskip("btrixcloud.crawllogs")
+
+
+def log_line(inx, log_level="info", context="general"):
+    entry = {
+        "timestamp": f"2023-01-01T00:00:{inx:02d}.000Z",
+        "logLevel": log_level,
+        "context": context,
+        "message": f"line {inx}",
+    }
+    return json.dumps(entry).encode("utf-8")
+
+
+async def iter_lines(lines):
+    for line in lines:
+        yield line
+
+
+def write_blocks(writer, lines):
+    async def read_all():
+        return [data async for data in writer.iter_write(iter_lines(lines))]
+
+    return asyncio.run(read_all())
+
+
+def test_log_block_writer_skips_non_object_lines():
+    lines = [
+        log_line(0),
+        b"[]",
+        b'"x"',
+        b"1",
+        b"null",
+        b"{not json",
+        log_line(1, "error"),
+        log_line(2),
+    ]
+
+    writer = crawllogs.LogBlockWriter(block_lines=2)
+    data = write_blocks(writer, lines)
+
+    assert writer.line_count == 3
+    assert len(writer.blocks) == 2
+
+    blocks = b"".join(gzip.decompress(block) for block in data[:-1])
+    assert blocks.splitlines() == [log_line(0), log_line(1, "error"), log_line(2)]
+
+    assert writer.blocks[0].timestamp == "2023-01-01T00:00:00.000Z"
+    assert writer.blocks[0].logLevels == {"info": 1, "error": 1}
+    assert writer.blocks[1].timestamp == "2023-01-01T00:00:02.000Z"
+
+    stats = writer.stats.get_stats()
+    assert stats.logLevels == {"info": 2, "error": 1}
+    assert stats.lastError["message"] == "line 1"
+
+
+def matches_parsed(line, log_levels, contexts):
+    try:
+        entry = json.loads(line)
+    except json.JSONDecodeError:
+        return False
+
+    if not isinstance(entry, dict):
+        return False
+
+    return (not log_levels or entry.get("logLevel") in log_levels) and (
+        not contexts or entry.get("context") in contexts
+    )
+
+
+FILTER_LINES = [
+    # as written by crawler
+    b'{"timestamp":"2023-01-01T00:00:00Z","logLevel":"error","context":"general"}',
+    b'{"timestamp":"2023-01-01T00:00:00Z","logLevel":"info","context":"general"}',
+    b'{"logLevel": "error", "context": "worker"}',
+    b'{"logLevel":"warn","context":"behavior","details":{}}',
+    # top-level and nested key in different forms
+    b'{"logLevel":"info","details":{"logLevel": "error"}}',
+    b'{"logLevel": "info","details":{"logLevel":"error"}}',
+    b'{"details":{"logLevel":"info"},"logLevel": "error"}',
+    # only nested key
+    b'{"message":"x","details":{"logLevel":"error","context":"general"}}',
+    b'{"details":[{"logLevel":"error"}]}',
+    # key repeated in same form
+    b'{"logLevel":"info","details":{"logLevel":"error"}}',
+    # escaped value
+    b'{"logLevel":"err\\u006fr","context":"general"}',
+    b'{"logLevel":"error","context":"gen\\"eral"}',
+    # brace in string before key
+    b'{"message":"{","logLevel":"error","context":"general"}',
+    # key in string value, escaped
+    b'{"message":"\\"logLevel\\":\\"error\\"","logLevel":"info"}',
+    # non-object or invalid JSON
+    b"[]",
+    b'"logLevel"',
+    b"1",
+    b'["logLevel":"error"]',
+    b"",
+]
+
+
+@pytest.mark.parametrize(
+    "log_levels,contexts",
+    [
+        (["error"], []),
+        (["info", "warn"], []),
+        ([], ["general"]),
+        (["error"], ["general", "worker"]),
+        (['gen"eral'], ['gen"eral']),
+    ],
+)
+def test_log_line_filter_matches_parsed(log_levels, contexts):
+    log_filter = crawllogs.LogLineFilter(log_levels, contexts)
+
+    for line in FILTER_LINES:
+        assert log_filter.matches(line) == matches_parsed(
+            line, log_levels, contexts
+        ), line
+
+
+def test_log_line_filter_fast_path():
+    log_filter = crawllogs.LogLineFilter(["error"], ["general"])
+
+    markers = (b'"logLevel":"', b'"logLevel": "')
+    line = b'{"timestamp":"2023-01-01T00:00:00Z","logLevel":"error","context":"x"}'
+    assert log_filter._match_bytes(line, {b"error"}, markers) is True
+
+    line = b'{"logLevel":"info","details":{"logLevel": "error"}}'
+    assert log_filter._match_bytes(line, {b"error"}, markers) is None
+
+    line = b'{"message":"x","details":{"logLevel":"error"}}'
+    assert log_filter._match_bytes(line, {b"error"}, markers) is None
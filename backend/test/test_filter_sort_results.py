@@ -336,6 +336,58 @@ def test_sort_crawls(
     assert r.json()["detail"] == "invalid_sort_direction"
 
 
+def test_cursor_paginate_crawls(
+    crawler_auth_headers, default_org_id, admin_crawl_id, crawler_crawl_id
+):
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls?sortBy=started",
+        headers=crawler_auth_headers,
+    )
+    all_ids = [crawl["id"] for crawl in r.json()["items"]]
+    assert len(all_ids) == 2
+
+    # First page, with exact total
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls?sortBy=started&pageSize=1&cursor=&countTotal=exact",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] == 2
+    assert data["totalApprox"] == False
+    assert data["pageSize"] == 1
+    assert [crawl["id"] for crawl in data["items"]] == all_ids[:1]
+    next_cursor = data["next"]
+    assert next_cursor
+
+    # Second page, no total
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls?sortBy=started&pageSize=1&cursor={next_cursor}",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] is None
+    assert [crawl["id"] for crawl in data["items"]] == all_ids[1:]
+    assert data["next"] is None
+
+    # Cursor used with different sort
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls?sortBy=finished&pageSize=1&cursor={next_cursor}",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_cursor"
+
+    # Invalid count total
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls?cursor=&countTotal=invalid",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_count_total"
+
+
 def test_sort_crawl_configs(
     crawler_auth_headers, default_org_id, admin_crawl_id, crawler_crawl_id
 ):
@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import io
+import json
+import random
+import zipfile
+
+import pytest
+
+zip_ops = pytest.importorskip("btrixcloud.zip")
+utils = pytest.importorskip("btrixcloud.utils")
+
+
+class StubBody:
+    def __init__(self, data):
+        self.buff = io.BytesIO(data)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def read(self, amt=None):
+        await asyncio.sleep(0)
+        return self.buff.read(amt) if amt else self.buff.read()
+
+
+class StubClient:
+    def __init__(self, data):
+        self.data = data
+
+    async def get_object(self, Bucket, Key, Range):
+        start, end = Range[len("bytes=") :].split("-")
+        data = self.data[int(start) : int(end) + 1]
+        return {"Body": StubBody(data), "ContentLength": len(data)}
+
+
+@pytest.mark.parametrize(
+    "header,accepted",
+    [
+        ("gzip", True),
+        ("gzip, deflate, br", True),
+        ("deflate, GZIP", True),
+        ("gzip;q=0.5", True),
+        ("br;q=1.0, gzip; q=0.8", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000", False),
+        ("gzip;q=invalid", False),
+        ("x-gzip", False),
+        ("deflate, br", False),
+        ("identity", False),
+        ("", False),
+    ],
+)
+def test_accepts_gzip_encoding(header, accepted):
+    assert utils.accepts_encoding(header, "gzip") == accepted
+
+
+def test_member_gzip_passthrough():
+    rnd = random.Random(0)
+    lines = [
+        json.dumps({"timestamp": f"2023-01-01T00:00:{inx % 60:02d}Z", "n": inx})
+        for inx in range(5_000)
+    ]
+    log_data = ("\n".join(lines) + "\n").encode("utf-8")
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("pages/pages.jsonl", '{"format": "json-pages-1.0"}\n')
+        zip_file.writestr("logs/crawl.log", log_data)
+        zip_file.writestr(
+            "archive/data.warc.gz",
+            rnd.randbytes(10_000),
+            compress_type=zipfile.ZIP_STORED,
+        )
+
+    data = out.getvalue()
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        info = zip_file.getinfo("logs/crawl.log")
+
+    member = zip_ops.ZipMember(
+        filename=info.filename,
+        headerOffset=info.header_offset,
+        compressSize=info.compress_size,
+        fileSize=info.file_size,
+        compressType=info.compress_type,
+        crc=info.CRC,
+    )
+
+    client = StubClient(data)
+
+    async def read_all():
+        return b"".join(
+            [
+                chunk
+                async for chunk in zip_ops.iter_member_gzip(
+                    client, "bucket", "test.wacz", member
+                )
+            ]
+        )
+
+    gzip_data = asyncio.run(read_all())
+
+    # gzip module checks the crc32 and isize trailer
+    assert gzip.decompress(gzip_data) == log_data
+    assert gzip_data[:2] == b"\x1f\x8b"
+    assert int.from_bytes(gzip_data[-8:-4], "little") == info.CRC
+    assert int.from_bytes(gzip_data[-4:], "little") == len(log_data)
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("aiobotocore")
+storages = pytest.importorskip("btrixcloud.storages")
+orgs = pytest.importorskip("btrixcloud.orgs")
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+
+
+ENDPOINT_URL = "https://s3.example.com/test-bucket/some-prefix/"
+FILENAME = "org/crawl-1.wacz"
+
+
+async def get_client_presigned_url(region):
+    async with get_session().create_client(
+        "s3",
+        region_name=region or None,
+        endpoint_url="https://s3.example.com",
+        aws_access_key_id="ACCESS",
+        aws_secret_access_key="SECRET",
+        config=AioConfig(signature_version="s3v4"),
+    ) as client:
+        return await client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": "test-bucket", "Key": "some-prefix/" + FILENAME},
+            ExpiresIn=3600,
+        )
+
+
+@pytest.mark.parametrize("region", ["", "us-west-2"])
+def test_presigned_url_matches_client(region):
+    storage = orgs.S3Storage(
+        endpoint_url=ENDPOINT_URL,
+        access_endpoint_url=ENDPOINT_URL,
+        access_key="ACCESS",
+        secret_key="SECRET",
+        region=region,
+    )
+
+    expected = asyncio.run(get_client_presigned_url(region))
+    amz_date = parse_qs(urlsplit(expected).query)["X-Amz-Date"][0]
+
+    presigner = storages.S3Presigner(storage)
+    actual = presigner.get_presigned_url(
+        FILENAME, 3600, datetime.strptime(amz_date, "%Y%m%dT%H%M%SZ")
+    )
+
+    assert actual == expected
+    assert f"%2F{region or 'us-east-1'}%2Fs3%2F" in actual
+
+
+def test_presigned_url_key_by_org_for_custom_storage():
+    basecrawls = pytest.importorskip("btrixcloud.basecrawls")
+    oid_1, oid_2 = uuid4(), uuid4()
+
+    custom = basecrawls.CrawlFile(filename="crawl-1.wacz", hash="h", size=1)
+    assert basecrawls.get_presigned_url_key(
+        custom, oid_1
+    ) != basecrawls.get_presigned_url_key(custom, oid_2)
+
+    default = basecrawls.CrawlFile(
+        filename=f"{oid_1}/crawl-1.wacz", hash="h", size=1, def_storage_name="default"
+    )
+    assert (
+        basecrawls.get_presigned_url_key(default, oid_1)
+        == f"default:{oid_1}/crawl-1.wacz"
+    )
@@ -0,0 +1,121 @@
+import re
+
+import pytest
+
+crawls = pytest.importorskip("btrixcloud.crawls")
+
+
+ASCII_URLS = [
+    "https://example.com/",
+    "https://example.com/path/page-1.html",
+    "https://example.com/path/page_2.html?x=1",
+    "https://example.com/search?q=100%25&page=3",
+    "https://sub.example.org/a-b-c/",
+    "http://example.com:8080/index.php",
+]
+
+# urls with non-ascii chars are matched in python, not with lua pattern,
+# except for checking literals
+NON_ASCII_URLS = [
+    "https://example.com/café/menu",
+    "https://example.com/über",
+]
+
+
+@pytest.mark.parametrize(
+    "regex,pattern",
+    [
+        ("example", "example"),
+        (r"\w+", "[%w_]+"),
+        (r"\W", "[^%w_]"),
+        (r"\d+\s?\D\S*", "%d+%s?%D%S*"),
+        (r"page-\d", "page%-%d"),
+        (r"100%25", "100%%25"),
+        (r"\.html$", "%.html$"),
+        (r"^https://", "^https://"),
+        (r"\?q=", "%?q="),
+        (r"\.+", "%.+"),
+        ("a.b*c?", "a.b*c?"),
+        ("café", "café"),
+        ("^$", "^$"),
+    ],
+)
+def test_regex_to_lua_pattern(regex, pattern):
+    assert crawls.regex_to_lua_pattern(regex) == pattern
+
+
+@pytest.mark.parametrize(
+    "regex",
+    [
+        r"a{2}",
+        r"\d{1,3}",
+        "page|path",
+        "(page)",
+        "(?:page)",
+        "[a-z]+",
+        r"\bpage",
+        r"\Bpage",
+        "a*?",
+        "a+?",
+        "a??",
+        "a++",
+        "*a",
+        "a**",
+        "^*",
+        "é+",
+        r"\Ahttp",
+        "\\",
+        "a^b",
+        "a$b",
+    ],
+)
+def test_regex_to_lua_pattern_unsupported(regex):
+    assert crawls.regex_to_lua_pattern(regex) is None
+
+
+@pytest.mark.parametrize(
+    "regex",
+    [
+        "example",
+        r"\w+\.html",
+        r"/\w+/",
+        r"\W\w\W",
+        r"page-\d",
+        r"page_\d",
+        r"100%25",
+        r"\d\d\d\d",
+        r"^https://sub",
+        r"\.php$",
+        r"/$",
+        r"\?x=1$",
+        r"a-b-c",
+        r"\.+html",
+        r"-\d?\.",
+        r"\s",
+        r"\S+",
+        r"p.ge",
+        r"e\.com/.*\.html",
+        "^http:",
+    ],
+)
+def test_lua_pattern_matches_regex(regex):
+    assert_lua_pattern_matches(regex, ASCII_URLS)
+
+
+@pytest.mark.parametrize("regex", ["café", "über$", "/café/", "^https://example.com/ü"])
+def test_lua_pattern_matches_non_ascii_literal(regex):
+    assert_lua_pattern_matches(regex, ASCII_URLS + NON_ASCII_URLS)
+
+
+def assert_lua_pattern_matches(regex, urls):
+    lupa = pytest.importorskip("lupa")
+    lua = lupa.LuaRuntime()
+    find = lua.eval(
+        "function(url, pattern) return string.find(url, pattern) ~= nil end"
+    )
+
+    pattern = crawls.regex_to_lua_pattern(regex)
+    assert pattern is not None
+
+    for url in urls:
+        assert find(url, pattern) == bool(re.search(regex, url)), url
@@ -0,0 +1,151 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+crawls = pytest.importorskip("btrixcloud.crawls")
+fastapi = pytest.importorskip("fastapi")
+
+
+class FakeRedis:
+    """sorted set crawl queue, ordered by score, then member"""
+
+    def __init__(self, entries):
+        self.queue = dict(entries)
+
+    def sorted_entries(self):
+        return sorted(self.queue.items(), key=lambda item: (item[1], item[0]))
+
+    async def type(self, key):
+        return "zset"
+
+    async def zcard(self, key):
+        return len(self.queue)
+
+    async def zrangebyscore(
+        self, key, min_score, max_score, start=None, num=None, withscores=False
+    ):
+        await asyncio.sleep(0)
+        min_score = float(min_score)
+        results = [
+            (member, score)
+            for member, score in self.sorted_entries()
+            if score >= min_score
+        ]
+        results = results[start : start + num]
+        return results if withscores else [member for member, _ in results]
+
+    def zpopmin(self, count=1):
+        popped = self.sorted_entries()[:count]
+        for member, _ in popped:
+            del self.queue[member]
+        return popped
+
+
+def queue_entry(inx):
+    return json.dumps({"url": f"https://example.com/page/{inx:04d}", "depth": 1})
+
+
+def make_ops(redis):
+    ops = crawls.CrawlOps.__new__(crawls.CrawlOps)
+
+    @asynccontextmanager
+    async def get_redis(crawl_id):
+        yield redis
+
+    ops.get_redis = get_redis
+    return ops
+
+
+async def read_stream(ops, regex, cursor=None, limit=0):
+    stream = await ops.stream_crawl_queue_matches("crawl", regex, cursor, limit)
+    data = b"".join([chunk async for chunk in stream])
+
+    assert data.endswith(b"\n")
+    lines = [json.loads(line) for line in data.decode("utf-8").split("\n")[:-1]]
+
+    done = lines[-1]
+    assert set(done) == {"total", "matched", "cursor"}
+    urls = [line["url"] for line in lines[:-1]]
+    assert all(set(line) == {"url"} for line in lines[:-1])
+    assert done["matched"] == len(urls)
+    return urls, done
+
+
+def test_stream_queue_matches_ndjson():
+    redis = FakeRedis({queue_entry(inx): 10 for inx in range(50)})
+    ops = make_ops(redis)
+
+    urls, done = asyncio.run(read_stream(ops, r"/page/00[0-4]\d"))
+    assert urls == [f"https://example.com/page/{inx:04d}" for inx in range(50)]
+    assert done == {"total": 50, "matched": 50, "cursor": None}
+
+    urls, done = asyncio.run(read_stream(ops, r"/page/001\d", limit=3))
+    assert len(urls) == 3
+    assert done["total"] == 50
+    assert done["cursor"]
+
+
+@pytest.mark.parametrize("num_popped", [30, 200])
+@pytest.mark.parametrize("num_scores", [1, 3, 1000])
+def test_stream_queue_matches_resume_after_pops(num_scores, num_popped):
+    # many entries with same score, to read in several batches
+    redis = FakeRedis(
+        {queue_entry(inx): float(inx % num_scores) for inx in range(1000)}
+    )
+    ops = make_ops(redis)
+
+    expected = [
+        json.loads(member)["url"]
+        for member, _ in redis.sorted_entries()
+        if member.endswith('7", "depth": 1}')
+    ]
+
+    found = []
+    cursor = None
+    while True:
+        urls, done = asyncio.run(read_stream(ops, r"7$", cursor, limit=7))
+        found.extend(urls)
+        cursor = done["cursor"]
+        if not cursor:
+            break
+
+        # crawler pops from head of queue between requests
+        popped = redis.zpopmin(num_popped)
+        expected = [
+            url
+            for url in expected
+            if url in found
+            or url not in [json.loads(member)["url"] for member, _ in popped]
+        ]
+
+    assert found == expected
+    assert len(found) == len(set(found))
+
+
+def test_stream_queue_matches_invalid_cursor():
+    ops = make_ops(FakeRedis({}))
+
+    with pytest.raises(fastapi.HTTPException) as exc:
+        asyncio.run(ops.stream_crawl_queue_matches("crawl", "x", "not-a-cursor"))
+
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "invalid_cursor"
+
+
+def test_iter_queue_entries_removed_while_reading():
+    redis = FakeRedis({queue_entry(inx): 1.0 for inx in range(300)})
+    ops = make_ops(redis)
+
+    async def read_all():
+        found = []
+        async for entry, _ in ops._iter_crawl_queue_zset(redis, "crawl:q"):
+            found.append(entry)
+            # all read entries popped once first batches are read
+            if len(found) in (100, 250):
+                redis.zpopmin(len(found))
+        return found
+
+    found = asyncio.run(read_all())
+    assert found == [queue_entry(inx) for inx in range(300)]
@@ -4,6 +4,7 @@ import time
 import io
 import zipfile
 import re
+import json
 
 from .conftest import API_PREFIX, HOST_PREFIX
 from .test_collections import UPDATED_NAME as COLLECTION_NAME
@@ -180,6 +181,162 @@ def test_verify_wacz():
     assert len(pages.strip().split("\n")) == 4
 
 
+def test_crawl_cdx_lookup(admin_auth_headers, default_org_id, admin_crawl_id):
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/cdx?url=https://webrecorder.net/",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data["items"]) > 0
+    assert data["next"] is None
+    for capture in data["items"]:
+        assert capture["url"] == "https://webrecorder.net/"
+        assert capture["wacz"]
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/cdx?url=https://webrecorder.net/&matchType=prefix",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    prefix_data = r.json()
+    assert len(prefix_data["items"]) >= len(data["items"])
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/cdx?url=https://webrecorder.net/&matchType=prefix&limit=1",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    first_page = r.json()
+    assert first_page["items"] == prefix_data["items"][:1]
+    assert first_page["next"]
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/cdx?url=https://webrecorder.net/&matchType=prefix&limit=1&cursor={first_page['next']}",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["items"] == prefix_data["items"][1:2]
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/cdx?url=https://webrecorder.net/&cursor=invalid",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_cursor"
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/cdx?url=https://webrecorder.net/&matchType=invalid",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_match_type"
+
+
+def test_crawl_pages(admin_auth_headers, default_org_id, admin_crawl_id):
+    # pages are added after crawl finishes
+    attempts = 0
+    while True:
+        r = requests.get(
+            f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/pages",
+            headers=admin_auth_headers,
+        )
+        assert r.status_code == 200
+        data = r.json()
+        if data["total"] > 0 or attempts >= 30:
+            break
+        attempts += 1
+        time.sleep(1)
+
+    assert data["total"] > 0
+    for page in data["items"]:
+        assert page["url"]
+        assert page["crawl_id"] == admin_crawl_id
+        assert page["filename"].endswith(".wacz")
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/pages?url=https://webrecorder.net/",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] >= 1
+    for page in data["items"]:
+        assert page["url"] == "https://webrecorder.net/"
+
+
+def test_block_cache_stats(admin_auth_headers, crawler_auth_headers):
+    r = requests.get(
+        f"{API_PREFIX}/orgs/all/storage/blockCache",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["size"] <= data["maxSize"]
+    assert 0 <= data["hitRate"] <= 1
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/all/storage/blockCache",
+        headers=crawler_auth_headers,
+    )
+    assert r.status_code == 403
+
+
+def test_crawl_logs_search(admin_auth_headers, default_org_id, admin_crawl_id):
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/logs/search?q=webrecorder.net&limit=2",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data["items"]) == 2
+    assert data["next"]
+    for entry in data["items"]:
+        assert "webrecorder.net" in json.dumps(entry).lower()
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/logs/search?q=webrecorder.net&limit=2&cursor={data['next']}",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    next_data = r.json()
+    assert next_data["items"]
+    assert next_data["items"][0] != data["items"][0]
+    assert next_data["items"][0]["timestamp"] >= data["items"][-1]["timestamp"]
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/logs/search?regex=[",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_regex"
+
+
+def test_crawl_log_stats(admin_auth_headers, default_org_id, admin_crawl_id):
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}/replay.json",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    log_stats = r.json()["logStats"]
+    assert sum(log_stats["logLevels"].values()) > 0
+    assert sum(log_stats["contexts"].values()) > 0
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls?hasLogLevel=info",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 200
+    assert admin_crawl_id in [crawl["id"] for crawl in r.json()["items"]]
+
+    r = requests.get(
+        f"{API_PREFIX}/orgs/{default_org_id}/crawls?hasLogLevel=$where",
+        headers=admin_auth_headers,
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_log_level"
+
+
 def test_update_crawl(admin_auth_headers, default_org_id, admin_crawl_id):
     r = requests.get(
         f"{API_PREFIX}/orgs/{default_org_id}/crawls/{admin_crawl_id}",
@@ -0,0 +1,114 @@
+import asyncio
+import io
+import json
+import random
+import zipfile
+
+import pytest
+
+zip_ops = pytest.importorskip("btrixcloud.zip")
+utils = pytest.importorskip("btrixcloud.utils")
+
+
+class StubBody:
+    def __init__(self, data):
+        self.buff = io.BytesIO(data)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def read(self, amt=None):
+        await asyncio.sleep(0)
+        return self.buff.read(amt) if amt else self.buff.read()
+
+
+class StubClient:
+    def __init__(self, data):
+        self.data = data
+
+    async def get_object(self, Bucket, Key, Range):
+        start, end = Range[len("bytes=") :].split("-")
+        data = self.data[int(start) : int(end) + 1]
+        return {"Body": StubBody(data), "ContentLength": len(data)}
+
+
+def make_log(rnd, num_lines):
+    lines = []
+    for inx in range(num_lines):
+        entry = {
+            "timestamp": f"2023-01-01T00:00:{inx // 1000:02d}.{inx % 1000:03d}Z",
+            "logLevel": "info",
+            "context": "general",
+            "message": "%032x" % rnd.getrandbits(128),
+        }
+        lines.append(json.dumps(entry))
+    return "\n".join(lines) + "\n"
+
+
+def test_cold_cache_adjacent_log_members(monkeypatch):
+    rnd = random.Random(0)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        # first log around 1 MB compressed, second adjacent to it
+        zip_file.writestr("logs/crawl-0.log", make_log(rnd, 20_000))
+        zip_file.writestr("logs/crawl-1.log", make_log(rnd, 2_000))
+        # keep boundary of logs out of any tail read
+        zip_file.writestr(
+            "archive/data.warc.gz",
+            rnd.randbytes(1_000_000),
+            compress_type=zipfile.ZIP_STORED,
+        )
+
+    data = out.getvalue()
+
+    members = []
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_file:
+        for info in zip_file.infolist():
+            if not info.filename.startswith("logs/"):
+                continue
+            name_len, extra_len = zip_ops.struct.unpack(
+                "<HH", data[info.header_offset + 26 : info.header_offset + 30]
+            )
+            members.append(
+                zip_ops.ZipMember(
+                    filename=info.filename,
+                    headerOffset=info.header_offset,
+                    compressSize=info.compress_size,
+                    fileSize=info.file_size,
+                    compressType=info.compress_type,
+                    dataOffset=info.header_offset + 30 + name_len + extra_len,
+                    crc=info.CRC,
+                )
+            )
+
+    assert 262_144 < members[0].compressSize < 4_194_304
+
+    # stored directory, no local headers read: boundary block not cached
+    monkeypatch.setattr(zip_ops, "block_cache", zip_ops.BlockCache())
+
+    client = StubClient(data)
+
+    async def read_merged():
+        iterators = [
+            zip_ops.iter_log_lines(client, "bucket", "test.wacz", member)
+            for member in members
+        ]
+        return [
+            line
+            async for line in utils.merge_sorted_async(
+                iterators, zip_ops.get_log_line_timestamp
+            )
+        ]
+
+    async def read_with_timeout():
+        return await asyncio.wait_for(read_merged(), timeout=10)
+
+    lines = asyncio.run(read_with_timeout())
+
+    assert len(lines) == 22_000
+    timestamps = [zip_ops.get_log_line_timestamp(line) for line in lines]
+    assert timestamps == sorted(timestamps)